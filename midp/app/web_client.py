@@ -204,11 +204,21 @@ class RestAPIClient(Generic[T]):
         return http_session
 
     def list(self) -> List[T]:
-        response = self._new_session().get(self._base_url)
+        http_session = self._new_session()
+        objs: List[T] = []
+        cursor: Optional[str] = None
 
-        _assert_response(response, [200])
+        while True:
+            response = http_session.get(self._base_url, params=dict(cursor=cursor) if cursor else None)
+
+            _assert_response(response, [200])
+
+            objs.extend(self._model_class(**i) for i in response.json())
+
+            cursor = response.headers.get('X-Next-Cursor')
 
-        return [self._model_class(**i) for i in response.json()]
+            if not cursor:
+                return objs
 
     def get(self, id: str, /, view_secret: bool = False) -> T:
         response = self._new_session()\
@@ -1,22 +1,28 @@
-import re
+import json
+from base64 import urlsafe_b64encode, urlsafe_b64decode
 from enum import StrEnum
-from typing import TypeVar, Generic, List, Optional, Union, Any, Dict, Annotated, Set
+from typing import TypeVar, Generic, List, Optional, Union, Any, Dict, Annotated, Set, Iterable, Tuple, FrozenSet
 
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException, Depends, Query
 from imagination import container
-from pydantic import BaseModel
+from jsonpatch import JsonPatchException, JsonPointerException
+from pydantic import BaseModel, ValidationError
 from starlette.requests import Request
-from starlette.responses import Response
+from starlette.responses import Response, JSONResponse
 
-from midp.common.obj_patcher import PatchOperation, apply_changes
-from midp.common.token_manager import TokenManager
-from midp.common.web_helpers import make_generic_json_response, authenticate_with_bearer_token
-from midp.iam.dao.atomic import AtomicDao
+from midp.common.obj_patcher import PatchOperation
+from midp.common.token_manager import TokenManager, AccessClaims, parse_scopes
+from midp.common.rds import DataStoreSession
+from midp.common.web_helpers import make_generic_json_response, authenticate_with_bearer_token, use_datastore_session
+from midp.iam.dao.atomic import AtomicDao, UnknownFieldError
 from midp.iam.models import PredefinedScope
+from midp.static_info import REST_MAX_PAGE_SIZE
 from midp.log_factory import midp_logger_for
 
 T = TypeVar('T')
 
+_RESERVED_LIST_PARAMS = {'fields', 'limit', 'cursor'}
+
 
 class FailedResponse(BaseModel):
     error: str
@@ -65,12 +71,14 @@ class BaseRestController(Generic[T]):
     def _get_scopes_for_delete(self) -> Set[str]:
         return {f'{self._get_scopes_namespace()}.delete'}
 
-    def _extract_scopes(self, access_claims: Dict[str, Any]) -> List[str]:
-        raw_scopes = access_claims.get('scope')
-        return re.split(r'\s+', raw_scopes) if raw_scopes else []
+    def _extract_scopes(self, access_claims: Dict[str, Any]) -> FrozenSet[str]:
+        if isinstance(access_claims, AccessClaims):
+            return access_claims.scopes
+
+        return parse_scopes(access_claims.get('scope'))
 
     def _check_authorization(self, action: DataAction, access_claims: Dict[str, Any]) -> bool:
-        given_scopes: List[str] = self._extract_scopes(access_claims)
+        given_scopes: FrozenSet[str] = self._extract_scopes(access_claims)
 
         if PredefinedScope.IDP_ROOT.value.name in given_scopes or PredefinedScope.IDP_ADMIN.value.name in given_scopes:
             return True
@@ -92,88 +100,170 @@ class BaseRestController(Generic[T]):
 
         return len(matched_scopes) == len(given_scopes)
 
+    def _parse_fields(self, fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+        """ Parse the comma-separated list of the requested properties """
+        if not fields:
+            return None
+
+        return self._dao.get_selectable_fields([field.strip() for field in fields.split(',') if field.strip()])
+
+    def _respond_with_partial_objects(self, objs: Union[T, Iterable[T]], fields: Iterable[str]) -> Response:
+        """ Respond with only the requested properties as the partial objects do not pass the response model """
+        field_set = set(fields)
+
+        if isinstance(objs, BaseModel):
+            content = objs.model_dump(mode='json', include=field_set)
+        else:
+            content = [obj.model_dump(mode='json', include=field_set) for obj in objs]
+
+        return JSONResponse(content)
+
+    def _encode_cursor(self, key: Tuple[str, str]) -> str:
+        return urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+    def _decode_cursor(self, cursor: str) -> Tuple[str, str]:
+        name, id = json.loads(urlsafe_b64decode(cursor.encode()))
+        return name, id
+
     def list(self,
              request: Request,
-             access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)]) -> List[T]:
-        """ List resources """
+             response: Response,
+             access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)],
+             datastore_session: Annotated[DataStoreSession, Depends(use_datastore_session)],
+             fields: Annotated[Optional[str], Query(description='Comma-separated properties to return')] = None,
+             limit: Annotated[Optional[int], Query(ge=1, le=REST_MAX_PAGE_SIZE)] = None,
+             cursor: Annotated[Optional[str], Query(description='The "X-Next-Cursor" of the previous page')] = None,
+             ) -> List[T]:
+        """ List resources
+
+            The resources are ordered by name, one page at a time. When there may be more resources, the response has
+            the "X-Next-Cursor" header to pass back as ``cursor`` for the next page.
+
+            Any other query parameter filters by the property of the same name, e.g., ``?name=idp.*`` for the prefix
+            or ``?fixed=true`` for the exact value.
+        """
         if not self._check_authorization(DataAction.LIST, access_claims=access_claims):
             # noinspection PyTypeChecker
             return self._respond_with_error(403, 'access.denied')
 
-        result = [i for i in self._dao.select(order_by=[('name', 'ASC')])]
-        return result if self._full_access_requested(request, access_claims) else self._hide_sensitive_fields_in_list(result)
+        filters = {k: v for k, v in request.query_params.items() if k not in _RESERVED_LIST_PARAMS}
+
+        try:
+            selected_fields = self._parse_fields(fields)
+        except UnknownFieldError as e:
+            return self._respond_with_error(400, 'fields.unknown', str(e))
+
+        try:
+            after = self._decode_cursor(cursor) if cursor else None
+            objs, last_key = self._dao.select_page(filters,
+                                                   after=after,
+                                                   limit=limit or REST_MAX_PAGE_SIZE,
+                                                   datastore_session=datastore_session,
+                                                   fields=selected_fields)
+        except UnknownFieldError as e:
+            return self._respond_with_error(400, 'filters.unknown', str(e))
+        except ValidationError as e:
+            return self._respond_with_error(400, 'filters.invalid', str(e))
+        except (ValueError, TypeError):
+            return self._respond_with_error(400, 'cursor.invalid')
+
+        if not self._full_access_requested(request, access_claims):
+            objs = self._hide_sensitive_fields_in_list(objs)
+
+        if selected_fields:
+            response = self._respond_with_partial_objects(objs, selected_fields)
+
+        if last_key:
+            response.headers['X-Next-Cursor'] = self._encode_cursor(last_key)
+
+        return response if selected_fields else objs
 
     def create(self,
                request: Request,
                obj: T,
-               access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)]) -> T:
+               access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)],
+               datastore_session: Annotated[DataStoreSession, Depends(use_datastore_session)]) -> T:
         """ Create a new resource """
         if not self._check_authorization(DataAction.WRITE, access_claims=access_claims):
             return self._respond_with_error(403, 'access.denied')
 
-        result = self._dao.add(obj)
+        result = self._dao.add(obj, datastore_session=datastore_session)
         return result if self._full_access_requested(request, access_claims) else self._hide_sensitive_fields(result)
 
     def get(self,
             request: Request,
             id: str,
-            access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)]
+            access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)],
+            datastore_session: Annotated[DataStoreSession, Depends(use_datastore_session)],
+            fields: Annotated[Optional[str], Query(description='Comma-separated properties to return')] = None
             ) -> Union[T, FailedResponse]:
         """ Get the resource by ID """
         if not self._check_authorization(DataAction.READ, access_claims=access_claims):
             return self._respond_with_error(403, 'access.denied')
 
+        try:
+            selected_fields = self._parse_fields(fields)
+        except UnknownFieldError as e:
+            return self._respond_with_error(400, 'fields.unknown', str(e))
+
         result = self._dao.select_one('id = :id_or_name OR name = :id_or_name',
-                                      dict(id_or_name=id))
+                                      dict(id_or_name=id),
+                                      datastore_session=datastore_session,
+                                      fields=selected_fields)
         if not result:
             return self._respond_with_error(status=404, error='not-found')
-        else:
-            return result if self._full_access_requested(request, access_claims) else self._hide_sensitive_fields(result)
+
+        obj = result if self._full_access_requested(request, access_claims) else self._hide_sensitive_fields(result)
+
+        return self._respond_with_partial_objects(obj, selected_fields) if selected_fields else obj
 
     def patch(self,
               request: Request,
               id: str,
               operations: List[PatchOperation],
-              access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)]
+              access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)],
+              datastore_session: Annotated[DataStoreSession, Depends(use_datastore_session)]
               ) -> Union[T, FailedResponse]:
         if not self._check_authorization(DataAction.WRITE, access_claims=access_claims):
             return self._respond_with_error(403, 'access.denied')
 
         # TODO implement the etag check.
-        base_obj = self._dao.select_one('id = :id_or_name OR name = :id_or_name',
-                                        dict(id_or_name=id))
-        if not base_obj:
-            raise HTTPException(status_code=404, detail="Resource not found")
+        try:
+            result = self._dao.patch(operations,
+                                     'id = :id_or_name OR name = :id_or_name',
+                                     dict(id_or_name=id),
+                                     datastore_session=datastore_session)
+        except (ValidationError, JsonPatchException, JsonPointerException) as e:
+            return self._respond_with_error(400, 'patch.invalid', str(e))
 
-        base_obj_dict = base_obj.model_dump()
-        updated_obj_dict = apply_changes(base_obj_dict, operations)
-        updated_obj = self._dao.from_dict(updated_obj_dict)
-        result = self._dao.simple_update(updated_obj,
-                                         'id = :id_or_name OR name = :id_or_name',
-                                         dict(id_or_name=id))
+        if not result:
+            raise HTTPException(status_code=404, detail="Resource not found")
 
         return result if self._full_access_requested(request, access_claims) else self._hide_sensitive_fields(result)
 
     def delete(self,
                request: Request,
                id: str,
-               access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)]):
+               access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)],
+               datastore_session: Annotated[DataStoreSession, Depends(use_datastore_session)]):
         """ Delete the resource by ID """
         if not self._check_authorization(DataAction.DELETE, access_claims=access_claims):
             return self._respond_with_error(403, 'access.denied')
 
-        if self._dao.delete('id = :id_or_name OR name = :id_or_name', dict(id_or_name=id)) > 0:
+        if self._dao.delete('id = :id_or_name OR name = :id_or_name',
+                            dict(id_or_name=id),
+                            datastore_session=datastore_session) > 0:
             return make_generic_json_response(200)
         else:
             return make_generic_json_response(410)
 
     def _full_access_requested(self, request: Request, access_claims: Optional[Dict[str, Any]]) -> bool:
-        given_scopes: List[str] = self._extract_scopes(access_claims)
+        given_scopes: FrozenSet[str] = self._extract_scopes(access_claims)
 
         return request.headers.get('X-Access-Level') == "full" and len(self._privilege_scopes.intersection(given_scopes)) > 0
 
     def _hide_sensitive_fields(self, obj: T) -> T:
         return obj
 
-    def _hide_sensitive_fields_in_list(self, objs: List[T]) -> List[T]:
+    def _hide_sensitive_fields_in_list(self, objs: Iterable[T]) -> List[T]:
         return [self._hide_sensitive_fields(obj) for obj in objs]
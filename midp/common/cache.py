@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Generic, TypeVar, Hashable, Optional, Tuple
+
+from pydantic import BaseModel
+
+T = TypeVar('T')
+
+
+class CacheStats(BaseModel):
+    size: int
+    max_size: int
+    ttl: float
+    hits: int
+    misses: int
+    evictions: int
+    """ The number of entries dropped to stay within the size limit """
+    invalidations: int
+
+
+class LRUCache(Generic[T]):
+    """ Thread-safe in-process cache, bounded by the number of entries (least recently used first) and by TTL """
+
+    def __init__(self, max_size: int, ttl: float):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries: OrderedDict[Hashable, Tuple[float, T]] = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[T]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[0] < monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+
+            return entry[1]
+
+    @property
+    def generation(self) -> int:
+        """ The number of times the cache has been cleared (see :meth:`set`) """
+        with self._lock:
+            return self._invalidations
+
+    def set(self, key: Hashable, value: T, ttl: Optional[float] = None, generation: Optional[int] = None):
+        """ Cache the value for the given number of seconds (by default, the TTL of the cache)
+
+            With ``generation``, i.e., :attr:`generation` taken before loading the value, the value is dropped if the
+            cache has been cleared in the meantime, as it may be outdated.
+        """
+        with self._lock:
+            if generation is not None and generation != self._invalidations:
+                return
+
+            self._entries[key] = (monotonic() + (self._ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._invalidations += 1
+
+    def get_stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(size=len(self._entries),
+                              max_size=self._max_size,
+                              ttl=self._ttl,
+                              hits=self._hits,
+                              misses=self._misses,
+                              evictions=self._evictions,
+                              invalidations=self._invalidations)
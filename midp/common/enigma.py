@@ -1,18 +1,78 @@
 import hashlib
+import json
 import os
-from base64 import b64encode, b64decode
-from typing import Any, Dict, Union, Optional
+from base64 import b64encode, b64decode, urlsafe_b64encode
+from functools import lru_cache
+from threading import Lock
+from typing import Any, Dict, Union, Optional, Tuple, List
 
 import jwt
 from cryptography.hazmat.primitives import serialization, hashes
-from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.asymmetric import padding, ec, ed25519, ed448, rsa
 from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey, RSAPublicKey
+from cryptography.hazmat.primitives.asymmetric.types import PrivateKeyTypes, PublicKeyTypes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from imagination.decorator import EnvironmentVariable
 from imagination.decorator.service import registered
 
 from midp.common.env_helpers import optional_env
 from midp.log_factory import midp_logger_for
 
+_ENVELOPE_VERSION = 2
+""" The version of the envelope format (the plain RSA-OAEP ciphertexts being the first one) """
+
+_DATA_KEY_SIZE = 256
+""" The size of the AES-GCM data keys in bits """
+
+_NONCE_SIZE = 12
+""" The size of the AES-GCM nonces in bytes """
+
+_DATA_KEY_USAGE_LIMIT = 2 ** 32
+""" The maximum number of encryptions with one data key, as the nonces are random """
+
+_UNWRAPPED_DATA_KEY_CACHE_SIZE = 256
+""" The maximum number of unwrapped data keys kept in memory """
+
+_JWT_KEY_TYPES = {
+    'RS256': (rsa.RSAPrivateKey, rsa.RSAPublicKey),
+    'ES256': (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey),
+    'EdDSA': ((ed25519.Ed25519PrivateKey, ed448.Ed448PrivateKey), (ed25519.Ed25519PublicKey, ed448.Ed448PublicKey)),
+}
+""" The supported JWT signing algorithms and their types of the private and the public keys """
+
+_JWK_THUMBPRINT_MEMBERS = {
+    'RSA': ('e', 'kty', 'n'),
+    'EC': ('crv', 'kty', 'x', 'y'),
+    'OKP': ('crv', 'kty', 'x'),
+}
+""" The required members of the JWKs per key type for the thumbprints (RFC 7638) """
+
+
+def _infer_jwt_algorithm(public_key: PublicKeyTypes) -> str:
+    for algorithm, (_, public_key_type) in _JWT_KEY_TYPES.items():
+        if isinstance(public_key, public_key_type):
+            if algorithm == 'ES256' and not isinstance(public_key.curve, ec.SECP256R1):
+                break
+            return algorithm
+
+    raise RuntimeError(f'Unsupported JWT key: {type(public_key).__name__}')
+
+
+def _make_jwk(public_key: PublicKeyTypes, algorithm: str) -> Dict[str, Any]:
+    """ Make the JWK (RFC 7517) of the public key with its thumbprint (RFC 7638) as the key ID """
+    jwk: Dict[str, Any] = jwt.get_algorithm_by_name(algorithm).to_jwk(public_key, as_dict=True)
+    jwk.pop('key_ops', None)  # NOTE: Superseded by "use".
+
+    thumbprint_input = json.dumps({member: jwk[member] for member in _JWK_THUMBPRINT_MEMBERS[jwk['kty']]},
+                                  separators=(',', ':'),
+                                  sort_keys=True)
+    jwk.update(kid=urlsafe_b64encode(hashlib.sha256(thumbprint_input.encode()).digest()).rstrip(b'=').decode(),
+               use='sig',
+               alg=algorithm)
+
+    return jwk
+
 
 @registered(
     params=[
@@ -28,6 +88,31 @@ from midp.log_factory import midp_logger_for
             default='public.pem',
             allow_default=True
         ),
+        EnvironmentVariable(
+            name='cryptographic_algorithm',
+            env='MINI_IDP_JWT_ALGORITHM',
+            default='RS256',
+            allow_default=True
+        ),
+        EnvironmentVariable(
+            name='jwt_private_key_pem_file_path',
+            env='MINI_IDP_JWT_PRIVATE_KEY_FILE',
+            default=None,
+            allow_default=True
+        ),
+        EnvironmentVariable(
+            name='jwt_public_key_pem_file_path',
+            env='MINI_IDP_JWT_PUBLIC_KEY_FILE',
+            default=None,
+            allow_default=True
+        ),
+        EnvironmentVariable(
+            name='jwt_retired_public_key_pem_file_paths',
+            env='MINI_IDP_JWT_RETIRED_PUBLIC_KEY_FILES',
+            parse_value=lambda v: [path.strip() for path in v.split(',') if path.strip()] if v else None,
+            default=None,
+            allow_default=True
+        ),
     ]
 )
 class Enigma:
@@ -35,7 +120,20 @@ class Enigma:
                  private_key_pem_file_path: str,
                  public_key_pem_file_path: str,
                  cryptographic_algorithm: Optional[str] = None,
-                 hashing_algorithm: Optional[str] = None):
+                 hashing_algorithm: Optional[str] = None,
+                 jwt_private_key_pem_file_path: Optional[str] = None,
+                 jwt_public_key_pem_file_path: Optional[str] = None,
+                 jwt_retired_public_key_pem_file_paths: Optional[List[str]] = None):
+        """
+        :param private_key_pem_file_path: The private RSA key for the encryption (and the JWTs by default)
+        :param public_key_pem_file_path: The public RSA key for the encryption (and the JWTs by default)
+        :param cryptographic_algorithm: The JWT signing algorithm, i.e., RS256 (default), ES256 or EdDSA
+        :param hashing_algorithm: The algorithm of :meth:`compute_hash`
+        :param jwt_private_key_pem_file_path: The private key for signing the JWTs if not the RSA key
+        :param jwt_public_key_pem_file_path: The public key for verifying the JWTs if not the RSA key
+        :param jwt_retired_public_key_pem_file_paths: The public keys of the former signing keys, which still verify
+                                                      the JWTs and stay published in :meth:`get_jwks`
+        """
         self._log = midp_logger_for(self)
 
         self._private_key: Optional[RSAPrivateKey] = None
@@ -60,61 +158,208 @@ class Enigma:
         self._cryptographic_algorithm = cryptographic_algorithm or 'RS256'
         self._hashing_algorithm = hashing_algorithm or 'sha512'
 
+        if self._cryptographic_algorithm not in _JWT_KEY_TYPES:
+            raise RuntimeError(f'MINI_IDP_JWT_ALGORITHM: Expected one of {", ".join(_JWT_KEY_TYPES)}, '
+                               f'given {self._cryptographic_algorithm}.')
+
+        # NOTE: The encryption always uses the RSA key pair, so only the JWTs may have their own key pair.
+        self._jwt_private_key: Optional[PrivateKeyTypes] = self._private_key
+        self._jwt_public_key: Optional[PublicKeyTypes] = self._public_key
+
+        if jwt_private_key_pem_file_path:
+            with open(jwt_private_key_pem_file_path, 'r') as f:
+                self._jwt_private_key = serialization.load_pem_private_key(f.read().encode(), password=None)
+
+        if jwt_public_key_pem_file_path:
+            with open(jwt_public_key_pem_file_path, 'r') as f:
+                self._jwt_public_key = serialization.load_pem_public_key(f.read().encode())
+
+        self._assert_jwt_key_types()
+
+        # NOTE: The key ring is indexed by the key IDs (the JWK thumbprints) and starts with the signing key.
+        self._jwt_key_ring: Dict[str, Tuple[str, PublicKeyTypes]] = dict()
+        self._jwks: List[Dict[str, Any]] = list()
+        self._jwt_key_id: Optional[str] = None
+
+        if self._jwt_public_key is not None:
+            self._jwt_key_id = self._add_to_jwt_key_ring(self._jwt_public_key, self._cryptographic_algorithm)
+
+        for retired_public_key_pem_file_path in jwt_retired_public_key_pem_file_paths or []:
+            with open(retired_public_key_pem_file_path, 'r') as f:
+                retired_public_key = serialization.load_pem_public_key(f.read().encode())
+
+            self._add_to_jwt_key_ring(retired_public_key, _infer_jwt_algorithm(retired_public_key))
+
+        self._data_key_lock = Lock()
+        self._data_key: Optional[Tuple[AESGCM, bytes]] = None
+        self._data_key_usage_count = 0
+        self._unwrap_data_key = lru_cache(maxsize=_UNWRAPPED_DATA_KEY_CACHE_SIZE)(self._make_cipher)
+
     def compute_hash(self, token: str) -> str:
         """ Compute the hash of the given token """
         m = hashlib.new(self._hashing_algorithm)
         m.update(token.encode('utf-8'))
         return m.hexdigest()
 
+    def derive_key(self, purpose: str, length: int = 32) -> bytes:
+        """ Derive a symmetric key for the given purpose from the private key (HKDF-SHA256)
+
+            Every process with the same key pair derives the same key.
+        """
+        self._assert_cryptographic_capabilities()
+
+        return HKDF(algorithm=hashes.SHA256(), length=length, salt=None, info=purpose.encode()).derive(
+            self._private_key.private_bytes(serialization.Encoding.DER,
+                                            serialization.PrivateFormat.PKCS8,
+                                            serialization.NoEncryption())
+        )
+
     def _assert_cryptographic_capabilities(self):
         assert self._private_key is not None and self._public_key is not None, \
             "The cryptographic operation is not available."
 
+    def _assert_jwt_key_types(self):
+        private_key_type, public_key_type = _JWT_KEY_TYPES[self._cryptographic_algorithm]
+
+        for key, expected_type in [(self._jwt_private_key, private_key_type), (self._jwt_public_key, public_key_type)]:
+            if key is not None and not isinstance(key, expected_type):
+                raise RuntimeError(f'The JWT key ({type(key).__name__}) does not match the algorithm '
+                                   f'{self._cryptographic_algorithm}. Set MINI_IDP_JWT_PRIVATE_KEY_FILE and '
+                                   f'MINI_IDP_JWT_PUBLIC_KEY_FILE to the key pair of the algorithm.')
+
+        if (self._cryptographic_algorithm == 'ES256'
+                and any(key is not None and not isinstance(key.curve, ec.SECP256R1)
+                        for key in [self._jwt_private_key, self._jwt_public_key])):
+            raise RuntimeError('ES256 requires the key pair on the P-256 curve.')
+
+    def _assert_jwt_capabilities(self):
+        assert self._jwt_private_key is not None and self._jwt_public_key is not None, \
+            "The JWT signing is not available."
+
+    def _add_to_jwt_key_ring(self, public_key: PublicKeyTypes, algorithm: str) -> str:
+        jwk = _make_jwk(public_key, algorithm)
+
+        if jwk['kid'] not in self._jwt_key_ring:
+            self._jwt_key_ring[jwk['kid']] = (algorithm, public_key)
+            self._jwks.append(jwk)
+
+        return jwk['kid']
+
+    @property
+    def jwt_algorithm(self) -> str:
+        return self._cryptographic_algorithm
+
+    @property
+    def jwt_key_id(self) -> Optional[str]:
+        return self._jwt_key_id
+
+    def get_jwks(self) -> Dict[str, Any]:
+        """ Get the public keys of the key ring as the JWK set (RFC 7517), the signing key first """
+        return {'keys': [dict(jwk) for jwk in self._jwks]}
+
     def decode(self, token: str, issuer: Optional[str] = None, audience: Optional[str] = None) -> Dict[str, Any]:
-        """ Decode the JWT string """
+        """ Decode the JWT string, verified with the key of its key ID """
         assert isinstance(token, str), "The token must be a string. Given {} instead".format(type(token))
 
-        self._assert_cryptographic_capabilities()
+        self._assert_jwt_capabilities()
+
+        key_id = jwt.get_unverified_header(token).get('kid')
+
+        if key_id is None:
+            # NOTE: The tokens issued before the key IDs are verified with the signing key.
+            key_id = self._jwt_key_id
+        elif key_id not in self._jwt_key_ring:
+            raise jwt.InvalidSignatureError(f'Unknown key ID: {key_id}')
+
+        algorithm, public_key = self._jwt_key_ring[key_id]
 
         return jwt.decode(
             token,
-            key=self._public_key,
-            algorithms=[self._cryptographic_algorithm],
+            key=public_key,
+            algorithms=[algorithm],
             issuer=issuer,
             audience=audience,
         )
 
     def encode(self, payload: Dict[str, Any]) -> str:
-        """ Encode the payload into a JWT string """
-        self._assert_cryptographic_capabilities()
+        """ Encode the payload into a JWT string with the key ID of the signing key """
+        self._assert_jwt_capabilities()
 
-        return jwt.encode(payload=payload, key=self._private_key, algorithm=self._cryptographic_algorithm)
+        return jwt.encode(payload=payload,
+                          key=self._jwt_private_key,
+                          algorithm=self._cryptographic_algorithm,
+                          headers={'kid': self._jwt_key_id})
 
     def encrypt(self, message: Union[bytes, str], *, as_hex: bool = True) -> bytes:
-        """ Encrypt the message with a permanent key pair """
+        """ Encrypt the message into an envelope
+
+            The envelope consists of the version, the data key wrapped by the permanent key pair, the nonce and the
+            AES-GCM ciphertext. The data key is generated once and reused, so only its wrapping costs an RSA
+            operation.
+        """
         self._assert_cryptographic_capabilities()
 
         target = message.encode() if isinstance(message, str) else message
 
-        encrypted_message = self._public_key.encrypt(
-            target,
-            padding.OAEP(
-                mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                algorithm=hashes.SHA256(),
-                label=None
-            )
-        )
+        cipher, wrapped_data_key = self._get_data_key()
+        header = bytes([_ENVELOPE_VERSION]) + wrapped_data_key
+        nonce = os.urandom(_NONCE_SIZE)
+        encrypted_message = header + nonce + cipher.encrypt(nonce, target, header)
 
         return b64encode(encrypted_message) if as_hex else encrypted_message
 
     def decrypt(self, message: Union[bytes, str], *, as_hex: bool = True) -> bytes:
-        """ Decrypt the message with a permanent key pair """
+        """ Decrypt the envelope, or the legacy ciphertext encrypted with the permanent key pair
+
+            The unwrapped data keys are cached, so only the first envelope of each data key costs an RSA operation.
+        """
         self._assert_cryptographic_capabilities()
 
         target = message.encode() if isinstance(message, str) else message
+        target = b64decode(target) if as_hex else target
+
+        if self._is_legacy_ciphertext(target):
+            return self._decrypt_with_private_key(target)
+
+        if target[0] != _ENVELOPE_VERSION:
+            raise ValueError(f'Unsupported envelope version: {target[0]}')
+
+        header_size = 1 + self._private_key.key_size // 8
+        header = target[:header_size]
+        nonce = target[header_size:header_size + _NONCE_SIZE]
+
+        return self._unwrap_data_key(header[1:]).decrypt(nonce, target[header_size + _NONCE_SIZE:], header)
+
+    def needs_reencryption(self, message: Union[bytes, str], *, as_hex: bool = True) -> bool:
+        """ Check if the message is still encrypted in the legacy format, i.e., with the permanent key pair """
+        self._assert_cryptographic_capabilities()
+
+        target = message.encode() if isinstance(message, str) else message
+
+        return self._is_legacy_ciphertext(b64decode(target) if as_hex else target)
+
+    def _is_legacy_ciphertext(self, data: bytes) -> bool:
+        # NOTE: The RSA-OAEP ciphertexts are exactly as long as the modulus and the envelopes are always longer.
+        return len(data) == self._private_key.key_size // 8
 
-        decrypted_message = self._private_key.decrypt(
-            b64decode(target) if as_hex else target,
+    def _get_data_key(self) -> Tuple[AESGCM, bytes]:
+        """ Get the current data key (as the cipher) and its wrapped form, rotated after its usage limit """
+        with self._data_key_lock:
+            if self._data_key is None or self._data_key_usage_count >= _DATA_KEY_USAGE_LIMIT:
+                data_key = AESGCM.generate_key(bit_length=_DATA_KEY_SIZE)
+                self._data_key = (AESGCM(data_key), self._encrypt_with_public_key(data_key))
+                self._data_key_usage_count = 0
+
+            self._data_key_usage_count += 1
+
+            return self._data_key
+
+    def _make_cipher(self, wrapped_data_key: bytes) -> AESGCM:
+        return AESGCM(self._decrypt_with_private_key(wrapped_data_key))
+
+    def _encrypt_with_public_key(self, data: bytes) -> bytes:
+        return self._public_key.encrypt(
+            data,
             padding.OAEP(
                 mgf=padding.MGF1(algorithm=hashes.SHA256()),
                 algorithm=hashes.SHA256(),
@@ -122,4 +367,12 @@ class Enigma:
             )
         )
 
-        return decrypted_message
+    def _decrypt_with_private_key(self, data: bytes) -> bytes:
+        return self._private_key.decrypt(
+            data,
+            padding.OAEP(
+                mgf=padding.MGF1(algorithm=hashes.SHA256()),
+                algorithm=hashes.SHA256(),
+                label=None
+            )
+        )
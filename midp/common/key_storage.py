@@ -1,11 +1,9 @@
-import asyncio
 import json
 from time import time
 from typing import Any, Optional, Dict, List, Union
 
 from imagination.decorator.service import Service
 from pydantic import BaseModel
-from sqlalchemy import text
 
 from midp.log_factory import midp_logger
 from midp.common.rds import DataStore
@@ -36,17 +34,8 @@ class KeyStorage:
     def get_pk_params(self, key: str) -> Dict[str, Any]:
         return dict(k=key)
 
-    async def async_get(self, key: str) -> Any:
-        return await asyncio.to_thread(self.get, key)
-
-    def get(self, key: str) -> Any:
-        params = self.get_pk_params(key)
-        params.update(dict(current_time=int(time())))
-
-        values = [
-            row.v
-            for row in self._datastore.execute(
-                f"""
+    def _make_get_query(self) -> str:
+        return f"""
                 SELECT v
                 FROM {self._table_name}
                 WHERE ({self.get_pk_condition()})
@@ -55,73 +44,129 @@ class KeyStorage:
                         OR expiry_timestamp > :current_time
                     )
                 LIMIT 1
-                """,
-                params
-            )
+                """
+
+    def _make_delete_query(self) -> str:
+        return f"""
+                DELETE FROM {self._table_name}
+                WHERE ({self.get_pk_condition()})
+                    OR expiry_timestamp <= :current_time
+                """
+
+    def _make_insert_query(self) -> str:
+        pk_placeholders = ', '.join([f':{c_name}' for c_name in self.get_pk_columns()])
+        return f"""
+                INSERT INTO {self._table_name} ({', '.join(self.get_pk_columns())}, v, expiry_timestamp)
+                VALUES ({pk_placeholders}, {self._datastore.make_cast(':v', 'jsonb')}, :expiry_timestamp)
+                ON CONFLICT DO NOTHING
+                """
+
+    def _make_update_query(self) -> str:
+        return f"""
+                UPDATE {self._table_name}
+                SET v = {self._datastore.make_cast(':v', 'jsonb')},
+                    expiry_timestamp = :expiry_timestamp
+                WHERE ({self.get_pk_condition()})
+                """
+
+    def _make_entry_params(self, entry: Entry) -> Dict[str, Any]:
+        params = self.get_pk_params(entry.key)
+        params.update(dict(v=json.dumps(entry.value), current_time=int(time()), expiry_timestamp=entry.expiry_timestamp))
+        return params
+
+    async def async_get(self, key: str, read_only: bool = True) -> Any:
+        params = self.get_pk_params(key)
+        params.update(dict(current_time=int(time())))
+
+        values = [
+            self._datastore.read_json(row.v)
+            async for row in self._datastore.async_execute(self._make_get_query(), params, read_only=read_only)
+        ]
+
+        return values[0] if values else None
+
+    def get(self, key: str, read_only: bool = True) -> Any:
+        """ Get the value of the given key
+
+            :param read_only: Flag to allow reading from a read replica. Set this to ``False`` when the value has
+                              to reflect the latest write, e.g., a state which is updated by another request.
+        """
+        params = self.get_pk_params(key)
+        params.update(dict(current_time=int(time())))
+
+        values = [
+            self._datastore.read_json(row.v)
+            for row in self._datastore.execute(self._make_get_query(), params, read_only=read_only)
         ]
 
         return values[0] if values else None
 
     async def async_delete(self, key: str):
-        await asyncio.to_thread(self.delete, key)
+        """ Delete the given key or the expired keys """
+        params = self.get_pk_params(key)
+        params.update(dict(current_time=int(time())))
+
+        await self._datastore.async_execute_without_result(self._make_delete_query(), params)
 
     def delete(self, key: str):
         """ Delete the given key or the expired keys """
         params = self.get_pk_params(key)
         params.update(dict(current_time=int(time())))
 
-        self._datastore.execute_without_result(
-            f"""
-            DELETE FROM {self._table_name}
-            WHERE ({self.get_pk_condition()})
-                OR expiry_timestamp <= :current_time
-            """,
-            params
-        )
+        self._datastore.execute_without_result(self._make_delete_query(), params)
 
     async def async_set(self, key: str, value: Any, expiry_timestamp: Optional[int] = None):
-        await asyncio.to_thread(self.set, key, value, expiry_timestamp)
+        await self.async_batch_set(Entry(key=key,
+                                         value=value,
+                                         expiry_timestamp=int(expiry_timestamp) if expiry_timestamp else None))
 
-    def batch_set(self, *entries: Entry):
-        with self._datastore.connect() as c:
+    async def async_batch_set(self, *entries: Entry):
+        async with self._datastore.async_in_session() as session:
             for entry in entries:
-                serialized_value = json.dumps(entry.value)
+                params = self._make_entry_params(entry)
+
+                insert_ok = await session.execute_without_result(self._make_insert_query(),
+                                                                 params,
+                                                                 suppress_error=False) == 1
+
+                if not insert_ok:
+                    self._log.debug(
+                        f'{self._table_name}: Unable to ADD {self.get_pk_params(entry.key)} = {params["v"]} '
+                        + (f'with expiry on {entry.expiry_timestamp}' if entry.expiry_timestamp else ''))
+
+                    update_ok = await session.execute_without_result(self._make_update_query(),
+                                                                     params,
+                                                                     suppress_error=False) > 0
+
+                    if not update_ok:
+                        raise RuntimeError(
+                            f'{self._table_name}: Unable to UPDATE {self.get_pk_params(entry.key)} = {params["v"]} '
+                            + (f'with expiry on {entry.expiry_timestamp}' if entry.expiry_timestamp else ''))
+            await session.commit()
 
-                params = self.get_pk_params(entry.key)
-                params.update(dict(v=serialized_value, current_time=int(time()), expiry_timestamp=entry.expiry_timestamp))
+    def batch_set(self, *entries: Entry):
+        with self._datastore.in_session() as session:
+            for entry in entries:
+                params = self._make_entry_params(entry)
 
-                insert_ok = c.execute(
-                    text(
-                        f"""
-                            INSERT INTO {self._table_name} ({', '.join(self.get_pk_columns())}, v, expiry_timestamp)
-                            VALUES ({', '.join([f':{c_name}' for c_name in self.get_pk_columns()])}, (:v)::jsonb, :expiry_timestamp)
-                            ON CONFLICT DO NOTHING
-                            """),
-                    params
-                ).rowcount == 1
+                insert_ok = session.execute_without_result(self._make_insert_query(),
+                                                           params,
+                                                           suppress_error=False) == 1
 
                 if not insert_ok:
                     self._log.debug(
-                        f'{self._table_name}: Unable to ADD {self.get_pk_params(entry.key)} = {serialized_value} '
+                        f'{self._table_name}: Unable to ADD {self.get_pk_params(entry.key)} = {params["v"]} '
                         + (f'with expiry on {entry.expiry_timestamp}' if entry.expiry_timestamp else ''))
 
-                    update_ok = c.execute(
-                        text(
-                            f"""
-                                UPDATE {self._table_name}
-                                SET v = (:v)::jsonb,
-                                    expiry_timestamp = :expiry_timestamp
-                                WHERE ({self.get_pk_condition()})
-                                """
-                        ),
-                        params
-                    ).rowcount > 0
+                    update_ok = session.execute_without_result(self._make_update_query(),
+                                                               params,
+                                                               suppress_error=False) > 0
 
                     if not update_ok:
                         raise RuntimeError(
-                            f'{self._table_name}: Unable to UPDATE {self.get_pk_params(entry.key)} = {serialized_value} '
+                            f'{self._table_name}: Unable to UPDATE {self.get_pk_params(entry.key)} = {params["v"]} '
                             + (f'with expiry on {entry.expiry_timestamp}' if entry.expiry_timestamp else ''))
-            c.commit()
+            session.commit()
 
     def set(self, key: str, value: Any, expiry_timestamp: Optional[int] = None):
         self.batch_set(Entry(key=key, value=value, expiry_timestamp=int(expiry_timestamp) if expiry_timestamp else None))
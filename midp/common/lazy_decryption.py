@@ -0,0 +1,91 @@
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from pydantic import BaseModel, PrivateAttr, SerializationInfo, model_serializer
+
+_NOT_DECRYPTED = object()
+
+
+class SealedValue:
+    """ The encrypted data of a property, decrypted at most once on demand """
+
+    __slots__ = ('_data', '_decrypt', '_decrypted_data')
+
+    def __init__(self, data: Any, decrypt: Callable[[Any], Any]):
+        self._data = data
+        self._decrypt = decrypt
+        self._decrypted_data: Any = _NOT_DECRYPTED
+
+    def open(self) -> Any:
+        if self._decrypted_data is _NOT_DECRYPTED:
+            self._decrypted_data = self._decrypt(self._data)
+        return self._decrypted_data
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        # NOTE: The copies of the model (e.g., from the entity cache) share the result of the decryption.
+        return self
+
+
+class LazyDecryptionMixin(BaseModel):
+    """ Model with the encrypted properties decrypted on the first access
+
+        The DAO leaves the encrypted properties unset and keeps their data sealed. A sealed property is decrypted when
+        it is read, when the model is serialized, or when the model is compared.
+    """
+
+    _sealed_values: Dict[str, SealedValue] = PrivateAttr(default_factory=dict)
+
+    def unseal(self, property_names: Optional[Iterable[str]] = None):
+        """ Decrypt the sealed properties (by default, all of them) which are not overridden yet """
+        sealed_values = self._sealed_values
+
+        if not sealed_values:
+            return
+
+        remaining_sealed_values = dict()
+
+        for property_name, sealed_value in sealed_values.items():
+            if property_names is not None and property_name not in property_names:
+                remaining_sealed_values[property_name] = sealed_value
+            elif property_name not in self.__dict__:
+                self.__dict__[property_name] = sealed_value.open()
+
+        # NOTE: The shallow copies of the model share the dictionary, so it is replaced instead of being modified.
+        self._sealed_values = remaining_sealed_values
+
+    def __getattr__(self, item: str) -> Any:
+        private_attributes = object.__getattribute__(self, '__pydantic_private__')
+        sealed_values = private_attributes.get('_sealed_values') if private_attributes else None
+
+        if sealed_values and item in sealed_values:
+            value = self.__dict__[item] = sealed_values[item].open()
+            private_attributes['_sealed_values'] = {k: v for k, v in sealed_values.items() if k != item}
+            return value
+
+        return super().__getattr__(item)
+
+    def __eq__(self, other: Any) -> bool:
+        self.unseal()
+        if isinstance(other, LazyDecryptionMixin):
+            other.unseal()
+        return super().__eq__(other)
+
+    @model_serializer(mode='wrap')
+    def _serialize_unsealed(self, handler, info: SerializationInfo):
+        # NOTE: Only the properties to serialize are decrypted, e.g., not the ones dropped with "exclude".
+        self.unseal([
+            property_name
+            for property_name in self._sealed_values
+            if (info.include is None or property_name in info.include)
+            and not _is_excluded(property_name, info.exclude)
+        ])
+        return handler(self)
+
+
+def _is_excluded(property_name: str, exclude: Any) -> bool:
+    """ Check if the property is excluded entirely, i.e., not only some of its items """
+    if isinstance(exclude, dict):
+        return exclude.get(property_name) in (True, ...)
+    return exclude is not None and property_name in exclude
@@ -0,0 +1,154 @@
+import asyncio
+import hashlib
+import hmac
+import multiprocessing
+import os
+from base64 import b64encode, b64decode
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from typing import Optional
+
+from imagination.decorator.config import EnvironmentVariable
+from imagination.decorator.service import Service
+
+from midp.log_factory import midp_logger_for
+
+_SALT_SIZE = 16
+_HASH_SIZE = 32
+
+
+def _scrypt(password: str, salt: bytes, cost: int, block_size: int, parallelism: int) -> bytes:
+    """ Derive the hash (in the worker processes) """
+    n = 2 ** cost
+    return hashlib.scrypt(password.encode(),
+                          salt=salt,
+                          n=n,
+                          r=block_size,
+                          p=parallelism,
+                          maxmem=128 * block_size * (n + parallelism + 2) + 1024 * 1024,
+                          dklen=_HASH_SIZE)
+
+
+@Service(params=[
+    EnvironmentVariable('MINI_IDP_PASSWORD_HASH_COST',
+                        parse_value=lambda v: int(v) if v else None,
+                        default=15,
+                        allow_default=True,
+                        name='cost'),
+    EnvironmentVariable('MINI_IDP_PASSWORD_HASH_BLOCK_SIZE',
+                        parse_value=lambda v: int(v) if v else None,
+                        default=8,
+                        allow_default=True,
+                        name='block_size'),
+    EnvironmentVariable('MINI_IDP_PASSWORD_HASH_PARALLELISM',
+                        parse_value=lambda v: int(v) if v else None,
+                        default=1,
+                        allow_default=True,
+                        name='parallelism'),
+    EnvironmentVariable('MINI_IDP_PASSWORD_HASH_WORKER_COUNT',
+                        parse_value=lambda v: int(v) if v else None,
+                        default=None,
+                        allow_default=True,
+                        name='worker_count'),
+])
+class PasswordHasher:
+    """ Hash the passwords with scrypt in a pool of worker processes
+
+        The hashes are encoded as ``$scrypt$ln=<cost>,r=<block size>,p=<parallelism>$<salt>$<hash>``, so the hashes
+        computed with another cost are still verified (see :meth:`needs_rehash`).
+
+        The hashing is CPU- and memory-bound, so it runs in the worker processes to keep the event loop and the
+        thread pools free. The pool is bounded and only started on the first use.
+    """
+
+    def __init__(self,
+                 cost: int = 15,
+                 block_size: int = 8,
+                 parallelism: int = 1,
+                 worker_count: Optional[int] = None):
+        """
+        :param cost: The base-2 logarithm of the CPU/memory cost, e.g., 15 for 32 MiB with the block size of 8
+        :param block_size: The block size
+        :param parallelism: The parallelization factor
+        :param worker_count: The maximum number of worker processes (by default, the number of CPUs shared by the
+                             uvicorn workers, i.e., ``WEB_CONCURRENCY``)
+        """
+        self._log = midp_logger_for(self)
+        self._cost = cost
+        self._block_size = block_size
+        self._parallelism = parallelism
+        self._worker_count = worker_count or max(1, (os.cpu_count() or 1) // int(os.getenv('WEB_CONCURRENCY') or 1))
+        # NOTE: No password derives the all-zero hash in practice, but verifying it costs the same as the real ones.
+        self._dummy_hash = self._encode(bytes(_SALT_SIZE), bytes(_HASH_SIZE), cost, block_size, parallelism)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = Lock()
+
+    @property
+    def dummy_hash(self) -> str:
+        """ The hash to verify when there is none, e.g., for an unknown user, to take as long as the real ones """
+        return self._dummy_hash
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # NOTE: The worker processes are spawned, not forked, as the service runs the threads.
+                self._executor = ProcessPoolExecutor(max_workers=self._worker_count,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    @staticmethod
+    def _encode(salt: bytes, hashed_password: bytes, cost: int, block_size: int, parallelism: int) -> str:
+        return (f'$scrypt$ln={cost},r={block_size},p={parallelism}'
+                f'${b64encode(salt).decode()}${b64encode(hashed_password).decode()}')
+
+    @staticmethod
+    def _decode(password_hash: str):
+        _, algorithm, raw_params, salt, hashed_password = password_hash.split('$')
+
+        if algorithm != 'scrypt':
+            raise ValueError(f'Unsupported password hash algorithm: {algorithm}')
+
+        params = dict(p.split('=') for p in raw_params.split(','))
+
+        return b64decode(salt), b64decode(hashed_password), int(params['ln']), int(params['r']), int(params['p'])
+
+    def hash(self, password: str) -> str:
+        salt = os.urandom(_SALT_SIZE)
+        params = (self._cost, self._block_size, self._parallelism)
+        hashed_password = self._get_executor().submit(_scrypt, password, salt, *params).result()
+        return self._encode(salt, hashed_password, *params)
+
+    async def async_hash(self, password: str) -> str:
+        salt = os.urandom(_SALT_SIZE)
+        params = (self._cost, self._block_size, self._parallelism)
+        hashed_password = await asyncio.get_running_loop().run_in_executor(self._get_executor(),
+                                                                           _scrypt,
+                                                                           password,
+                                                                           salt,
+                                                                           *params)
+        return self._encode(salt, hashed_password, *params)
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        salt, expected_hash, *params = self._decode(password_hash)
+        return hmac.compare_digest(expected_hash,
+                                   self._get_executor().submit(_scrypt, password, salt, *params).result())
+
+    async def async_verify(self, password: str, password_hash: str) -> bool:
+        salt, expected_hash, *params = self._decode(password_hash)
+        hashed_password = await asyncio.get_running_loop().run_in_executor(self._get_executor(),
+                                                                           _scrypt,
+                                                                           password,
+                                                                           salt,
+                                                                           *params)
+        return hmac.compare_digest(expected_hash, hashed_password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """ Check if the hash was computed with other parameters than the configured ones """
+        _, _, *params = self._decode(password_hash)
+        return tuple(params) != (self._cost, self._block_size, self._parallelism)
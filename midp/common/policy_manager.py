@@ -1,8 +1,9 @@
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple, Any, Iterable
 
 from imagination.decorator.service import Service
 from pydantic import BaseModel, Field
 
+from midp.common.rds import DataStoreSession, AsyncDataStoreSession
 from midp.static_info import SELF_REFERENCE_URI
 from midp.iam.dao.client import ClientDao
 from midp.iam.dao.policy import PolicyDao
@@ -26,6 +27,13 @@ class PolicyResolution(BaseModel):
     policies: List[IAMPolicy] = Field(default_factory=list)
 
 
+# NOTE: The resolution only needs these properties of the actors, so the other columns are neither transferred nor
+#       decrypted, e.g., the client secret and the user password.
+_CLIENT_FIELDS = ['name']
+_ROLE_FIELDS = ['name']
+_USER_FIELDS = ['name', 'email', 'roles']
+
+
 @Service()
 class PolicyResolver(object):
     def __init__(self, client_dao: ClientDao, policy_dao: PolicyDao, role_dao: RoleDao, user_dao: UserDao):
@@ -40,8 +48,8 @@ class PolicyResolver(object):
                  /,
                  subjects: List[IAMPolicySubject],
                  resource_url: Optional[str] = None,
-                 scopes: Optional[List[str]] = None) -> PolicyResolution:
-        requested_scopes = set(scopes) if scopes else set()
+                 scopes: Optional[List[str]] = None,
+                 datastore_session: Optional[DataStoreSession] = None) -> PolicyResolution:
         resource_url = resource_url or self._self_reference_uri
 
         actors: List[IAMOAuthClient | IAMRole | IAMUser] = list()
@@ -51,48 +59,116 @@ class PolicyResolver(object):
             subject_type = subject.kind
 
             if subject_type == 'client':
-                client = self._client_dao.get(subject_id)
+                client = self._client_dao.get(subject_id,
+                                             datastore_session=datastore_session,
+                                             fields=_CLIENT_FIELDS)
                 if not client:
                     raise InvalidSubjectError(subject)
                 actors.append(client)
             elif subject_type == 'role':
-                role = self._role_dao.get(subject_id)
+                role = self._role_dao.get(subject_id, datastore_session=datastore_session, fields=_ROLE_FIELDS)
                 if not role:
                     raise InvalidSubjectError(subject)
                 actors.append(role)
             elif subject_type == 'user':
-                user = self._user_dao.get(subject_id)
+                user = self._user_dao.get(subject_id, datastore_session=datastore_session, fields=_USER_FIELDS)
                 if not user:
                     raise InvalidSubjectError(subject)
                 actors.append(user)
                 if user.roles:
-                    # iterator = self._role_dao.select(where='name IN :names', parameters=dict(names=user.roles))  # FIXME There is a bug with binding the list parameter.
-                    actors.extend(
-                        role
-                        for role in self._role_dao.select()
-                        if role.name in user.roles
-                    )
+                    roles = self._role_dao.get_many(user.roles,
+                                                    datastore_session=datastore_session,
+                                                    fields=_ROLE_FIELDS)
+                    actors.extend(roles[name] for name in user.roles if name in roles)
             else:
                 raise NotImplementedError(subject_type)
 
-        resolution = PolicyResolution(
-            subjects=[f'{type(actor).__name__}/{actor.name}' for actor in actors],
-        )
+        policy_search_condition, policy_search_params = self._make_policy_search_criteria(resource_url)
+        policies = self._policy_dao.select(policy_search_condition,
+                                           policy_search_params,
+                                           datastore_session=datastore_session)
+
+        return self._make_resolution(actors, policies, scopes)
+
+    async def async_evaluate(self,
+                             /,
+                             subjects: List[IAMPolicySubject],
+                             resource_url: Optional[str] = None,
+                             scopes: Optional[List[str]] = None,
+                             datastore_session: Optional[AsyncDataStoreSession] = None) -> PolicyResolution:
+        resource_url = resource_url or self._self_reference_uri
+
+        actors: List[IAMOAuthClient | IAMRole | IAMUser] = list()
+
+        for subject in subjects:
+            subject_id = subject.subject
+            subject_type = subject.kind
+
+            if subject_type == 'client':
+                client = await self._client_dao.async_get(subject_id,
+                                                         datastore_session=datastore_session,
+                                                         fields=_CLIENT_FIELDS)
+                if not client:
+                    raise InvalidSubjectError(subject)
+                actors.append(client)
+            elif subject_type == 'role':
+                role = await self._role_dao.async_get(subject_id,
+                                                     datastore_session=datastore_session,
+                                                     fields=_ROLE_FIELDS)
+                if not role:
+                    raise InvalidSubjectError(subject)
+                actors.append(role)
+            elif subject_type == 'user':
+                user = await self._user_dao.async_get(subject_id,
+                                                     datastore_session=datastore_session,
+                                                     fields=_USER_FIELDS)
+                if not user:
+                    raise InvalidSubjectError(subject)
+                actors.append(user)
+                if user.roles:
+                    roles = await self._role_dao.async_get_many(user.roles,
+                                                                datastore_session=datastore_session,
+                                                                fields=_ROLE_FIELDS)
+                    actors.extend(roles[name] for name in user.roles if name in roles)
+            else:
+                raise NotImplementedError(subject_type)
+
+        policy_search_condition, policy_search_params = self._make_policy_search_criteria(resource_url)
+        policies = [
+            policy
+            async for policy in self._policy_dao.async_select(policy_search_condition,
+                                                              policy_search_params,
+                                                              datastore_session=datastore_session)
+        ]
+
+        return self._make_resolution(actors, policies, scopes)
 
+    def _make_policy_search_criteria(self, resource_url: str) -> Tuple[str, Dict[str, Any]]:
         policy_search_condition = "resource = :resource_url"
         resource_url_for_policy_search = resource_url
         if resource_url.endswith('/'):
             policy_search_condition = "resource LIKE :resource_url"
             resource_url_for_policy_search += r'%'
 
+        return policy_search_condition, dict(resource_url=resource_url_for_policy_search)
+
+    def _make_resolution(self,
+                         actors: List[IAMOAuthClient | IAMRole | IAMUser],
+                         policies: Iterable[IAMPolicy],
+                         scopes: Optional[List[str]] = None) -> PolicyResolution:
+        requested_scopes = set(scopes) if scopes else set()
+
+        resolution = PolicyResolution(
+            subjects=[f'{type(actor).__name__}/{actor.name}' for actor in actors],
+        )
+
         policies_matched_by_subject: List[IAMPolicy] = []
 
         client_id_list = [client.name for client in actors if isinstance(client, IAMOAuthClient)]
         role_name_list = [role.name for role in actors if isinstance(role, IAMRole)]
         user_email_list = [user.email for user in actors if isinstance(user, IAMUser)]
 
-        for policy in self._policy_dao.select(policy_search_condition,
-                                              dict(resource_url=resource_url_for_policy_search)):
+        for policy in policies:
             for policy_subject in policy.subjects:
                 if (
                         policy_subject.kind == 'client' and policy_subject.subject in client_id_list
@@ -1,20 +1,216 @@
+import json
+import re
+import sys
 import traceback
 import uuid
-from contextlib import contextmanager
-from typing import Dict, Any, Union, List, Generator
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager, nullcontext
+from contextvars import ContextVar
+from functools import lru_cache
+from itertools import count
+from threading import Lock, Event, Thread
+from time import time, perf_counter
+from typing import Dict, Any, Union, List, Generator, Optional, AsyncGenerator, Deque, Iterable, Callable
 
 from imagination.decorator.config import EnvironmentVariable
 from imagination.decorator.service import Service
-from sqlalchemy import text, Engine, create_engine, Connection, Row
+from pydantic import BaseModel
+from sqlalchemy import text, Engine, create_engine, Connection, Row, TextClause, make_url, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncConnection, create_async_engine
 
 from midp.log_factory import midp_logger_for, midp_logger
 
 
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    return int(value) if value else None
+
+
+def _parse_float(value: Optional[str]) -> Optional[float]:
+    return float(value) if value else None
+
+
+def _parse_flag(value: Optional[str]) -> bool:
+    return (value or '').lower() in ('1', 'true')
+
+
+def _parse_list(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+def _parse_prepare_threshold(value: Optional[str]) -> Optional[int]:
+    if value and value.lower() in ('off', 'none'):
+        return -1  # Disabled
+    return _parse_int(value)
+
+
+@lru_cache(maxsize=1024)
+def _compile_text(query: str) -> TextClause:
+    """ Build the text clause once per distinct query
+
+        Text clauses are immutable, so the same object is safely shared between the sessions. This also lets
+        SQLAlchemy hit its compiled-statement cache without re-parsing the query for every execution.
+    """
+    return text(query)
+
+
+def _prepare_statement(query: str, parameters: Union[None, List[Dict[str, Any]], Dict[str, Any]] = None):
+    tc = _compile_text(query)
+    if parameters:
+        if isinstance(parameters, dict):
+            for k, v in parameters.items():
+                # The driver binds a list as an array (see DataStore.make_any) but neither a tuple nor a set.
+                if isinstance(v, (tuple, set)):
+                    parameters[k] = list(v)
+        elif isinstance(parameters, (list, tuple, set)):
+            for pdict in parameters:
+                for k, v in pdict.items():
+                    # The driver binds a list as an array (see DataStore.make_any) but neither a tuple nor a set.
+                    if isinstance(v, (tuple, set)):
+                        pdict[k] = list(v)
+    return tc, parameters
+
+
+current_route: ContextVar[Optional[str]] = ContextVar('midp.datastore.current_route', default=None)
+""" The route being handled, e.g., "GET /rest/clients/", for the slow-query log """
+
+_QUERY_LITERAL_PATTERNS = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),  # String literals
+    (re.compile(r'(?<![\w:.])\d+(?:\.\d+)?\b'), '?'),  # Numeric literals
+    (re.compile(r'\s+'), ' '),
+    (re.compile(r'\bIN \((?:\?, )*\?\)', re.IGNORECASE), 'IN (?)'),
+]
+
+
+@lru_cache(maxsize=1024)
+def fingerprint_query(query: str) -> str:
+    """ Normalize the query so that the statements of the same shape are counted together """
+    fingerprint = query
+    for pattern, replacement in _QUERY_LITERAL_PATTERNS:
+        fingerprint = pattern.sub(replacement, fingerprint)
+    return fingerprint.strip()
+
+
+def _find_query_origin() -> Optional[str]:
+    """ Find the closest caller outside this module, e.g., "ClientDao.select" """
+    frame = sys._getframe(1)
+
+    while frame:
+        module_name = frame.f_globals.get('__name__') or ''
+
+        if module_name.startswith('midp.') and module_name != __name__:
+            caller = frame.f_locals.get('self')
+            return (f'{type(caller).__name__}.{frame.f_code.co_name}'
+                    if caller is not None
+                    else f'{module_name}.{frame.f_code.co_qualname}')
+
+        frame = frame.f_back
+
+    return None
+
+
+class DataStoreQueryStats(BaseModel):
+    fingerprint: str
+    count: int
+    total_time: float  # in milliseconds
+    p50_time: float  # in milliseconds
+    p99_time: float  # in milliseconds
+    max_time: float  # in milliseconds
+
+
+class _QueryFingerprintStats:
+    def __init__(self, sample_size: int):
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.samples: Deque[float] = deque(maxlen=sample_size)
+
+
+class _QueryMonitor:
+    """ Keep track of the execution time of every statement per fingerprint
+
+        The percentiles are computed from the most recent samples of each fingerprint.
+    """
+
+    def __init__(self, slow_query_threshold: float, sample_size: int = 1000):
+        """
+        :param slow_query_threshold: The execution time (in milliseconds) above which the statement is logged.
+                                     (0 or less to disable the log.)
+        :param sample_size: The number of the most recent execution times kept per fingerprint
+        """
+        self._log = midp_logger('db.query')
+        self._lock = Lock()
+        self._slow_query_threshold = slow_query_threshold
+        self._sample_size = sample_size
+        self._stats: Dict[str, _QueryFingerprintStats] = dict()
+
+    def record(self, query: str, elapsed_time: float):
+        """ Record the execution time (in milliseconds) of the query """
+        fingerprint = fingerprint_query(query)
+
+        with self._lock:
+            stats = self._stats.get(fingerprint)
+            if stats is None:
+                stats = self._stats[fingerprint] = _QueryFingerprintStats(self._sample_size)
+            stats.count += 1
+            stats.total_time += elapsed_time
+            stats.max_time = max(stats.max_time, elapsed_time)
+            stats.samples.append(elapsed_time)
+
+        if 0 < self._slow_query_threshold <= elapsed_time:
+            self._log.warning(f'Slow query: {elapsed_time:.1f} ms (origin: {_find_query_origin()}, '
+                              f'route: {current_route.get()}): {fingerprint}')
+
+    @contextmanager
+    def measure(self, query: str):
+        starting_time = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(query, (perf_counter() - starting_time) * 1000)
+
+    def make_stats(self) -> List[DataStoreQueryStats]:
+        """ Summarize the statistics, the most time-consuming statements first """
+        with self._lock:
+            snapshot = [
+                (fingerprint, stats.count, stats.total_time, stats.max_time, sorted(stats.samples))
+                for fingerprint, stats in self._stats.items()
+            ]
+
+        return sorted(
+            [
+                DataStoreQueryStats(
+                    fingerprint=fingerprint,
+                    count=count,
+                    total_time=total_time,
+                    p50_time=samples[int(0.5 * (len(samples) - 1))],
+                    p99_time=samples[int(0.99 * (len(samples) - 1))],
+                    max_time=max_time,
+                )
+                for fingerprint, count, total_time, max_time, samples in snapshot
+            ],
+            key=lambda s: s.total_time,
+            reverse=True,
+        )
+
+
 class DataStoreSession:
-    def __init__(self, c: Connection):
+    def __init__(self, c: Connection, query_monitor: Optional[_QueryMonitor] = None, read_only: bool = False):
         self.__id = str(uuid.uuid4())
         self.__log = midp_logger(f'db.session.{self.__id}')
         self.__c = c
+        self.__query_monitor = query_monitor
+        self.__read_only = read_only
+        self.__commit_callbacks: List[Callable[[], None]] = list()
+
+    @property
+    def read_only(self) -> bool:
+        """ Flag if the session only reads the data, i.e., it never sees any uncommitted changes """
+        return self.__read_only
+
+    def call_after_commit(self, callback: Callable[[], None]):
+        """ Run the callback once the transaction is committed (never if it is rolled back) """
+        self.__commit_callbacks.append(callback)
 
     def execute_without_result(self,
                                query: str,
@@ -27,6 +223,7 @@ class DataStoreSession:
             affected_row_count = result.rowcount
         except Exception as e:
             self.__log.warning(f'Initiating the rollback...')
+            self.__commit_callbacks.clear()
             self.__c.rollback()
             self.__log.warning(f'Rollback complete')
 
@@ -42,38 +239,57 @@ class DataStoreSession:
 
     def execute(self,
                 query: str,
-                parameters: Union[None, List[Dict[str, Any]], Dict[str, Any]] = None) -> Generator[Row, Any, None]:
-        for row in self._execute(self.__c, query, parameters=parameters).fetchall():
-            yield row
+                parameters: Union[None, List[Dict[str, Any]], Dict[str, Any]] = None,
+                stream_batch_size: Optional[int] = None) -> Generator[Row, Any, None]:
+        """ Execute the query and yield the rows
+
+            When ``stream_batch_size`` is given, the rows are fetched through a server-side cursor, that many rows
+            at a time, instead of loading the whole result set into memory. The cursor is released as soon as the
+            generator is exhausted or closed.
+        """
+        if not stream_batch_size:
+            for row in self._execute(self.__c, query, parameters=parameters).fetchall():
+                yield row
+            return
+
+        result = self._execute(self.__c, query, parameters=parameters, stream_batch_size=stream_batch_size)
+        try:
+            for row in result:
+                yield row
+        finally:
+            result.close()
 
     # noinspection PyMethodMayBeStatic
     def _execute(self,
                  c: Connection,
                  query: str,
-                 parameters: Union[None, List[Dict[str, Any]], Dict[str, Any]] = None):
-        tc = text(query)
-        if parameters:
-            if isinstance(parameters, dict):
-                for k, v in parameters.items():
-                    # SQLAlchemy only expands the list if it is tuple. So, converting all List or Set objects to Tuples.
-                    if isinstance(v, (list, set)):
-                        parameters[k] = tuple(v)
-            elif isinstance(parameters, (list, tuple, set)):
-                for pdict in parameters:
-                    for k, v in pdict.items():
-                        # SQLAlchemy only expands the list if it is tuple. So, converting all List or Set objects to Tuples.
-                        if isinstance(v, (list, set)):
-                            pdict[k] = tuple(v)
-            return c.execute(tc, parameters)
-        else:
-            return c.execute(tc)
+                 parameters: Union[None, List[Dict[str, Any]], Dict[str, Any]] = None,
+                 stream_batch_size: Optional[int] = None):
+        tc, parameters = _prepare_statement(query, parameters)
+        execution_options = dict(yield_per=stream_batch_size) if stream_batch_size else None
+        with self.__query_monitor.measure(query) if self.__query_monitor else nullcontext():
+            if parameters:
+                return c.execute(tc, parameters, execution_options=execution_options)
+            else:
+                return c.execute(tc, execution_options=execution_options)
+
+    @property
+    def closed(self) -> bool:
+        return self.__c.closed
 
     def commit(self):
         self.__c.commit()
         self.__log.debug("Committed")
+        self._run_commit_callbacks()
+
+    def _run_commit_callbacks(self):
+        callbacks, self.__commit_callbacks = self.__commit_callbacks, list()
+        for callback in callbacks:
+            callback()
 
     def roll_back(self):
         self.__log.info("Rollback in progress")
+        self.__commit_callbacks.clear()
         self.__c.rollback()
         self.__log.warning("Rollback complete")
 
@@ -83,6 +299,307 @@ class DataStoreSession:
         self.__log.debug("Connection closed")
 
 
+class AsyncDataStoreSession:
+    """ The asyncio counterpart of :class:`DataStoreSession` """
+
+    def __init__(self, c: AsyncConnection, query_monitor: Optional[_QueryMonitor] = None, read_only: bool = False):
+        self.__id = str(uuid.uuid4())
+        self.__log = midp_logger(f'db.async_session.{self.__id}')
+        self.__c = c
+        self.__query_monitor = query_monitor
+        self.__read_only = read_only
+        self.__commit_callbacks: List[Callable[[], None]] = list()
+
+    @property
+    def read_only(self) -> bool:
+        """ Flag if the session only reads the data, i.e., it never sees any uncommitted changes """
+        return self.__read_only
+
+    def call_after_commit(self, callback: Callable[[], None]):
+        """ Run the callback once the transaction is committed (never if it is rolled back) """
+        self.__commit_callbacks.append(callback)
+
+    async def execute_without_result(self,
+                                     query: str,
+                                     parameters: Union[None, List[Dict[str, Any]], Dict[str, Any]] = None,
+                                     suppress_error: bool = True) -> int:
+        affected_row_count: int = 0
+        try:
+            result = await self._execute(self.__c, query, parameters=parameters)
+            # noinspection PyTypeChecker
+            affected_row_count = result.rowcount
+        except Exception as e:
+            self.__log.warning(f'Initiating the rollback...')
+            self.__commit_callbacks.clear()
+            await self.__c.rollback()
+            self.__log.warning(f'Rollback complete')
+
+            await self.close()
+
+            if suppress_error:
+                self.__log.warning(f'ATTENTION: The error is suppressed.')
+                traceback.print_exc()
+            else:
+                raise e
+
+        return affected_row_count
+
+    async def execute(self,
+                      query: str,
+                      parameters: Union[None, List[Dict[str, Any]], Dict[str, Any]] = None,
+                      stream_batch_size: Optional[int] = None) -> AsyncGenerator[Row, None]:
+        """ Execute the query and yield the rows (see :meth:`DataStoreSession.execute`) """
+        if not stream_batch_size:
+            for row in (await self._execute(self.__c, query, parameters=parameters)).fetchall():
+                yield row
+            return
+
+        result = await self._execute(self.__c, query, parameters=parameters, stream_batch_size=stream_batch_size)
+        try:
+            async for row in result:
+                yield row
+        finally:
+            await result.close()
+
+    # noinspection PyMethodMayBeStatic
+    async def _execute(self,
+                       c: AsyncConnection,
+                       query: str,
+                       parameters: Union[None, List[Dict[str, Any]], Dict[str, Any]] = None,
+                       stream_batch_size: Optional[int] = None):
+        tc, parameters = _prepare_statement(query, parameters)
+        with self.__query_monitor.measure(query) if self.__query_monitor else nullcontext():
+            if stream_batch_size:
+                return await c.stream(tc, parameters, execution_options=dict(yield_per=stream_batch_size))
+            elif parameters:
+                return await c.execute(tc, parameters)
+            else:
+                return await c.execute(tc)
+
+    @property
+    def closed(self) -> bool:
+        return self.__c.closed
+
+    async def commit(self):
+        await self.__c.commit()
+        self.__log.debug("Committed")
+        self._run_commit_callbacks()
+
+    def _run_commit_callbacks(self):
+        callbacks, self.__commit_callbacks = self.__commit_callbacks, list()
+        for callback in callbacks:
+            callback()
+
+    async def roll_back(self):
+        self.__log.info("Rollback in progress")
+        self.__commit_callbacks.clear()
+        await self.__c.rollback()
+        self.__log.warning("Rollback complete")
+
+    async def close(self):
+        if not self.__c.closed:
+            await self.__c.close()
+        self.__log.debug("Connection closed")
+
+
+class DataStorePoolStats(BaseModel):
+    pool_class: str
+    size: Optional[int] = None
+    checked_in: Optional[int] = None
+    checked_out: Optional[int] = None
+    overflow: Optional[int] = None
+    checkout_count: int = 0
+    checkout_timeout_count: int = 0
+    total_wait_time: float = 0.0  # in seconds
+    max_wait_time: float = 0.0  # in seconds
+
+
+class _PoolMonitor:
+    """ Keep track of the time spent on waiting for the connections from the pool """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._checkout_count = 0
+        self._checkout_timeout_count = 0
+        self._total_wait_time = 0.0
+        self._max_wait_time = 0.0
+
+    def record_checkout(self, wait_time: float):
+        with self._lock:
+            self._checkout_count += 1
+            self._total_wait_time += wait_time
+            self._max_wait_time = max(self._max_wait_time, wait_time)
+
+    def record_timeout(self, wait_time: float):
+        with self._lock:
+            self._checkout_timeout_count += 1
+            self._total_wait_time += wait_time
+            self._max_wait_time = max(self._max_wait_time, wait_time)
+
+    def make_stats(self, engine: Engine) -> DataStorePoolStats:
+        pool = engine.pool
+
+        with self._lock:
+            return DataStorePoolStats(
+                pool_class=type(pool).__name__,
+                # Only the queue-based pools can report these numbers.
+                size=pool.size() if hasattr(pool, 'size') else None,
+                checked_in=pool.checkedin() if hasattr(pool, 'checkedin') else None,
+                checked_out=pool.checkedout() if hasattr(pool, 'checkedout') else None,
+                overflow=pool.overflow() if hasattr(pool, 'overflow') else None,
+                checkout_count=self._checkout_count,
+                checkout_timeout_count=self._checkout_timeout_count,
+                total_wait_time=self._total_wait_time,
+                max_wait_time=self._max_wait_time,
+            )
+
+
+_CHANGE_CHANNEL = 'midp_entity_changes'
+""" The PostgreSQL channel of the change notifications (see :meth:`DataStore.publish_change`) """
+
+
+class _ChangeListener:
+    """ Listen to the change notifications on a dedicated connection in the background
+
+        The connection is detached from the pool, so it does not take a slot from the other queries. The background
+        thread only runs between :meth:`start` and :meth:`stop`, and only while there is any subscription.
+    """
+
+    def __init__(self, engine: Engine, retry_interval: float = 5.0):
+        self._log = midp_logger_for(self)
+        self._engine = engine
+        self._retry_interval = retry_interval
+        self._callbacks: Dict[str, List[Callable[[], None]]] = dict()
+        self._lock = Lock()
+        self._started = False
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+
+    def subscribe(self, table_name: str, callback: Callable[[], None]):
+        with self._lock:
+            self._callbacks.setdefault(table_name, []).append(callback)
+            self._start_thread()
+
+    def start(self):
+        with self._lock:
+            self._started = True
+            self._stop_event.clear()
+            self._start_thread()
+
+    def _start_thread(self):
+        """ Start the background thread if needed (with the lock held) """
+        if self._started and self._callbacks and self._thread is None:
+            self._thread = Thread(target=self._run, name='midp-change-listener', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            self._started = False
+            self._stop_event.set()
+            thread, self._thread = self._thread, None
+
+        if thread:
+            thread.join(timeout=self._retry_interval)
+
+    def _dispatch(self, table_name: Optional[str]):
+        """ Run the callbacks for the table, or for all tables if not given """
+        with self._lock:
+            callbacks = [
+                callback
+                for subscribed_table_name, table_callbacks in self._callbacks.items()
+                if table_name is None or subscribed_table_name == table_name
+                for callback in table_callbacks
+            ]
+
+        for callback in callbacks:
+            callback()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                raw_connection = self._engine.raw_connection()
+                raw_connection.detach()
+                c = raw_connection.driver_connection
+
+                try:
+                    c.rollback()
+                    c.autocommit = True
+                    c.execute(f'LISTEN {_CHANGE_CHANNEL}')
+
+                    self._log.debug(f'Listening to {_CHANGE_CHANNEL}')
+
+                    # Any change may have been missed while (re)connecting.
+                    self._dispatch(None)
+
+                    while not self._stop_event.is_set():
+                        for notification in c.notifies(timeout=1.0):
+                            self._dispatch(notification.payload)
+                finally:
+                    c.close()
+            except Exception as e:
+                self._log.warning(f'Lost the change notifications ({type(e).__name__}: {e}). '
+                                  f'Retrying in {self._retry_interval}s...')
+                self._stop_event.wait(self._retry_interval)
+
+
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    """ Let the readers run alongside the writer and wait for the lock instead of failing right away """
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA busy_timeout=5000')
+    cursor.close()
+
+
+class _DataSource:
+    """ The engines (and their pool monitors) of one database server """
+
+    def __init__(self, url: str, engine_options: Dict[str, Any]):
+        self.url = url
+        self.async_url = url
+        self.engine_options = engine_options
+
+        parsed_url = make_url(url)
+        if parsed_url.get_backend_name() == 'sqlite':
+            if parsed_url.get_driver_name() != 'aiosqlite':
+                self.async_url = parsed_url.set(drivername='sqlite+aiosqlite').render_as_string(hide_password=False)
+            if not parsed_url.database or parsed_url.database == ':memory:':
+                # NOTE: An in-memory database lives and dies with its only connection, so there is no pool to size.
+                self.engine_options = {k: v for k, v in engine_options.items() if not k.startswith('pool_')
+                                       and k != 'max_overflow'}
+
+        self.engine: Engine = create_engine(url, **self.engine_options)
+        self.pool_monitor = _PoolMonitor()
+
+        if self.engine.dialect.name == 'sqlite':
+            event.listen(self.engine, 'connect', _configure_sqlite_connection)
+
+        # NOTE: The async engine has its own pool and it is only created on demand, e.g., the CLI never needs it.
+        self.async_engine: Optional[AsyncEngine] = None
+        self.async_engine_lock = Lock()
+        self.async_pool_monitor = _PoolMonitor()
+
+    def get_async_engine(self) -> AsyncEngine:
+        if not self.async_engine:
+            with self.async_engine_lock:
+                if not self.async_engine:
+                    self.async_engine = create_async_engine(self.async_url, **self.engine_options)
+                    if self.async_engine.dialect.name == 'sqlite':
+                        event.listen(self.async_engine.sync_engine, 'connect', _configure_sqlite_connection)
+        return self.async_engine
+
+    def get_pool_stats(self) -> DataStorePoolStats:
+        return self.pool_monitor.make_stats(self.engine)
+
+    def get_async_pool_stats(self) -> Optional[DataStorePoolStats]:
+        return self.async_pool_monitor.make_stats(self.async_engine.sync_engine) if self.async_engine else None
+
+    async def dispose(self):
+        self.engine.dispose()
+        if self.async_engine:
+            await self.async_engine.dispose()
+
+
 @Service(params=[
     EnvironmentVariable('PSQL_BASE_URL'),
     EnvironmentVariable('PSQL_DBNAME'),
@@ -90,32 +607,295 @@ class DataStoreSession:
                         parse_value=lambda v: (v or '') in ('1', 'true'),
                         default=False,
                         allow_default=True),
+    EnvironmentVariable('PSQL_POOL_SIZE',
+                        parse_value=_parse_int,
+                        default=5,
+                        allow_default=True,
+                        name='pool_size'),
+    EnvironmentVariable('PSQL_POOL_MAX_OVERFLOW',
+                        parse_value=_parse_int,
+                        default=10,
+                        allow_default=True,
+                        name='pool_max_overflow'),
+    EnvironmentVariable('PSQL_POOL_TIMEOUT',
+                        parse_value=_parse_float,
+                        default=30.0,
+                        allow_default=True,
+                        name='pool_timeout'),
+    EnvironmentVariable('PSQL_POOL_RECYCLE',
+                        parse_value=_parse_int,
+                        default=-1,
+                        allow_default=True,
+                        name='pool_recycle'),
+    EnvironmentVariable('PSQL_POOL_PRE_PING',
+                        parse_value=_parse_flag,
+                        default=False,
+                        allow_default=True,
+                        name='pool_pre_ping'),
+    EnvironmentVariable('PSQL_STREAM_BATCH_SIZE',
+                        parse_value=_parse_int,
+                        default=1000,
+                        allow_default=True,
+                        name='stream_batch_size'),
+    EnvironmentVariable('PSQL_PREPARE_THRESHOLD',
+                        parse_value=_parse_prepare_threshold,
+                        default=1,
+                        allow_default=True,
+                        name='prepare_threshold'),
+    EnvironmentVariable('PSQL_REPLICA_BASE_URLS',
+                        parse_value=_parse_list,
+                        default=[],
+                        allow_default=True,
+                        name='replica_base_urls'),
+    EnvironmentVariable('PSQL_SLOW_QUERY_THRESHOLD_MS',
+                        parse_value=_parse_float,
+                        default=500.0,
+                        allow_default=True,
+                        name='slow_query_threshold'),
 ])
 class DataStore:
-    def __init__(self, base_url: str, db_name: str, verbose_enabled: bool):
+    def __init__(self,
+                 base_url: str,
+                 db_name: str,
+                 verbose_enabled: bool,
+                 pool_size: int = 5,
+                 pool_max_overflow: int = 10,
+                 pool_timeout: float = 30.0,
+                 pool_recycle: int = -1,
+                 pool_pre_ping: bool = False,
+                 stream_batch_size: int = 1000,
+                 prepare_threshold: int = 1,
+                 replica_base_urls: Optional[List[str]] = None,
+                 slow_query_threshold: float = 500.0):
+        """
+        :param pool_size: The number of connections to keep open in the pool
+        :param pool_max_overflow: The number of connections allowed to open on top of the pool size
+        :param pool_timeout: The number of seconds to wait for a connection before giving up
+        :param pool_recycle: The number of seconds before a connection is replaced. (-1 means never.)
+        :param pool_pre_ping: Flag to test the connection for liveness before using it
+        :param stream_batch_size: The number of rows to fetch at a time when streaming the result. (0 to disable.)
+        :param prepare_threshold: The number of times a statement is executed on a connection before the driver
+                                  turns it into a server-side prepared statement. (0 means always and -1 means never.)
+                                  This only applies to psycopg.
+        :param replica_base_urls: The base URLs of the read replicas of the same database. The read-only queries
+                                  are distributed across the replicas (round-robin) while the writes stay on the
+                                  primary. Each replica has its own pool with the same options as the primary.
+        :param slow_query_threshold: The execution time (in milliseconds) above which the statement is logged with
+                                     its caller and route. (0 to disable.)
+        """
         self._log = midp_logger_for(self)
-        self._engine: Engine = create_engine(
-            base_url + '/' + db_name,
+        self._url = base_url + '/' + db_name
+        self._engine_options: Dict[str, Any] = dict(
             echo=verbose_enabled,
+            pool_size=pool_size,
+            max_overflow=pool_max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
         )
 
-    def connect(self) -> Connection:
-        return self._engine.connect()
+        if make_url(self._url).get_driver_name() == 'psycopg':
+            # The generated statements are stable per DAO and per shape, e.g., "get by ID or name" or "get the value
+            # by the key", so the hot ones cross the threshold quickly and then skip the parse/plan phase.
+            self._engine_options['connect_args'] = dict(
+                prepare_threshold=None if prepare_threshold < 0 else prepare_threshold,
+            )
+
+        self._primary = _DataSource(self._url, self._engine_options)
+        self._replicas = [
+            _DataSource(replica_base_url + '/' + db_name, self._engine_options)
+            for replica_base_url in (replica_base_urls or [])
+        ]
+        self._replica_counter = count()
+        self._pool_size = pool_size
+        self._dialect = self._primary.engine.dialect.name
+        self._stream_batch_size = stream_batch_size
+        self._query_monitor = _QueryMonitor(slow_query_threshold)
+        self._change_listener = _ChangeListener(self._primary.engine)
+
+        self._log.debug(f'Pool: size={pool_size}, max_overflow={pool_max_overflow}, timeout={pool_timeout}s, '
+                        f'recycle={pool_recycle}s, pre_ping={pool_pre_ping}, replicas={len(self._replicas)}')
+
+    @property
+    def dialect(self) -> str:
+        """ The name of the SQL dialect, i.e., "postgresql" or "sqlite" """
+        return self._dialect
+
+    def publish_change(self, table_name: str, datastore_session: Optional[DataStoreSession] = None):
+        """ Notify all processes of a change in the table (see :meth:`subscribe_changes`)
+
+            Within the session, the notification is only delivered once the transaction is committed.
+
+            This only works with PostgreSQL. Otherwise, this does nothing.
+        """
+        if self._dialect != 'postgresql':
+            return
+
+        query = 'SELECT pg_notify(:channel, :table_name)'
+        params = dict(channel=_CHANGE_CHANNEL, table_name=table_name)
+
+        if datastore_session:
+            datastore_session.execute_without_result(query, params, suppress_error=False)
+        else:
+            self.execute_without_result(query, params)
+
+    async def async_publish_change(self, table_name: str, datastore_session: Optional[AsyncDataStoreSession] = None):
+        """ The asyncio counterpart of :meth:`publish_change` """
+        if self._dialect != 'postgresql':
+            return
+
+        query = 'SELECT pg_notify(:channel, :table_name)'
+        params = dict(channel=_CHANGE_CHANNEL, table_name=table_name)
+
+        if datastore_session:
+            await datastore_session.execute_without_result(query, params, suppress_error=False)
+        else:
+            await self.async_execute_without_result(query, params)
+
+    def subscribe_changes(self, table_name: str, callback: Callable[[], None]):
+        """ Run the callback whenever any process publishes a change in the table
+
+            The callback runs in the background thread listening to the notifications on a dedicated connection
+            (see :meth:`listen_to_changes`). It also runs whenever the listener has (re)connected as the changes in
+            the meantime are unknown.
+
+            This only works with PostgreSQL. Otherwise, this does nothing.
+        """
+        if self._dialect != 'postgresql':
+            return
+
+        self._change_listener.subscribe(table_name, callback)
+
+    def listen_to_changes(self):
+        """ Start listening to the change notifications in the background until :meth:`dispose`
+
+            This is only for the processes serving the requests, e.g., not for the command-line tools, as the
+            listener takes a thread and a dedicated connection.
+
+            This only works with PostgreSQL. Otherwise, this does nothing.
+        """
+        if self._dialect != 'postgresql':
+            return
+
+        self._change_listener.start()
+
+    def make_cast(self, expression: str, sql_type: str) -> str:
+        """ Cast the SQL expression to the given type in the current dialect, e.g., "(:v)::jsonb" """
+        if self._dialect == 'sqlite':
+            # NOTE: SQLite keeps JSON as text, so this only validates and minifies the value.
+            return f'json({expression})' if sql_type in ('json', 'jsonb') else f'CAST({expression} AS {sql_type})'
+        return f'({expression})::{sql_type}'
+
+    def make_any(self, expression: str, parameter_name: str) -> str:
+        """ Test the SQL expression against every item of the list parameter, e.g., "id = ANY(:ids)"
+
+            The parameter must be given through :meth:`write_list`.
+        """
+        if self._dialect == 'sqlite':
+            return f'{expression} IN (SELECT value FROM json_each(:{parameter_name}))'
+        return f'{expression} = ANY(:{parameter_name})'
+
+    def write_list(self, values: Iterable[Any]) -> Any:
+        """ Convert the values to the list parameter for :meth:`make_any`
+
+            The PostgreSQL driver binds a list as an array whereas SQLite takes the JSON text.
+        """
+        if self._dialect == 'sqlite':
+            return json.dumps(list(values))
+        return list(values)
+
+    def make_json_append(self, expression: str, parameter_name: str) -> str:
+        """ Append the JSON value of the parameter to the JSON array of the SQL expression """
+        if self._dialect == 'sqlite':
+            return f"json_insert({expression}, '$[#]', json(:{parameter_name}))"
+        return f'({expression}) || jsonb_build_array({self.make_cast(f":{parameter_name}", "jsonb")})'
+
+    def make_json_remove(self, expression: str, parameter_name: str) -> str:
+        """ Remove the item at the index given by the parameter from the JSON array of the SQL expression """
+        if self._dialect == 'sqlite':
+            return f"json_remove({expression}, '$[' || :{parameter_name} || ']')"
+        return f'({expression}) - CAST(:{parameter_name} AS integer)'
+
+    def make_json_array_length(self, expression: str) -> str:
+        """ Count the items of the JSON array of the SQL expression """
+        if self._dialect == 'sqlite':
+            return f'json_array_length({expression})'
+        return f'jsonb_array_length({expression})'
+
+    def read_json(self, value: Any) -> Any:
+        """ Parse the value of a JSON column
+
+            The PostgreSQL driver already parses JSONB columns whereas SQLite returns the raw JSON text.
+        """
+        if self._dialect == 'sqlite' and isinstance(value, (str, bytes)):
+            return json.loads(value)
+        return value
+
+    def _get_source(self, read_only: bool) -> _DataSource:
+        """ Pick the primary, or the next replica for the read-only queries if there is any """
+        if read_only and self._replicas:
+            return self._replicas[next(self._replica_counter) % len(self._replicas)]
+        return self._primary
+
+    def connect(self, read_only: bool = False) -> Connection:
+        """ Check out a connection
+
+            :param read_only: Flag to allow the connection to a read replica. The replicas may lag behind the
+                              primary, so this is only for the queries that do not need to read their own writes.
+        """
+        source = self._get_source(read_only)
+        starting_time = time()
+
+        try:
+            c = source.engine.connect()
+        except PoolTimeoutError:
+            source.pool_monitor.record_timeout(time() - starting_time)
+            self._log.warning(f'Timed out while waiting for a connection from the pool '
+                              f'({source.get_pool_stats().model_dump()})')
+            raise
+
+        source.pool_monitor.record_checkout(time() - starting_time)
+
+        return c
 
-    def session(self) -> DataStoreSession:
-        return DataStoreSession(self._engine.connect())
+    @property
+    def stream_batch_size(self) -> int:
+        return self._stream_batch_size
+
+    def get_pool_stats(self) -> DataStorePoolStats:
+        return self._primary.get_pool_stats()
+
+    def get_async_pool_stats(self) -> Optional[DataStorePoolStats]:
+        return self._primary.get_async_pool_stats()
+
+    def get_replica_pool_stats(self) -> List[Dict[str, Optional[DataStorePoolStats]]]:
+        return [
+            {
+                'sync': replica.get_pool_stats(),
+                'async': replica.get_async_pool_stats(),
+            }
+            for replica in self._replicas
+        ]
+
+    def get_query_stats(self) -> List[DataStoreQueryStats]:
+        return self._query_monitor.make_stats()
+
+    def session(self, read_only: bool = False) -> DataStoreSession:
+        return DataStoreSession(self.connect(read_only), self._query_monitor, read_only)
 
     @contextmanager
-    def in_session(self) -> Generator[DataStoreSession, Any, None]:
-        session = self.session()
-        yield session
-        session.close()
+    def in_session(self, read_only: bool = False) -> Generator[DataStoreSession, Any, None]:
+        session = self.session(read_only)
+        try:
+            yield session
+        finally:
+            session.close()
 
     def execute_without_result(self,
                                query: str,
                                parameters: Union[None, List[Dict[str, Any]], Dict[str, Any]] = None) -> int:
         with self.connect() as c:
-            session = DataStoreSession(c)
+            session = DataStoreSession(c, self._query_monitor)
             result = session.execute_without_result(query=query, parameters=parameters)
             session.commit()
 
@@ -123,7 +903,91 @@ class DataStore:
 
     def execute(self,
                 query: str,
-                parameters: Union[None, List[Dict[str, Any]], Dict[str, Any]] = None) -> Generator[Row, Any, None]:
-        with self.connect() as c:
-            for row in DataStoreSession(c).execute(query=query, parameters=parameters):
+                parameters: Union[None, List[Dict[str, Any]], Dict[str, Any]] = None,
+                stream_batch_size: Optional[int] = None,
+                read_only: bool = False) -> Generator[Row, Any, None]:
+        with self.connect(read_only) as c:
+            for row in DataStoreSession(c, self._query_monitor).execute(query=query,
+                                                                        parameters=parameters,
+                                                                        stream_batch_size=stream_batch_size):
                 yield row
+
+    async def async_connect(self, read_only: bool = False) -> AsyncConnection:
+        source = self._get_source(read_only)
+        starting_time = time()
+
+        try:
+            c = await source.get_async_engine().connect()
+        except PoolTimeoutError:
+            source.async_pool_monitor.record_timeout(time() - starting_time)
+            self._log.warning(f'Timed out while waiting for a connection from the async pool '
+                              f'({source.get_async_pool_stats().model_dump()})')
+            raise
+
+        source.async_pool_monitor.record_checkout(time() - starting_time)
+
+        return c
+
+    async def async_session(self, read_only: bool = False) -> AsyncDataStoreSession:
+        return AsyncDataStoreSession(await self.async_connect(read_only), self._query_monitor, read_only)
+
+    @asynccontextmanager
+    async def async_in_session(self, read_only: bool = False) -> AsyncGenerator[AsyncDataStoreSession, None]:
+        session = await self.async_session(read_only)
+        try:
+            yield session
+        finally:
+            await session.close()
+
+    async def async_execute_without_result(self,
+                                           query: str,
+                                           parameters: Union[None, List[Dict[str, Any]], Dict[str, Any]] = None
+                                           ) -> int:
+        async with self.async_in_session() as session:
+            result = await session.execute_without_result(query=query, parameters=parameters)
+            await session.commit()
+
+        return result
+
+    async def async_execute(self,
+                            query: str,
+                            parameters: Union[None, List[Dict[str, Any]], Dict[str, Any]] = None,
+                            stream_batch_size: Optional[int] = None,
+                            read_only: bool = False) -> AsyncGenerator[Row, None]:
+        async with self.async_in_session(read_only) as session:
+            async for row in session.execute(query=query,
+                                             parameters=parameters,
+                                             stream_batch_size=stream_batch_size):
+                yield row
+
+    def open_connections(self, connection_count: int):
+        """ Open the connections ahead of time on the primary and on every replica
+
+            The connections are returned to the pool right away, so this is capped by the pool size.
+        """
+        for source in [self._primary, *self._replicas]:
+            connections: List[Connection] = []
+            try:
+                for _ in range(min(connection_count, self._pool_size)):
+                    connections.append(source.engine.connect())
+            finally:
+                for c in connections:
+                    c.close()
+
+    async def async_open_connections(self, connection_count: int):
+        """ The asyncio counterpart of :meth:`open_connections` """
+        for source in [self._primary, *self._replicas]:
+            connections: List[AsyncConnection] = []
+            try:
+                for _ in range(min(connection_count, self._pool_size)):
+                    connections.append(await source.get_async_engine().connect())
+            finally:
+                for c in connections:
+                    await c.close()
+
+    async def dispose(self):
+        """ Release all pooled connections """
+        self._change_listener.stop()
+
+        for source in [self._primary, *self._replicas]:
+            await source.dispose()
@@ -0,0 +1,78 @@
+import asyncio
+from typing import Optional
+
+from imagination import container
+from imagination.decorator.config import EnvironmentVariable
+from imagination.decorator.service import Service
+from pydantic import BaseModel
+
+from midp.iam.dao.client import ClientDao
+from midp.iam.dao.user import UserDao
+from midp.log_factory import midp_logger_for
+
+
+class ReencryptionStatus(BaseModel):
+    complete: bool = False
+    reencrypted_count: int = 0
+    last_error: Optional[str] = None
+
+
+@Service(params=[
+    EnvironmentVariable('MINI_IDP_REENCRYPTION_ENABLED',
+                        parse_value=lambda v: (v or '').lower() in ('1', 'true'),
+                        default=False,
+                        allow_default=True,
+                        name='enabled'),
+    EnvironmentVariable('MINI_IDP_REENCRYPTION_BATCH_SIZE',
+                        parse_value=lambda v: int(v) if v else None,
+                        default=100,
+                        allow_default=True,
+                        name='batch_size'),
+    EnvironmentVariable('MINI_IDP_REENCRYPTION_RETRY_INTERVAL',
+                        parse_value=lambda v: float(v) if v else None,
+                        default=60.0,
+                        allow_default=True,
+                        name='retry_interval'),
+])
+class Reencryption:
+    """ Move the encrypted columns from the legacy RSA-OAEP ciphertexts to the envelopes in the background
+
+        See :meth:`Enigma.encrypt` and :meth:`AtomicDao.reencrypt`. This is idempotent, so it can run in every worker.
+    """
+
+    def __init__(self, enabled: bool = False, batch_size: int = 100, retry_interval: float = 60.0):
+        """
+        :param enabled: Flag to run the migration on startup
+        :param batch_size: The number of rows per transaction
+        :param retry_interval: The number of seconds to wait before running the migration again after a failure
+        """
+        self._log = midp_logger_for(self)
+        self._enabled = enabled
+        self._batch_size = batch_size
+        self._retry_interval = retry_interval
+        self._status = ReencryptionStatus()
+
+    @property
+    def status(self) -> ReencryptionStatus:
+        return self._status
+
+    async def async_run(self):
+        if not self._enabled:
+            return
+
+        while True:
+            try:
+                for dao_type in [UserDao, ClientDao]:
+                    dao = container.get(dao_type)
+                    # NOTE: The decryption of the legacy data is CPU-bound, so it runs off the event loop.
+                    self._status.reencrypted_count += await asyncio.to_thread(dao.reencrypt, self._batch_size)
+                break
+            except Exception as e:
+                self._status.last_error = f'{type(e).__name__}: {e}'
+                self._log.error(f'Failed to re-encrypt the data: {self._status.last_error}. '
+                                f'Retrying in {self._retry_interval}s...')
+                # NOTE: The failed batch is rolled back and the migration is idempotent, so it simply runs again.
+                await asyncio.sleep(self._retry_interval)
+
+        self._status.complete = True
+        self._log.info(f'Re-encrypted {self._status.reencrypted_count} value(s)')
@@ -0,0 +1,118 @@
+import hashlib
+import hmac
+import re
+from base64 import urlsafe_b64encode
+from typing import Dict, List, Optional, Tuple
+
+from cryptography.exceptions import InvalidTag
+from imagination.decorator.config import EnvironmentVariable
+from imagination.decorator.service import Service
+
+from midp.common.enigma import Enigma
+from midp.log_factory import midp_logger_for
+
+_FORMAT_VERSION = 's1'
+""" The version of the format of the encoded session IDs """
+
+_DERIVED_KEY_ID = 'default'
+""" The ID of the key derived from the key pair when no keys are configured """
+
+
+def _parse_keys(value: Optional[str]) -> Optional[List[Tuple[str, bytes]]]:
+    if not value:
+        return None
+
+    keys: List[Tuple[str, bytes]] = list()
+
+    for entry in value.split(','):
+        key_id, _, secret = entry.strip().partition(':')
+
+        if not re.fullmatch(r'[A-Za-z0-9_-]+', key_id) or not secret:
+            raise RuntimeError('MINI_IDP_SESSION_KEYS: Expected the comma-separated "<key ID>:<secret>" entries '
+                               'where the key IDs only consist of letters, digits, "_" and "-".')
+
+        keys.append((key_id, secret.encode()))
+
+    return keys
+
+
+@Service(params=[
+    EnvironmentVariable('MINI_IDP_SESSION_KEYS',
+                        parse_value=_parse_keys,
+                        default=None,
+                        allow_default=True,
+                        name='keys'),
+    EnvironmentVariable('MINI_IDP_SESSION_LEGACY_IDS_ACCEPTED',
+                        parse_value=lambda v: (v or 'true').lower() in ('1', 'true'),
+                        default=True,
+                        allow_default=True,
+                        name='legacy_ids_accepted'),
+])
+class SessionIdCodec:
+    """ Encode the session IDs for the cookies, signed with HMAC-SHA256
+
+        The encoded session ID is ``s1.<key ID>.<session ID>.<signature>``. The first key signs and all keys verify,
+        so a key is rotated by prepending the new one. Without any keys, one key is derived from the key pair.
+
+        The legacy session IDs, encrypted by :class:`Enigma`, are still accepted unless ``legacy_ids_accepted`` is
+        turned off.
+    """
+
+    def __init__(self,
+                 enigma: Enigma,
+                 keys: Optional[List[Tuple[str, bytes]]] = None,
+                 legacy_ids_accepted: bool = True):
+        """
+        :param keys: The pairs of the key ID and the secret, the signing key first
+        :param legacy_ids_accepted: Flag to accept the legacy session IDs
+        """
+        self._log = midp_logger_for(self)
+        self._enigma = enigma
+        self._keys = keys
+        self._keys_by_id: Optional[Dict[str, bytes]] = dict(keys) if keys else None
+        self._legacy_ids_accepted = legacy_ids_accepted
+
+    def _get_keys(self) -> List[Tuple[str, bytes]]:
+        if self._keys is None:
+            # NOTE: Derived on demand as the key pair is only required once the sessions are used.
+            self._keys = [(_DERIVED_KEY_ID, self._enigma.derive_key('midp:session-id'))]
+            self._keys_by_id = dict(self._keys)
+
+        return self._keys
+
+    @staticmethod
+    def _sign(key: bytes, payload: str) -> str:
+        return urlsafe_b64encode(hmac.new(key, payload.encode(), hashlib.sha256).digest()).rstrip(b'=').decode()
+
+    def encode(self, session_id: str) -> str:
+        key_id, key = self._get_keys()[0]
+        payload = f'{_FORMAT_VERSION}.{key_id}.{session_id}'
+
+        return f'{payload}.{self._sign(key, payload)}'
+
+    def decode(self, encoded_session_id: str) -> Optional[str]:
+        """ Verify the encoded session ID
+
+            :return: The session ID, or None if the encoded session ID is invalid
+        """
+        if encoded_session_id.startswith(f'{_FORMAT_VERSION}.'):
+            payload, _, signature = encoded_session_id.rpartition('.')
+            parts = payload.split('.', 2)
+
+            self._get_keys()
+            key = self._keys_by_id.get(parts[1]) if len(parts) == 3 else None
+
+            if key is None or not hmac.compare_digest(self._sign(key, payload), signature):
+                self._log.warning('Rejected the session ID with an unknown key or a mismatched signature')
+                return None
+
+            return parts[2]
+
+        if not self._legacy_ids_accepted:
+            return None
+
+        try:
+            return self._enigma.decrypt(encoded_session_id).decode()
+        except (ValueError, InvalidTag):
+            self._log.warning('Rejected the undecryptable legacy session ID')
+            return None
@@ -4,8 +4,8 @@ from uuid import uuid4
 
 from imagination.decorator.service import Service
 
-from midp.common.enigma import Enigma
 from midp.common.key_storage import KeyStorage
+from midp.common.session_id_codec import SessionIdCodec
 from midp.static_info import ACCESS_TOKEN_TTL
 
 
@@ -40,23 +40,25 @@ class Session:
     def save(self):
         self.__manager.save(self)
 
+    async def async_save(self):
+        await self.__manager.async_save(self)
+
     def __repr__(self):
         return f'<Session id={self.__id} data={self.__data}>'
 
 
 @Service()
 class SessionManager:
-    def __init__(self, enigma: Enigma, kv: KeyStorage):
-        self._enigma = enigma
+    def __init__(self, session_id_codec: SessionIdCodec, kv: KeyStorage):
+        self._session_id_codec = session_id_codec
         self._kv = kv
 
     def get_metadata(self, id: Optional[str] = None, encrypted_id: Optional[str] = None) -> Tuple[str, int]:
-        if id:
-            session_id = id
-        elif encrypted_id:
-            session_id = self._enigma.decrypt(encrypted_id).decode()
-        else:
-            session_id = str(uuid4())
+        """ Get the session ID and the expiry timestamp
+
+            A new session is started if the encoded session ID (``encrypted_id``) is invalid.
+        """
+        session_id = id or (self._session_id_codec.decode(encrypted_id) if encrypted_id else None) or str(uuid4())
 
         return session_id, time() + ACCESS_TOKEN_TTL
 
@@ -65,9 +67,21 @@ class SessionManager:
 
         return Session(manager=self,
                        id=session_id,
-                       encrypted_id=self._enigma.encrypt(session_id).decode(),
-                       data=self._kv.get(f'session:{session_id}') or dict(),
+                       encrypted_id=self._session_id_codec.encode(session_id),
+                       data=self._kv.get(f'session:{session_id}', read_only=False) or dict(),
+                       expires=expiry_timestamp)
+
+    async def async_load(self, id: Optional[str] = None, encrypted_id: Optional[str] = None) -> Session:
+        session_id, expiry_timestamp = self.get_metadata(id, encrypted_id)
+
+        return Session(manager=self,
+                       id=session_id,
+                       encrypted_id=self._session_id_codec.encode(session_id),
+                       data=await self._kv.async_get(f'session:{session_id}', read_only=False) or dict(),
                        expires=expiry_timestamp)
 
     def save(self, session: Session):
         self._kv.set(f'session:{session.id}', session.data, time() + ACCESS_TOKEN_TTL)
+
+    async def async_save(self, session: Session):
+        await self._kv.async_set(f'session:{session.id}', session.data, time() + ACCESS_TOKEN_TTL)
@@ -1,26 +1,42 @@
+import hashlib
+import re
 from copy import deepcopy
 from math import floor
 from time import time
-from typing import List, Any, Dict, Optional, Set
+from typing import List, Any, Dict, Optional, Set, FrozenSet
 
 from imagination.decorator.service import Service
 from jwt import ExpiredSignatureError, DecodeError
 from pydantic import BaseModel
 
+from midp.common.cache import LRUCache, CacheStats
 from midp.common.enigma import Enigma
-from midp.common.policy_manager import PolicyResolver
+from midp.common.policy_manager import PolicyResolver, PolicyResolution
+from midp.common.rds import DataStoreSession, AsyncDataStoreSession
 from midp.iam.dao.client import ClientDao
 from midp.iam.dao.policy import PolicyDao
 from midp.iam.dao.user import UserDao
 from midp.iam.models import IAMPolicySubject, IAMPolicy, IAMUser, IAMOAuthClient
 from midp.log_factory import midp_logger_for
-from midp.static_info import ACCESS_TOKEN_TTL, REFRESH_TOKEN_TTL, SELF_REFERENCE_URI
+from midp.static_info import ACCESS_TOKEN_TTL, REFRESH_TOKEN_TTL, SELF_REFERENCE_URI, TOKEN_CACHE_SIZE
 
 
 class InvalidTokenError(RuntimeError):
     pass
 
 
+def parse_scopes(raw_scopes: Optional[str]) -> FrozenSet[str]:
+    return frozenset(re.split(r'\s+', raw_scopes)) if raw_scopes else frozenset()
+
+
+class AccessClaims(Dict[str, Any]):
+    """ The verified claims of a token with the scopes parsed once """
+
+    def __init__(self, claims: Dict[str, Any], scopes: Optional[FrozenSet[str]] = None):
+        super().__init__(claims)
+        self.scopes = parse_scopes(claims.get('scope')) if scopes is None else scopes
+
+
 class TokenSet(BaseModel):
     access_claims: Dict[str, Any]
     access_token: Optional[str] = None
@@ -52,6 +68,10 @@ class TokenManager:
         if not self._self_reference_uri.endswith('/'):
             self._self_reference_uri += '/'
 
+        self._verified_tokens: Optional[LRUCache[AccessClaims]] = (
+            LRUCache(TOKEN_CACHE_SIZE, ACCESS_TOKEN_TTL) if TOKEN_CACHE_SIZE > 0 else None
+        )
+
     def _generate_token_set(self, access_claims: Dict[str, Any], refresh_claims: Dict[str, Any]) -> TokenSet:
         current_time = time()
 
@@ -71,15 +91,39 @@ class TokenManager:
     def create_token_set(self,
                          subject: IAMPolicySubject,
                          resource_url: Optional[str] = None,
-                         requested_scopes: Optional[List[str]] = None) -> TokenSet:
+                         requested_scopes: Optional[List[str]] = None,
+                         datastore_session: Optional[DataStoreSession] = None) -> TokenSet:
         resource_url = resource_url or self._self_reference_uri
 
         resolution = self._policy_resolver.evaluate(
             resource_url=resource_url,
             scopes=requested_scopes,
             subjects=[subject],
+            datastore_session=datastore_session,
         )
 
+        return self._make_token_set(subject, resource_url, resolution)
+
+    async def async_create_token_set(self,
+                                     subject: IAMPolicySubject,
+                                     resource_url: Optional[str] = None,
+                                     requested_scopes: Optional[List[str]] = None,
+                                     datastore_session: Optional[AsyncDataStoreSession] = None) -> TokenSet:
+        resource_url = resource_url or self._self_reference_uri
+
+        resolution = await self._policy_resolver.async_evaluate(
+            resource_url=resource_url,
+            scopes=requested_scopes,
+            subjects=[subject],
+            datastore_session=datastore_session,
+        )
+
+        return self._make_token_set(subject, resource_url, resolution)
+
+    def _make_token_set(self,
+                        subject: IAMPolicySubject,
+                        resource_url: str,
+                        resolution: PolicyResolution) -> TokenSet:
         granted_scopes: Set[str] = set()
         for policy in resolution.policies:
             granted_scopes.update(policy.scopes)
@@ -102,7 +146,25 @@ class TokenManager:
 
         return self._generate_token_set(access_claims, refresh_claims)
 
-    def parse_token(self, token: str, resource_url: Optional[str] = None):
+    def get_token_cache_stats(self) -> Optional[CacheStats]:
+        return self._verified_tokens.get_stats() if self._verified_tokens else None
+
+    def parse_token(self, token: str, resource_url: Optional[str] = None) -> AccessClaims:
+        """ Verify the token and return its claims
+
+            The verified claims are cached by the digest of the token and the audience until the token expires, so
+            the repeated requests with the same token skip the signature verification.
+        """
+        audience = resource_url or SELF_REFERENCE_URI
+        cache_key = (hashlib.sha256(token.encode()).digest(), audience) if self._verified_tokens else None
+
+        if cache_key:
+            cached_claims = self._verified_tokens.get(cache_key)
+
+            if cached_claims is not None:
+                # NOTE: Copied as the caller may modify the claims.
+                return AccessClaims(cached_claims, cached_claims.scopes)
+
         claims: Dict[str, Any] = dict()
 
         try:
@@ -110,7 +172,7 @@ class TokenManager:
                 self._enigma.decode(
                     token,
                     issuer=SELF_REFERENCE_URI,
-                    audience=resource_url or SELF_REFERENCE_URI,
+                    audience=audience,
                 )
             )
         except (DecodeError, ExpiredSignatureError) as e:
@@ -122,4 +184,10 @@ class TokenManager:
                 message = 'Token decode error'
             raise InvalidTokenError(message) from e
 
-        return claims
+        verified_claims = AccessClaims(claims)
+        expiry_time = claims.get('exp')
+
+        if cache_key and isinstance(expiry_time, (int, float)) and expiry_time > time():
+            self._verified_tokens.set(cache_key, verified_claims, ttl=expiry_time - time())
+
+        return AccessClaims(verified_claims, verified_claims.scopes)
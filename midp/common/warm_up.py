@@ -0,0 +1,105 @@
+import asyncio
+from time import time
+from typing import Optional
+
+from imagination import container
+from imagination.decorator.config import EnvironmentVariable
+from imagination.decorator.service import Service
+from pydantic import BaseModel
+
+from midp.common.enigma import Enigma
+from midp.common.policy_manager import PolicyResolver
+from midp.common.rds import DataStore
+from midp.common.session_manager import SessionManager
+from midp.common.token_manager import TokenManager
+from midp.iam.dao.client import ClientDao
+from midp.iam.dao.policy import PolicyDao
+from midp.iam.dao.role import RoleDao
+from midp.iam.dao.scope import ScopeDao
+from midp.log_factory import midp_logger_for
+from midp.oauth.access_evaluator import ClientAuthenticator
+from midp.oauth.user_authenticator import UserAuthenticator
+
+
+class WarmUpStatus(BaseModel):
+    ready: bool = False
+    attempt_count: int = 0
+    elapsed_time: Optional[float] = None  # in seconds
+    last_error: Optional[str] = None
+
+
+@Service(params=[
+    EnvironmentVariable('MINI_IDP_WARM_UP_CONNECTION_COUNT',
+                        parse_value=lambda v: int(v) if v else None,
+                        default=2,
+                        allow_default=True,
+                        name='connection_count'),
+    EnvironmentVariable('MINI_IDP_WARM_UP_RETRY_INTERVAL',
+                        parse_value=lambda v: float(v) if v else None,
+                        default=5.0,
+                        allow_default=True,
+                        name='retry_interval'),
+])
+class WarmUp:
+    """ Pay the cold-start costs before the worker takes any traffic
+
+        This opens the pooled connections, creates the services, loads the catalogs (scopes, roles, clients and
+        policies) and runs one sign/verify cycle.
+    """
+
+    def __init__(self, connection_count: int = 2, retry_interval: float = 5.0):
+        """
+        :param connection_count: The number of connections to open ahead of time per pool
+        :param retry_interval: The number of seconds to wait before trying again after a failure
+        """
+        self._log = midp_logger_for(self)
+        self._connection_count = connection_count
+        self._retry_interval = retry_interval
+        self._status = WarmUpStatus()
+
+    @property
+    def status(self) -> WarmUpStatus:
+        return self._status
+
+    async def async_run(self):
+        """ Warm up the worker, trying again until it succeeds """
+        starting_time = time()
+
+        while not self._status.ready:
+            self._status.attempt_count += 1
+
+            try:
+                # NOTE: Everything synchronous (including the CPU-bound signing) runs off the event loop.
+                await asyncio.to_thread(self._warm_up_synchronous_components)
+                await self._warm_up_asynchronous_components()
+            except Exception as e:
+                self._status.last_error = f'{type(e).__name__}: {e}'
+                self._log.error(f'Failed to warm up (attempt #{self._status.attempt_count}): '
+                                f'{self._status.last_error}')
+                await asyncio.sleep(self._retry_interval)
+                continue
+
+            self._status.elapsed_time = time() - starting_time
+            self._status.ready = True
+
+        self._log.info(f'Ready in {self._status.elapsed_time:.3f}s')
+
+    def _warm_up_synchronous_components(self):
+        for service_type in [ClientAuthenticator, UserAuthenticator, TokenManager, PolicyResolver, SessionManager]:
+            container.get(service_type)
+
+        datastore: DataStore = container.get(DataStore)
+        datastore.open_connections(self._connection_count)
+
+        enigma: Enigma = container.get(Enigma)
+        enigma.decode(enigma.encode({'sub': 'warm-up'}))
+
+    async def _warm_up_asynchronous_components(self):
+        datastore: DataStore = container.get(DataStore)
+        await datastore.async_open_connections(self._connection_count)
+
+        # NOTE: The token issuance reads the catalogs through the async path.
+        for dao_type in [ScopeDao, RoleDao, ClientDao, PolicyDao]:
+            dao = container.get(dao_type)
+            async for _ in dao.async_select():
+                pass
@@ -1,15 +1,17 @@
-import asyncio
 from copy import deepcopy
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Generator, AsyncGenerator, Annotated
 
+from fastapi import Depends, HTTPException
 from imagination import container
 from pydantic import BaseModel
 from starlette.requests import Request
 from starlette.responses import Response
 
+from midp.common.rds import DataStore, DataStoreSession, AsyncDataStoreSession
 from midp.common.renderer import TemplateRenderer
 from midp.common.session_manager import SessionManager, Session
-from midp.common.token_manager import TokenManager, InvalidTokenError
+from midp.common.token_manager import TokenManager, InvalidTokenError, AccessClaims, parse_scopes
+from midp.iam.models import PredefinedScope
 from midp.log_factory import midp_logger
 
 mod_logger = midp_logger("midp.common.web_helpers")
@@ -66,11 +68,50 @@ def get_basic_template_variables(request: Request) -> Dict[str, Any]:
 
 async def restore_session(request: Request) -> Session:
     session_manager: SessionManager = container.get(SessionManager)
-    session: Session = await asyncio.to_thread(session_manager.load, encrypted_id=request.cookies.get('sid'))
+    session: Session = await session_manager.async_load(encrypted_id=request.cookies.get('sid'))
 
     return session
 
 
+def use_datastore_session() -> Generator[DataStoreSession, None, None]:
+    """ Provide one datastore session (and one pooled connection) for the whole HTTP request
+
+        The changes are committed once the request is handled without errors. Otherwise, they are rolled back.
+    """
+    datastore: DataStore = container.get(DataStore)
+    with datastore.in_session() as session:
+        yield session
+        # NOTE: The session is closed early if a statement has failed and the transaction has been rolled back.
+        if not session.closed:
+            session.commit()
+
+
+async def use_async_datastore_session() -> AsyncGenerator[AsyncDataStoreSession, None]:
+    """ The asyncio counterpart of :func:`use_datastore_session` """
+    datastore: DataStore = container.get(DataStore)
+    async with datastore.async_in_session() as session:
+        yield session
+        if not session.closed:
+            await session.commit()
+
+
+def use_read_only_datastore_session() -> Generator[DataStoreSession, None, None]:
+    """ Provide one datastore session for the whole HTTP request which only reads the data
+
+        The session may be served by a read replica, which may lag behind the primary.
+    """
+    datastore: DataStore = container.get(DataStore)
+    with datastore.in_session(read_only=True) as session:
+        yield session
+
+
+async def use_async_read_only_datastore_session() -> AsyncGenerator[AsyncDataStoreSession, None]:
+    """ The asyncio counterpart of :func:`use_read_only_datastore_session` """
+    datastore: DataStore = container.get(DataStore)
+    async with datastore.async_in_session(read_only=True) as session:
+        yield session
+
+
 class MissingBearerToken(Exception):
     pass
 
@@ -103,4 +144,17 @@ def authenticate_with_bearer_token(request: Request) -> Dict[str, Any]:
         raise RuntimeError(f"Unexpected error: {type(e).__module__}.{type(e).__name__}: {e}") from e
 
 
+def authorize_privileged_access(access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)]
+                                ) -> Dict[str, Any]:
+    """ Only allow the bearer tokens with the privileged scopes, i.e., idp.root or idp.admin """
+    given_scopes = (access_claims.scopes
+                    if isinstance(access_claims, AccessClaims)
+                    else parse_scopes(access_claims.get('scope')))
+
+    if given_scopes.isdisjoint({PredefinedScope.IDP_ROOT.value.name, PredefinedScope.IDP_ADMIN.value.name}):
+        raise HTTPException(status_code=403)
+
+    return access_claims
+
+
 # def current_user(request: Request) -> Optional[Dict[str, Any]]:
@@ -1,11 +1,21 @@
 import json
+import re
 from dataclasses import is_dataclass, asdict
-from typing import Generic, TypeVar, Any, Dict, Optional, Generator, Callable, List, Type, Union, Tuple, Iterable
+from functools import lru_cache
+from types import UnionType
+from typing import Generic, TypeVar, Any, Dict, Optional, Generator, Callable, List, Type, Union, Tuple, Iterable, \
+    AsyncGenerator, Mapping, get_origin, get_args
 
-from pydantic import BaseModel
+from jsonpatch import JsonPatchConflict
+from pydantic import BaseModel, Field, TypeAdapter
+from sqlalchemy import Row
 
 from midp.log_factory import midp_logger_for
-from midp.common.rds import DataStore, DataStoreSession
+from midp.static_info import ENTITY_CACHE_TABLES, ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL
+from midp.common.cache import LRUCache, CacheStats
+from midp.common.lazy_decryption import LazyDecryptionMixin, SealedValue
+from midp.common.obj_patcher import PatchOperation, apply_changes
+from midp.common.rds import DataStore, DataStoreSession, AsyncDataStoreSession
 
 T = TypeVar('T')
 
@@ -18,6 +28,17 @@ class UpdateError(RuntimeError):
     pass
 
 
+class UnknownFieldError(RuntimeError):
+    pass
+
+
+class BulkWriteResult(BaseModel, Generic[T]):
+    inserted: List[T] = Field(default_factory=list)
+    updated: List[T] = Field(default_factory=list)
+    skipped: List[T] = Field(default_factory=list)
+    """ The objects which were not written due to conflicts """
+
+
 class _ColumnMapping(BaseModel):
     column_name: str
 
@@ -46,6 +67,63 @@ class _ColumnMapping(BaseModel):
     cast_to_sql_type: Optional[str] = None
     """ Set the casting type """
 
+    lazy: bool = False
+    """ Defer ``convert_to_property_data`` until the property is accessed
+
+        This only applies to the models with :class:`LazyDecryptionMixin`.
+    """
+
+
+_STATEMENT_CACHE_SIZE = 256
+""" The maximum number of generated statements kept per DAO """
+
+_BULK_WRITE_BATCH_SIZE = 500
+""" The default number of rows per multi-row statement """
+
+_CACHEABLE_ROW_COUNT = 1000
+""" The maximum number of rows of one result to keep in the entity cache """
+
+
+def _freeze(value: Any) -> Any:
+    """ Make the hashable equivalent of the value for the cache key """
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    elif isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    else:
+        return value
+
+
+@lru_cache(maxsize=None)
+def _get_type_adapter(annotation: Any) -> TypeAdapter:
+    return TypeAdapter(annotation)
+
+
+def _refers_to_model(annotation: Any) -> bool:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return True
+    return any(_refers_to_model(t) for t in get_args(annotation))
+
+
+def _make_trusted_converter(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    """ Make the function to convert the trusted data to the annotated type
+
+        :return: None if the data can be used as it is
+    """
+    if _refers_to_model(annotation):
+        # NOTE: Building the nested models in pydantic-core is faster than constructing them in Python.
+        return _get_type_adapter(annotation).validate_python
+
+    if get_origin(annotation) in (Union, UnionType):
+        types = [t for t in get_args(annotation) if t is not type(None)]
+        if types == [bool]:
+            # NOTE: SQLite stores the booleans as integers.
+            return lambda v: None if v is None else bool(v)
+    elif annotation is bool:
+        return bool
+
+    return None
+
 
 class AtomicDao(Generic[T]):
     def __init__(self, datastore: DataStore, model_class: Type[T], table_name: str):
@@ -56,9 +134,20 @@ class AtomicDao(Generic[T]):
         self._table_name = table_name
         self._column_mappings: Dict[str, _ColumnMapping] = dict()
         self._reverse_column_mappings: Dict[str, str] = dict()
+        self._statement_cache: Dict[Tuple[Any, ...], str] = dict()
+        self._row_mapper: Optional[Callable[[Mapping[str, Any]], T]] = None
+        self._cache: Optional[LRUCache[List[T]]] = None
+        self._encrypted_property_names: List[str] = list()
 
         self.map_all_automatically()
 
+        if table_name in ENTITY_CACHE_TABLES:
+            self.enable_cache(ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL)
+
+    @property
+    def table_name(self) -> str:
+        return self._table_name
+
     def map_all_automatically(self):
         for property_name in self._model_class.__annotations__.keys():
             self.map_column(property_name)
@@ -69,29 +158,61 @@ class AtomicDao(Generic[T]):
                    column_name: Optional[str] = None,
                    convert_to_property_data: Optional[Callable[[Any], Any]] = None,
                    convert_to_sql_data: Optional[Callable[[Any], Any]] = None,
-                   cast_to_sql_type: Optional[str] = None):
+                   cast_to_sql_type: Optional[str] = None,
+                   lazy: bool = False):
         """ Map a property to a column for the primary table. """
         column_name = column_name or property_name
         self._column_mappings[property_name] = _ColumnMapping(column_name=column_name or property_name,
                                                               convert_to_property_data=convert_to_property_data,
                                                               convert_to_sql_data=convert_to_sql_data,
-                                                              cast_to_sql_type=cast_to_sql_type)
+                                                              cast_to_sql_type=cast_to_sql_type,
+                                                              lazy=lazy)
         self._reverse_column_mappings[column_name] = property_name
+        self._statement_cache.clear()
+        self._row_mapper = None
         return self
 
+    def _get_statement(self, key: Tuple[Any, ...], make_statement: Callable[[], str]) -> str:
+        """ Get the generated statement for the given shape, or generate and remember it
+
+            Reusing the exact same SQL text keeps the compiled statements cached on the client side and lets the
+            driver prepare the hot queries on the server side.
+        """
+        statement = self._statement_cache.get(key)
+
+        if statement is None:
+            if len(self._statement_cache) >= _STATEMENT_CACHE_SIZE:
+                # Evict the oldest entry.
+                del self._statement_cache[next(iter(self._statement_cache))]
+
+            statement = self._statement_cache[key] = make_statement()
+
+        return statement
+
     def map_column_as_json(self, property_name: str, column_name: Optional[str] = None):
         """ Map a property to a JSON column for the primary table. """
         return self.map_column(property_name=property_name,
                                column_name=column_name,
                                convert_to_sql_data=lambda v: json.dumps(self._convert_to_serializable_obj(v)),
+                               # NOTE: Only SQLite returns the raw JSON text.
+                               convert_to_property_data=(self._datastore.read_json
+                                                         if self._datastore.dialect == 'sqlite'
+                                                         else None),
                                cast_to_sql_type='jsonb')
 
     def map_column_with_encryption(self, property_name: str, column_name: Optional[str] = None):
-        """ Map a property to a column with encryption. """
+        """ Map a property to a column with encryption.
+
+            With :class:`LazyDecryptionMixin`, the data is only decrypted when the property is accessed.
+        """
+        if property_name not in self._encrypted_property_names:
+            self._encrypted_property_names.append(property_name)
+
         return self.map_column(property_name=property_name,
                                column_name=column_name if column_name else f'encrypted_{property_name}',
                                convert_to_sql_data=self._encrypt_data,
-                               convert_to_property_data=self._decrypt_data)
+                               convert_to_property_data=self._decrypt_data,
+                               lazy=True)
 
     def _encrypt_data(self, data: Union[bytes, str]) -> str:
         raise NotImplementedError()
@@ -99,6 +220,10 @@ class AtomicDao(Generic[T]):
     def _decrypt_data(self, data: Union[bytes, str]) -> str:
         raise NotImplementedError()
 
+    def _needs_reencryption(self, data: Union[bytes, str]) -> bool:
+        """ Check if the encrypted data is in a legacy format (see :meth:`reencrypt`) """
+        return False
+
     def _convert_to_serializable_obj(self, given_value: Any) -> Any:
         """ Recursively convert the given value to a serializable object """
         if isinstance(given_value, dict):
@@ -121,26 +246,123 @@ class AtomicDao(Generic[T]):
     def from_dict(self, data: Dict[str, Any]) -> T:
         return self._model_class(**data)
 
-    def map_row(self, row: Dict[str, Any]) -> T:
-        """ Map a row from the cursor to a model object """
-        data = dict()
+    def map_row(self, row: Mapping[str, Any]) -> T:
+        """ Map a row from the cursor to a model object
 
-        for k, v in row.items():
-            if k not in self._reverse_column_mappings:
-                continue
-            property_name = self._reverse_column_mappings[k]
+            The rows are trusted as they are written by this DAO, so the model is built without validation. Only the
+            properties in the row are set, i.e., the model may be partial.
+        """
+        if self._row_mapper is None:
+            self._row_mapper = self._make_row_mapper()
+
+        return self._row_mapper(row)
+
+    def _make_row_mapper(self) -> Callable[[Mapping[str, Any]], T]:
+        """ Make the function to map a row, precompiled from the column mappings
+
+            The model is built like ``model_construct``, i.e., only the properties in the row are set and the missing
+            ones fall back to their defaults, but without the per-call overhead of ``model_construct``. Only the
+            nested models are still built by their validators (see :func:`_make_trusted_converter`).
+
+            The lazy columns (see :attr:`_ColumnMapping.lazy`) are sealed as they are, without any conversion.
+        """
+        model_class = self._model_class
+        post_init = model_class.__pydantic_post_init__
+        columns = []
+        lazy_columns = []
+        supports_lazy_conversion = issubclass(model_class, LazyDecryptionMixin)
+
+        for property_name, field in model_class.model_fields.items():
             cm = self._column_mappings.get(property_name)
-            data[property_name] = cm.convert_to_property_data(v) if cm.convert_to_property_data else v
 
-        return self._model_class(**data)
+            if cm and cm.lazy and cm.convert_to_property_data and supports_lazy_conversion:
+                lazy_columns.append((cm.column_name, property_name, cm.convert_to_property_data))
+                continue
 
-    def select(self,
-               where: Optional[str] = None,
-               parameters: Union[None, Dict[str, Any]] = None,
-               order_by: Optional[List[Iterable[str]]] = None,
-               limit: Optional[int] = None,
-               datastore_session: Optional[DataStoreSession] = None) -> Generator[T, None, None]:
-        query = f'SELECT * FROM {self._table_name}'
+            converters = [c for c in [cm and cm.convert_to_property_data, _make_trusted_converter(field.annotation)] if c]
+
+            columns.append((
+                cm.column_name if cm else None,
+                property_name,
+                converters[0] if len(converters) == 1 else (lambda v, c=converters: c[1](c[0](v))) if converters else None,
+                None if field.is_required() else field,
+            ))
+
+        new_object = object.__new__
+        set_attribute = object.__setattr__
+
+        def map_row(row: Mapping[str, Any]) -> T:
+            values = dict()
+            fields_set = set()
+
+            for column_name, property_name, convert, default_field in columns:
+                if column_name in row:
+                    value = row[column_name]
+                    values[property_name] = convert(value) if convert else value
+                    fields_set.add(property_name)
+                elif default_field:
+                    values[property_name] = default_field.get_default(call_default_factory=True)
+
+            sealed_values = dict()
+
+            for column_name, property_name, convert in lazy_columns:
+                if column_name in row:
+                    value = row[column_name]
+                    if value is None:
+                        values[property_name] = None
+                    else:
+                        sealed_values[property_name] = SealedValue(value, convert)
+                    fields_set.add(property_name)
+
+            obj = new_object(model_class)
+            set_attribute(obj, '__dict__', values)
+            set_attribute(obj, '__pydantic_fields_set__', fields_set)
+            set_attribute(obj, '__pydantic_extra__', None)
+            set_attribute(obj, '__pydantic_private__', None)
+
+            if post_init:
+                # Like model_construct, e.g., to initialize the private attributes.
+                obj.model_post_init(None)
+
+            if sealed_values:
+                obj.__pydantic_private__['_sealed_values'] = sealed_values
+
+            return obj
+
+        return map_row
+
+    def get_selectable_fields(self, fields: Optional[Iterable[str]]) -> Optional[Tuple[str, ...]]:
+        """ Validate the requested properties and always include the ID
+
+            :raises UnknownFieldError: when a property is not mapped to any column
+        """
+        if fields is None:
+            return None
+
+        unknown_fields = [field for field in fields if field not in self._column_mappings]
+        if unknown_fields:
+            raise UnknownFieldError(f'{self._model_class.__name__}: Unknown fields: {", ".join(unknown_fields)}')
+
+        selected_fields = [] if 'id' in fields or 'id' not in self._column_mappings else ['id']
+        selected_fields.extend(field for field in fields if field not in selected_fields)
+
+        return tuple(selected_fields)
+
+    def _make_select_query(self,
+                           where: Optional[str] = None,
+                           order_by: Optional[List[Iterable[str]]] = None,
+                           limit: Optional[int] = None,
+                           fields: Optional[Tuple[str, ...]] = None) -> str:
+        cache_key = ('select', where, tuple(tuple(order) for order in order_by) if order_by else None, limit, fields)
+        return self._get_statement(cache_key, lambda: self._generate_select_query(where, order_by, limit, fields))
+
+    def _generate_select_query(self,
+                               where: Optional[str] = None,
+                               order_by: Optional[List[Iterable[str]]] = None,
+                               limit: Optional[int] = None,
+                               fields: Optional[Tuple[str, ...]] = None) -> str:
+        columns = ', '.join(self._column_mappings[field].column_name for field in fields) if fields else '*'
+        query = f'SELECT {columns} FROM {self._table_name}'
 
         if where:
             query = f'{query} WHERE {where}'
@@ -166,76 +388,579 @@ class AtomicDao(Generic[T]):
         if limit:
             query = f'{query} LIMIT {limit}'
 
-        self._log.debug(f'RUN: {query} (params={parameters})')
+        return query
+
+    def _get_stream_batch_size(self, limit: Optional[int], stream_batch_size: Optional[int]) -> Optional[int]:
+        """ Decide how many rows to fetch at a time
+
+            A server-side cursor costs extra round trips, so the result is only streamed when it may be larger than
+            a single batch.
+        """
+        batch_size = stream_batch_size if stream_batch_size is not None else self._datastore.stream_batch_size
+
+        if not batch_size or (limit and limit <= batch_size):
+            return None
+
+        return batch_size
+
+    def select(self,
+               where: Optional[str] = None,
+               parameters: Union[None, Dict[str, Any]] = None,
+               order_by: Optional[List[Iterable[str]]] = None,
+               limit: Optional[int] = None,
+               datastore_session: Optional[DataStoreSession] = None,
+               stream_batch_size: Optional[int] = None,
+               fields: Optional[Iterable[str]] = None) -> Generator[T, None, None]:
+        """ Select the objects
+
+            The rows are streamed through a server-side cursor (see :meth:`_get_stream_batch_size`), so the memory
+            usage stays flat regardless of the size of the table.
+
+            Without ``datastore_session``, the query may be served by a read replica.
+
+            With ``fields``, only the columns of the given properties (and the ID) are selected, and the objects are
+            partial models. The columns not selected are not transferred nor converted, e.g.,
+            decrypted.
+
+            With the entity cache enabled for this DAO (see :meth:`enable_cache`), the results are served from
+            and kept in the cache, but not with a read-write ``datastore_session`` as it may see uncommitted changes.
+        """
+        fields = self.get_selectable_fields(fields)
+        cache_key = self._make_cache_key(where, parameters, order_by, limit, fields, datastore_session)
+        cached_objs = self._get_cached_objs(cache_key)
+        # NOTE: Taken before the query, so that the rows read before any invalidation in the meantime are not kept.
+        cache_generation = self._cache.generation if cache_key else None
+
+        if cached_objs is not None:
+            yield from cached_objs
+            return
+
+        query = self._make_select_query(where, order_by, limit, fields)
+        stream_batch_size = self._get_stream_batch_size(limit, stream_batch_size)
+
+        self._log.debug(f'RUN: {query} (params={parameters}, stream_batch_size={stream_batch_size})')
 
         cursor = (
-            datastore_session.execute(query, parameters=parameters)
+            datastore_session.execute(query, parameters=parameters, stream_batch_size=stream_batch_size)
+            if datastore_session
+            else self._datastore.execute(query,
+                                         parameters=parameters,
+                                         stream_batch_size=stream_batch_size,
+                                         read_only=True)
+        )
+
+        objs_to_cache = [] if cache_key else None
+
+        try:
+            for row in cursor:
+                # noinspection PyProtectedMember
+                obj = self.map_row(row._mapping)
+                objs_to_cache = self._collect_obj_to_cache(objs_to_cache, obj)
+                yield obj
+        finally:
+            # Release the cursor (and the connection) even if the consumer stops early.
+            cursor.close()
+
+        self._cache_objs(cache_key, objs_to_cache, cache_generation)
+
+    async def async_select(self,
+                           where: Optional[str] = None,
+                           parameters: Union[None, Dict[str, Any]] = None,
+                           order_by: Optional[List[Iterable[str]]] = None,
+                           limit: Optional[int] = None,
+                           datastore_session: Optional[AsyncDataStoreSession] = None,
+                           stream_batch_size: Optional[int] = None,
+                           fields: Optional[Iterable[str]] = None) -> AsyncGenerator[T, None]:
+        fields = self.get_selectable_fields(fields)
+        cache_key = self._make_cache_key(where, parameters, order_by, limit, fields, datastore_session)
+        cached_objs = self._get_cached_objs(cache_key)
+        # NOTE: Taken before the query, so that the rows read before any invalidation in the meantime are not kept.
+        cache_generation = self._cache.generation if cache_key else None
+
+        if cached_objs is not None:
+            for obj in cached_objs:
+                yield obj
+            return
+
+        query = self._make_select_query(where, order_by, limit, fields)
+        stream_batch_size = self._get_stream_batch_size(limit, stream_batch_size)
+
+        self._log.debug(f'RUN: {query} (params={parameters}, stream_batch_size={stream_batch_size})')
+
+        cursor = (
+            datastore_session.execute(query, parameters=parameters, stream_batch_size=stream_batch_size)
             if datastore_session
-            else self._datastore.execute(query, parameters=parameters)
+            else self._datastore.async_execute(query,
+                                               parameters=parameters,
+                                               stream_batch_size=stream_batch_size,
+                                               read_only=True)
         )
 
-        for row in cursor:
-            # noinspection PyProtectedMember
-            yield self.map_row(row._asdict())
+        objs_to_cache = [] if cache_key else None
+
+        try:
+            async for row in cursor:
+                # noinspection PyProtectedMember
+                obj = self.map_row(row._mapping)
+                objs_to_cache = self._collect_obj_to_cache(objs_to_cache, obj)
+                yield obj
+        finally:
+            # Release the cursor (and the connection) even if the consumer stops early.
+            await cursor.aclose()
+
+        self._cache_objs(cache_key, objs_to_cache, cache_generation)
+
+    def enable_cache(self, max_size: int, ttl: float):
+        """ Enable the entity cache for the results of :meth:`select` (and so :meth:`get`)
+
+            This is enabled on start-up for the tables listed in ``MINI_IDP_ENTITY_CACHE_TABLES``. Any write through
+            this DAO invalidates the whole cache of this DAO, in this process and, with PostgreSQL, in all processes
+            listening to the changes (see :meth:`DataStore.publish_change` and :meth:`DataStore.listen_to_changes`).
+
+            :param max_size: The maximum number of cached results
+            :param ttl: The number of seconds to keep a cached result
+        """
+        self._cache = LRUCache(max_size, ttl)
+        self._datastore.subscribe_changes(self._table_name, self.invalidate_cache)
+        return self
+
+    def get_cache_stats(self) -> Optional[CacheStats]:
+        """ The stats of the entity cache, or None if the cache is not enabled for this DAO """
+        return self._cache.get_stats() if self._cache else None
+
+    def invalidate_cache(self):
+        if self._cache:
+            self._cache.clear()
+
+    def notify_change(self, datastore_session: Optional[DataStoreSession] = None):
+        """ Invalidate the cache of this DAO in all processes, e.g., after changing the table without this DAO
+
+            Within the session, the cache is invalidated again once the transaction is committed, as the other
+            readers may have cached the former rows in the meantime.
+        """
+        if self._cache:
+            self.invalidate_cache()
+            if datastore_session:
+                datastore_session.call_after_commit(self.invalidate_cache)
+            self._datastore.publish_change(self._table_name, datastore_session)
+
+    async def async_notify_change(self, datastore_session: Optional[AsyncDataStoreSession] = None):
+        if self._cache:
+            self.invalidate_cache()
+            if datastore_session:
+                datastore_session.call_after_commit(self.invalidate_cache)
+            await self._datastore.async_publish_change(self._table_name, datastore_session)
+
+    def _make_cache_key(self,
+                        where: Optional[str],
+                        parameters: Optional[Dict[str, Any]],
+                        order_by: Optional[List[Iterable[str]]],
+                        limit: Optional[int],
+                        fields: Optional[Tuple[str, ...]],
+                        datastore_session: Union[None, DataStoreSession, AsyncDataStoreSession]
+                        ) -> Optional[Tuple[Any, ...]]:
+        if not self._cache or (datastore_session and not datastore_session.read_only):
+            # NOTE: The read-write session may see its own uncommitted changes.
+            return None
+
+        key = (where, _freeze(parameters), _freeze(order_by), limit, fields)
+
+        try:
+            hash(key)
+        except TypeError:
+            return None
+
+        return key
+
+    def _get_cached_objs(self, cache_key: Optional[Tuple[Any, ...]]) -> Optional[List[T]]:
+        cached_objs = self._cache.get(cache_key) if cache_key else None
+
+        # NOTE: Copy the objects so that the callers cannot alter the cached ones.
+        return [obj.model_copy(deep=True) for obj in cached_objs] if cached_objs is not None else None
+
+    def _collect_obj_to_cache(self, objs: Optional[List[T]], obj: T) -> Optional[List[T]]:
+        if objs is None or len(objs) >= _CACHEABLE_ROW_COUNT:
+            # Too many rows to cache
+            return None
+
+        objs.append(obj.model_copy(deep=True))
+
+        return objs
+
+    def _cache_objs(self, cache_key: Optional[Tuple[Any, ...]], objs: Optional[List[T]], cache_generation: Optional[int]):
+        if cache_key and objs is not None:
+            self._cache.set(cache_key, objs, generation=cache_generation)
 
     def select_one(self,
                    where: Optional[str] = None,
                    parameters: Optional[Dict[str, Any]] = None,
-                   datastore_session: Optional[DataStoreSession] = None) -> Optional[T]:
-        items = [i for i in self.select(where, parameters, limit=1, datastore_session=datastore_session)]
+                   datastore_session: Optional[DataStoreSession] = None,
+                   fields: Optional[Iterable[str]] = None) -> Optional[T]:
+        items = [
+            i
+            for i in self.select(where, parameters, limit=1, datastore_session=datastore_session, fields=fields)
+        ]
         if items:
             return items[0]
         else:
             return None
 
+    async def async_select_one(self,
+                               where: Optional[str] = None,
+                               parameters: Optional[Dict[str, Any]] = None,
+                               datastore_session: Optional[AsyncDataStoreSession] = None,
+                               fields: Optional[Iterable[str]] = None) -> Optional[T]:
+        items = [
+            i
+            async for i in self.async_select(where,
+                                             parameters,
+                                             limit=1,
+                                             datastore_session=datastore_session,
+                                             fields=fields)
+        ]
+        if items:
+            return items[0]
+        else:
+            return None
+
+    def _make_count_query(self, where: Optional[str]) -> str:
+        return self._get_statement(('count', where),
+                                   lambda: f'SELECT COUNT(*) FROM {self._table_name} WHERE {where}'
+                                   if where
+                                   else f'SELECT COUNT(*) FROM {self._table_name}')
+
+    def _make_exists_query(self, where: Optional[str]) -> str:
+        return self._get_statement(('exists', where),
+                                   lambda: f'SELECT 1 FROM {self._table_name} WHERE {where} LIMIT 1'
+                                   if where
+                                   else f'SELECT 1 FROM {self._table_name} LIMIT 1')
+
+    def _fetch_first_row(self,
+                         query: str,
+                         parameters: Optional[Dict[str, Any]],
+                         datastore_session: Optional[DataStoreSession]) -> Optional[Row]:
+        self._log.debug(f'RUN: {query} (params={parameters})')
+
+        cursor = (
+            datastore_session.execute(query, parameters=parameters)
+            if datastore_session
+            else self._datastore.execute(query, parameters=parameters, read_only=True)
+        )
+
+        try:
+            return next(cursor, None)
+        finally:
+            cursor.close()
+
+    async def _async_fetch_first_row(self,
+                                     query: str,
+                                     parameters: Optional[Dict[str, Any]],
+                                     datastore_session: Optional[AsyncDataStoreSession]) -> Optional[Row]:
+        self._log.debug(f'RUN: {query} (params={parameters})')
+
+        cursor = (
+            datastore_session.execute(query, parameters=parameters)
+            if datastore_session
+            else self._datastore.async_execute(query, parameters=parameters, read_only=True)
+        )
+
+        try:
+            async for row in cursor:
+                return row
+            return None
+        finally:
+            await cursor.aclose()
+
+    def count(self,
+              where: Optional[str] = None,
+              parameters: Optional[Dict[str, Any]] = None,
+              datastore_session: Optional[DataStoreSession] = None) -> int:
+        """ Count the rows matching the criteria without mapping them
+
+            Without ``datastore_session``, the query may be served by a read replica.
+        """
+        return self._fetch_first_row(self._make_count_query(where), parameters, datastore_session)[0]
+
+    async def async_count(self,
+                          where: Optional[str] = None,
+                          parameters: Optional[Dict[str, Any]] = None,
+                          datastore_session: Optional[AsyncDataStoreSession] = None) -> int:
+        return (await self._async_fetch_first_row(self._make_count_query(where), parameters, datastore_session))[0]
+
+    def exists(self,
+               where: Optional[str] = None,
+               parameters: Optional[Dict[str, Any]] = None,
+               datastore_session: Optional[DataStoreSession] = None) -> bool:
+        """ Check if any row matches the criteria without mapping it
+
+            Without ``datastore_session``, the query may be served by a read replica.
+        """
+        return self._fetch_first_row(self._make_exists_query(where), parameters, datastore_session) is not None
+
+    async def async_exists(self,
+                           where: Optional[str] = None,
+                           parameters: Optional[Dict[str, Any]] = None,
+                           datastore_session: Optional[AsyncDataStoreSession] = None) -> bool:
+        return await self._async_fetch_first_row(self._make_exists_query(where),
+                                                 parameters,
+                                                 datastore_session) is not None
+
+    def _validate_property(self, property_name: str, value: Any) -> Any:
+        """ Validate and convert the value for the property alone, e.g., "true" for a boolean property
+
+            :raises ValidationError: when the value is invalid
+        """
+        probe = self._model_class.model_construct()
+        self._model_class.__pydantic_validator__.validate_assignment(probe, property_name, value)
+        return getattr(probe, property_name)
+
+    def make_filter_criteria(self, filters: Optional[Dict[str, str]]) -> Tuple[List[str], Dict[str, Any]]:
+        """ Make the SQL conditions to match the properties to the given values
+
+            A value ending with "*" matches by prefix. Otherwise, the value (converted to the type of the property)
+            must be equal. Only the plain columns can be filtered, i.e., not the JSON nor encrypted ones.
+
+            :raises UnknownFieldError: when a property is not mapped to any plain column
+        """
+        conditions: List[str] = []
+        params: Dict[str, Any] = dict()
+
+        for i, (property_name, value) in enumerate(sorted((filters or dict()).items())):
+            cm = self._column_mappings.get(property_name)
+
+            if cm is None or cm.cast_to_sql_type or cm.convert_to_sql_data:
+                raise UnknownFieldError(f'{self._model_class.__name__}: Unable to filter by {property_name}')
+
+            param_name = f'filter_{i}'
+
+            if value.endswith('*'):
+                conditions.append(f"{cm.column_name} LIKE :{param_name} ESCAPE '\\'")
+                params[param_name] = re.sub(r'([\\%_])', r'\\\1', value[:-1]) + '%'
+            else:
+                conditions.append(f'{cm.column_name} = :{param_name}')
+                params[param_name] = self._validate_property(property_name, value)
+
+        return conditions, params
+
+    def select_page(self,
+                    filters: Optional[Dict[str, str]] = None,
+                    after: Optional[Tuple[str, str]] = None,
+                    limit: int = 100,
+                    datastore_session: Optional[DataStoreSession] = None,
+                    fields: Optional[Iterable[str]] = None) -> Tuple[List[T], Optional[Tuple[str, str]]]:
+        """ Select one page of the objects ordered by name and ID (keyset pagination)
+
+            :param filters: See :meth:`make_filter_criteria`
+            :param after: The key (name and ID) of the last object of the previous page
+            :param limit: The maximum number of objects in the page
+            :return: The objects and the key of the last object if there may be more objects
+        """
+        conditions, params = self.make_filter_criteria(filters)
+
+        if after:
+            # NOTE: The row-value comparison lets the database seek on the (name, id) order instead of skipping rows.
+            conditions.append('(name, id) > (:after_name, :after_id)')
+            params.update(after_name=after[0], after_id=after[1])
+
+        if fields is not None and 'name' not in fields:
+            fields = [*fields, 'name']
+
+        # Fetch one more object to tell whether there is the next page.
+        objs = list(self.select(' AND '.join(conditions) if conditions else None,
+                                params,
+                                order_by=[('name', 'ASC'), ('id', 'ASC')],
+                                limit=limit + 1,
+                                datastore_session=datastore_session,
+                                fields=fields))
+
+        if len(objs) <= limit:
+            return objs, None
+
+        last_obj = objs[limit - 1]
+
+        return objs[:limit], (last_obj.name, last_obj.id)
+
+    def reencrypt(self, batch_size: int = 100) -> int:
+        """ Re-encrypt the data of the encrypted columns which is still in a legacy format
+
+            The rows are walked by ID, one transaction per batch. A value is only replaced if it has not changed in
+            the meantime, so this can run alongside the regular writes.
+
+            If a write fails, the batch is rolled back and the error is raised, so this can simply run again.
+
+            :return: The number of re-encrypted values
+        """
+        column_names = [self._column_mappings[p].column_name for p in self._encrypted_property_names]
+
+        if not column_names:
+            return 0
+
+        select_query = (f'SELECT id, {", ".join(column_names)} FROM {self._table_name} '
+                        f'WHERE id > :after_id ORDER BY id LIMIT :limit')
+        update_queries = {
+            column_name: f'UPDATE {self._table_name} SET {column_name} = :data '
+                         f'WHERE id = :id AND {column_name} = :legacy_data'
+            for column_name in column_names
+        }
+
+        reencrypted_count = 0
+        after_id = ''
+
+        while True:
+            with self._datastore.in_session() as session:
+                rows = [row._mapping for row in session.execute(select_query, dict(after_id=after_id, limit=batch_size))]
+
+                for row in rows:
+                    for column_name in column_names:
+                        legacy_data = row[column_name]
+
+                        if legacy_data is None or not self._needs_reencryption(legacy_data):
+                            continue
+
+                        reencrypted_count += session.execute_without_result(
+                            update_queries[column_name],
+                            dict(id=row['id'],
+                                 data=self._encrypt_data(self._decrypt_data(legacy_data)),
+                                 legacy_data=legacy_data),
+                            suppress_error=False,
+                        )
+
+                session.commit()
+
+            if len(rows) < batch_size:
+                break
+
+            after_id = rows[-1]['id']
+
+        if reencrypted_count:
+            self.notify_change()
+
+        self._log.info(f'Re-encrypted {reencrypted_count} value(s) in {self._table_name}')
+
+        return reencrypted_count
+
     def delete(self,
                where: Optional[str] = None,
                parameters: Optional[Dict[str, Any]] = None,
                datastore_session: Optional[DataStoreSession] = None) -> int:
-        query = f'DELETE FROM {self._table_name}'
-
-        if where:
-            query = f'{query} WHERE {where}'
+        query = self._get_statement(('delete', where),
+                                    lambda: f'DELETE FROM {self._table_name} WHERE {where}'
+                                    if where
+                                    else f'DELETE FROM {self._table_name}')
 
         self._log.debug(f'RUN: {query} (params={parameters})')
 
         if datastore_session:
-            return datastore_session.execute_without_result(query, parameters)
+            deleted_count = datastore_session.execute_without_result(query, parameters)
         else:
-            return self._datastore.execute_without_result(query, parameters)
+            deleted_count = self._datastore.execute_without_result(query, parameters)
+
+        self.notify_change(datastore_session)
+
+        return deleted_count
 
     def get(self, id: str,
-            datastore_session: Optional[DataStoreSession] = None) -> Optional[T]:
-        return self.select_one('id = :id OR name = :id', dict(id=id))
+            datastore_session: Optional[DataStoreSession] = None,
+            fields: Optional[Iterable[str]] = None) -> Optional[T]:
+        return self.select_one('id = :id OR name = :id',
+                               dict(id=id),
+                               datastore_session=datastore_session,
+                               fields=fields)
+
+    async def async_get(self, id: str,
+                        datastore_session: Optional[AsyncDataStoreSession] = None,
+                        fields: Optional[Iterable[str]] = None) -> Optional[T]:
+        return await self.async_select_one('id = :id OR name = :id',
+                                           dict(id=id),
+                                           datastore_session=datastore_session,
+                                           fields=fields)
+
+    def _make_get_many_criteria(self, ids: Iterable[str]) -> Tuple[str, Dict[str, Any]]:
+        return (
+            f'{self._datastore.make_any("id", "ids")} OR {self._datastore.make_any("name", "ids")}',
+            dict(ids=self._datastore.write_list(set(ids))),
+        )
+
+    def _index_by_id_and_name(self, objs: Iterable[T]) -> Dict[str, T]:
+        indexed_objs: Dict[str, T] = dict()
+        for obj in objs:
+            indexed_objs[obj.id] = obj
+            if getattr(obj, 'name', None):
+                indexed_objs[obj.name] = obj
+        return indexed_objs
+
+    def get_many(self, ids: Iterable[str],
+                 datastore_session: Optional[DataStoreSession] = None,
+                 fields: Optional[Iterable[str]] = None) -> Dict[str, T]:
+        """ Get the objects by IDs or names in one query
+
+            :return: The objects keyed by both ID and name. The unknown IDs and names are not in the result.
+        """
+        if fields is not None and 'name' not in fields:
+            fields = [*fields, 'name']
+
+        where, params = self._make_get_many_criteria(ids)
+
+        return self._index_by_id_and_name(self.select(where, params, datastore_session=datastore_session, fields=fields))
+
+    async def async_get_many(self, ids: Iterable[str],
+                             datastore_session: Optional[AsyncDataStoreSession] = None,
+                             fields: Optional[Iterable[str]] = None) -> Dict[str, T]:
+        if fields is not None and 'name' not in fields:
+            fields = [*fields, 'name']
+
+        where, params = self._make_get_many_criteria(ids)
+
+        return self._index_by_id_and_name([
+            obj
+            async for obj in self.async_select(where, params, datastore_session=datastore_session, fields=fields)
+        ])
 
     def add(self, obj: T,
             datastore_session: Optional[DataStoreSession] = None) -> T:
         return self.simple_insert(obj, datastore_session)
 
-    def simple_insert(self, obj: T,
-                      datastore_session: Optional[DataStoreSession] = None) -> T:
-        sql_column_names: List[str] = list()
-        sql_column_value_placeholders: List[str] = list()
+    async def async_add(self, obj: T,
+                        datastore_session: Optional[AsyncDataStoreSession] = None) -> T:
+        return await self.async_simple_insert(obj, datastore_session)
+
+    def _make_placeholder(self, cm: _ColumnMapping, param_name: str) -> str:
+        return (self._datastore.make_cast(f':{param_name}', cm.cast_to_sql_type)
+                if cm.cast_to_sql_type
+                else f':{param_name}')
+
+    def _make_sql_params(self, obj: T, param_prefix: str = '', param_suffix: str = '') -> Dict[str, Any]:
         sql_params: Dict[str, Any] = dict()
 
         for property_name, cm in self._column_mappings.items():
-            column_name = cm.column_name
             column_value = getattr(obj, property_name)
+            sql_params[f'{param_prefix}{cm.column_name}{param_suffix}'] = (cm.convert_to_sql_data(column_value)
+                                                                           if callable(cm.convert_to_sql_data)
+                                                                           else column_value)
+
+        return sql_params
 
-            sql_column_names.append(column_name)
-            sql_column_value_placeholders.append(f'(:{column_name})::{cm.cast_to_sql_type}'
-                                                 if cm.cast_to_sql_type
-                                                 else f':{column_name}')
-            sql_params[column_name] = (cm.convert_to_sql_data(column_value)
-                                       if callable(cm.convert_to_sql_data)
-                                       else column_value)
+    def _generate_insert_query(self) -> str:
+        sql_column_names: List[str] = list()
+        sql_column_value_placeholders: List[str] = list()
 
-        insert_query = f"""
+        for cm in self._column_mappings.values():
+            sql_column_names.append(cm.column_name)
+            sql_column_value_placeholders.append(self._make_placeholder(cm, cm.column_name))
+
+        return f"""
             INSERT INTO {self._table_name} ({', '.join(sql_column_names)})
             VALUES ({', '.join(sql_column_value_placeholders)}) 
             ON CONFLICT DO NOTHING 
         """
 
+    def _make_insert_query(self, obj: T) -> Tuple[str, Dict[str, Any]]:
+        return self._get_statement(('insert',), self._generate_insert_query), self._make_sql_params(obj)
+
+    def simple_insert(self, obj: T,
+                      datastore_session: Optional[DataStoreSession] = None) -> T:
+        insert_query, sql_params = self._make_insert_query(obj)
+
         self._log.debug(f'RUN: {insert_query} (params={sql_params})')
 
         if datastore_session:
@@ -244,40 +969,146 @@ class AtomicDao(Generic[T]):
         elif self._datastore.execute_without_result(insert_query, sql_params) == 0:
             raise InsertError(obj)
 
+        self.notify_change(datastore_session)
+
         return obj
 
-    def simple_update(self,
-                      obj: T,
-                      where: Optional[str] = None,
-                      where_params: Optional[Dict[str, Any]] = None,
-                      datastore_session: Optional[DataStoreSession] = None) -> T:
-        sql_column_names: List[str] = list()
-        sql_column_value_placeholders: List[str] = list()
-        sql_params: Dict[str, Any] = dict()
-        sql_setters: List[str] = list()
+    async def async_simple_insert(self, obj: T,
+                                  datastore_session: Optional[AsyncDataStoreSession] = None) -> T:
+        insert_query, sql_params = self._make_insert_query(obj)
 
-        for property_name, cm in self._column_mappings.items():
-            column_name = cm.column_name
-            column_value = getattr(obj, property_name)
+        self._log.debug(f'RUN: {insert_query} (params={sql_params})')
 
-            set_param_name = f'set_{column_name}'
+        if datastore_session:
+            if await datastore_session.execute_without_result(insert_query, sql_params) == 0:
+                raise InsertError(obj)
+        elif await self._datastore.async_execute_without_result(insert_query, sql_params) == 0:
+            raise InsertError(obj)
 
-            sql_column_names.append(column_name)
-            sql_column_value_placeholders.append(f'(:{set_param_name})::{cm.cast_to_sql_type}'
-                                                 if cm.cast_to_sql_type
-                                                 else f':{column_name}')
-            sql_params[set_param_name] = (cm.convert_to_sql_data(column_value)
-                                          if callable(cm.convert_to_sql_data)
-                                          else column_value)
-            sql_setters.append(f'{column_name} = :{set_param_name}')
+        await self.async_notify_change(datastore_session)
 
-        sql_params.update(where_params)
+        return obj
 
-        update_query = f"""
-            UPDATE {self._table_name}
-                SET {', '.join(sql_setters)}
-                WHERE {where}
+    def _get_bulk_batch_size(self, batch_size: Optional[int]) -> int:
+        # NOTE: PostgreSQL accepts up to 65535 parameters per statement and SQLite up to 32766.
+        max_param_count = 32766 if self._datastore.dialect == 'sqlite' else 65535
+        return max(1, min(batch_size or _BULK_WRITE_BATCH_SIZE, max_param_count // max(1, len(self._column_mappings))))
+
+    def _generate_bulk_write_query(self, row_count: int, upsert: bool) -> str:
+        sql_column_names: List[str] = [cm.column_name for cm in self._column_mappings.values()]
+        sql_rows: List[str] = [
+            '(' + ', '.join([self._make_placeholder(cm, f'{cm.column_name}_{i}')
+                             for cm in self._column_mappings.values()]) + ')'
+            for i in range(row_count)
+        ]
+
+        if upsert:
+            sql_setters = [
+                f'{column_name} = EXCLUDED.{column_name}'
+                for column_name in sql_column_names
+                if column_name != 'id'
+            ]
+            # NOTE: "xmax" is only zero for the rows created by this statement. SQLite has no equivalent, so the
+            #       existing rows are looked up beforehand (see _bulk_write).
+            on_conflict = (f"ON CONFLICT (id) DO UPDATE SET {', '.join(sql_setters)} "
+                           + ("RETURNING id, NULL AS inserted"
+                              if self._datastore.dialect == 'sqlite'
+                              else "RETURNING id, (xmax = 0) AS inserted"))
+        else:
+            on_conflict = 'ON CONFLICT DO NOTHING RETURNING id, TRUE AS inserted'
+
+        return f"""
+            INSERT INTO {self._table_name} ({', '.join(sql_column_names)})
+            VALUES {', '.join(sql_rows)}
+            {on_conflict}
+        """
+
+    def _bulk_write(self,
+                    objs: Iterable[T],
+                    upsert: bool,
+                    datastore_session: Optional[DataStoreSession],
+                    batch_size: Optional[int]) -> BulkWriteResult:
+        if not datastore_session:
+            with self._datastore.in_session() as session:
+                result = self._bulk_write(objs, upsert, session, batch_size)
+                session.commit()
+            return result
+
+        result = BulkWriteResult()
+        batch_size = self._get_bulk_batch_size(batch_size)
+        batch: List[T] = []
+
+        def flush():
+            query = self._get_statement(('bulk_upsert' if upsert else 'bulk_insert', len(batch)),
+                                        lambda: self._generate_bulk_write_query(len(batch), upsert))
+            sql_params: Dict[str, Any] = dict()
+            for i, obj in enumerate(batch):
+                sql_params.update(self._make_sql_params(obj, param_suffix=f'_{i}'))
+
+            self._log.debug(f'RUN: {query} ({len(batch)} rows)')
+
+            existing_ids = set()
+            if upsert and self._datastore.dialect == 'sqlite':
+                existing_ids.update(
+                    row.id
+                    for row in datastore_session.execute(
+                        f'SELECT id FROM {self._table_name} WHERE {self._datastore.make_any("id", "ids")}',
+                        dict(ids=self._datastore.write_list(obj.id for obj in batch))
+                    )
+                )
+
+            written_ids = dict()
+            for row in datastore_session.execute(query, sql_params):
+                written_ids[row.id] = row.inserted if row.inserted is not None else row.id not in existing_ids
+
+            for obj in batch:
+                if obj.id not in written_ids:
+                    result.skipped.append(obj)
+                elif written_ids[obj.id]:
+                    result.inserted.append(obj)
+                else:
+                    result.updated.append(obj)
+
+            batch.clear()
+
+        for obj in objs:
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                flush()
+
+        if batch:
+            flush()
+
+        self.notify_change(datastore_session)
+
+        return result
+
+    def bulk_insert(self,
+                    objs: Iterable[T],
+                    datastore_session: Optional[DataStoreSession] = None,
+                    batch_size: Optional[int] = None) -> BulkWriteResult:
+        """ Insert the objects with multi-row statements, up to ``batch_size`` rows per statement
+
+            The objects conflicting with the existing rows are not written and reported as skipped.
         """
+        return self._bulk_write(objs, False, datastore_session, batch_size)
+
+    def bulk_upsert(self,
+                    objs: Iterable[T],
+                    datastore_session: Optional[DataStoreSession] = None,
+                    batch_size: Optional[int] = None) -> BulkWriteResult:
+        """ Insert or update (by ID) the objects with multi-row statements, up to ``batch_size`` rows per statement """
+        return self._bulk_write(objs, True, datastore_session, batch_size)
+
+    def simple_update(self,
+                      obj: T,
+                      where: Optional[str] = None,
+                      where_params: Optional[Dict[str, Any]] = None,
+                      datastore_session: Optional[DataStoreSession] = None) -> T:
+        sql_params = self._make_sql_params(obj, param_prefix='set_')
+        sql_params.update(where_params or dict())
+
+        update_query = self._get_statement(('update', where), lambda: self._generate_update_query(where))
 
         if datastore_session:
             update_count = datastore_session.execute_without_result(update_query, sql_params)
@@ -289,4 +1120,151 @@ class AtomicDao(Generic[T]):
         elif update_count > 1:
             self._log.warning(f'{type(obj).__name__}/{obj.id}: Unexpected multiple updates (where: {where}; params: {sql_params})')
 
+        self.notify_change(datastore_session)
+
         return obj
+
+    def patch(self,
+              operations: List[PatchOperation],
+              where: str,
+              where_params: Optional[Dict[str, Any]] = None,
+              datastore_session: Optional[DataStoreSession] = None) -> Optional[T]:
+        """ Apply the JSON Patch operations to the matching object, writing only the affected columns
+
+            The operations on the top-level properties, appending to a JSON array ("/roles/-") and removing from a
+            JSON array by index ("/roles/0") are translated into SQL expressions, so the object is not loaded at all.
+            Otherwise, the object is patched in Python and only the changed columns are written.
+
+            :return: The updated object, or None if there is no matching object
+            :raises ValidationError: when a value is invalid for the property
+            :raises JsonPatchConflict: when an operation does not apply to the object, e.g., an index out of range
+        """
+        translation = self._translate_patch(operations)
+        conditions: List[str] = list()
+
+        if translation:
+            column_expressions, sql_params, conditions = translation
+        else:
+            base_obj = self.select_one(where, where_params, datastore_session=datastore_session)
+
+            if not base_obj:
+                return None
+
+            updated_obj = self.from_dict(apply_changes(base_obj.model_dump(), operations))
+            column_expressions = dict()
+            sql_params = dict()
+
+            for property_name, cm in self._column_mappings.items():
+                value = getattr(updated_obj, property_name)
+
+                if value == getattr(base_obj, property_name):
+                    continue
+
+                column_expressions[cm.column_name] = self._make_placeholder(cm, f'set_{cm.column_name}')
+                sql_params[f'set_{cm.column_name}'] = self._convert_to_sql_data(cm, value)
+
+            if not column_expressions:
+                return updated_obj
+
+        if not column_expressions:
+            return self.select_one(where, where_params, datastore_session=datastore_session)
+
+        if not datastore_session:
+            with self._datastore.in_session() as session:
+                result = self._update_columns(column_expressions, sql_params, where, where_params, session, conditions)
+                session.commit()
+        else:
+            result = self._update_columns(column_expressions, sql_params, where, where_params, datastore_session,
+                                          conditions)
+
+        if result is None and conditions and self.exists(where, where_params, datastore_session=datastore_session):
+            # NOTE: The object exists, so one of the conditions, e.g., an index in range, did not hold.
+            raise JsonPatchConflict('The patch does not apply to the object, e.g., an index out of range.')
+
+        return result
+
+    def _translate_patch(self, operations: List[PatchOperation]
+                         ) -> Optional[Tuple[Dict[str, str], Dict[str, Any], List[str]]]:
+        """ Translate the operations into the SQL expressions of the affected columns
+
+            :return: The expressions keyed by the column names, the SQL parameters and the conditions for the
+                     operations to apply, e.g., the index in range, or None if any operation needs the whole object
+        """
+        column_expressions: Dict[str, str] = dict()
+        sql_params: Dict[str, Any] = dict()
+        conditions: List[str] = list()
+
+        for i, operation in enumerate(operations):
+            path = [token.replace('~1', '/').replace('~0', '~') for token in operation.path.split('/')[1:]]
+            property_name = path[0] if path else None
+            cm = self._column_mappings.get(property_name)
+            field = self._model_class.model_fields.get(property_name)
+            param_name = f'patch_{i}'
+
+            if not cm or not field:
+                return None
+            elif len(path) == 1 and operation.op in ('add', 'replace', 'remove'):
+                if operation.op == 'remove':
+                    if field.is_required():
+                        return None
+                    value = field.get_default(call_default_factory=True)
+                else:
+                    value = self._validate_property(property_name, operation.value)
+
+                column_expressions[cm.column_name] = self._make_placeholder(cm, param_name)
+                sql_params[param_name] = self._convert_to_sql_data(cm, value)
+            elif len(path) == 2 and cm.cast_to_sql_type == 'jsonb' and get_origin(field.annotation) is list:
+                expression = column_expressions.get(cm.column_name, cm.column_name)
+
+                if operation.op == 'add' and path[1] == '-':
+                    item_type = (get_args(field.annotation) or [Any])[0]
+                    item = _get_type_adapter(item_type).validate_python(operation.value)
+                    column_expressions[cm.column_name] = self._datastore.make_json_append(expression, param_name)
+                    sql_params[param_name] = json.dumps(self._convert_to_serializable_obj(item))
+                elif operation.op == 'remove' and path[1].isdigit():
+                    conditions.append(f'{self._datastore.make_json_array_length(expression)} > :{param_name}')
+                    column_expressions[cm.column_name] = self._datastore.make_json_remove(expression, param_name)
+                    sql_params[param_name] = int(path[1])
+                else:
+                    return None
+            else:
+                return None
+
+        return column_expressions, sql_params, conditions
+
+    def _update_columns(self,
+                        column_expressions: Dict[str, str],
+                        sql_params: Dict[str, Any],
+                        where: str,
+                        where_params: Optional[Dict[str, Any]],
+                        datastore_session: DataStoreSession,
+                        conditions: Optional[List[str]] = None) -> Optional[T]:
+        sql_setters = ', '.join(f'{column_name} = {expression}' for column_name, expression in column_expressions.items())
+        sql_criteria = ' AND '.join([f'({where})'] + (conditions or [])) if conditions else where
+        query = self._get_statement(('update_columns', sql_criteria, sql_setters),
+                                    lambda: f'UPDATE {self._table_name} SET {sql_setters} WHERE {sql_criteria} RETURNING *')
+        sql_params.update(where_params or dict())
+
+        updated_objs = [self.map_row(row._mapping) for row in datastore_session.execute(query, sql_params)]
+
+        self.notify_change(datastore_session)
+
+        if len(updated_objs) > 1:
+            self._log.warning(f'{self._model_class.__name__}: Unexpected multiple updates (where: {where})')
+
+        return updated_objs[0] if updated_objs else None
+
+    def _convert_to_sql_data(self, cm: _ColumnMapping, value: Any) -> Any:
+        return cm.convert_to_sql_data(value) if callable(cm.convert_to_sql_data) and value is not None else value
+
+    def _generate_update_query(self, where: Optional[str]) -> str:
+        sql_setters = [
+            f'{cm.column_name} = {self._make_placeholder(cm, f"set_{cm.column_name}")}'
+            for cm in self._column_mappings.values()
+        ]
+
+        return f"""
+            UPDATE {self._table_name}
+                SET {', '.join(sql_setters)}
+                WHERE {where}
+        """
@@ -26,3 +26,6 @@ class ClientDao(AtomicDao[IAMOAuthClient]):
 
     def _decrypt_data(self, data: Union[bytes, str]) -> str:
         return self._enigma.decrypt(data).decode()
+
+    def _needs_reencryption(self, data: Union[bytes, str]) -> bool:
+        return self._enigma.needs_reencryption(data)
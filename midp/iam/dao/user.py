@@ -1,12 +1,25 @@
-from typing import Union, Optional
+import hashlib
+from typing import Union, Optional, Iterable
 
 from imagination.decorator.service import Service
+from pydantic import BaseModel
 
 from midp.common.enigma import Enigma
 from midp.iam.dao.atomic import AtomicDao
 from midp.iam.dao.role import RoleDao
 from midp.iam.models import IAMUser
-from midp.common.rds import DataStore, DataStoreSession
+from midp.common.rds import DataStore, DataStoreSession, AsyncDataStoreSession
+
+
+class PasswordHashState(BaseModel):
+    user_id: str
+    encrypted_password: str
+    password_hash: Optional[str] = None
+    """ The password hash, or None if there is none or it is stale, i.e., the password has changed since """
+
+
+def _bind_to(encrypted_password: str) -> str:
+    return hashlib.sha256(encrypted_password.encode()).hexdigest()
 
 
 @Service()
@@ -25,5 +38,82 @@ class UserDao(AtomicDao[IAMUser]):
     def _decrypt_data(self, data: Union[bytes, str]) -> str:
         return self._enigma.decrypt(data).decode()
 
-    def get(self, id: str, datastore_session: Optional[DataStoreSession] = None) -> Optional[IAMUser]:
-        return self.select_one('id = :id OR name = :id OR email = :id', dict(id=id))
+    def _needs_reencryption(self, data: Union[bytes, str]) -> bool:
+        return self._enigma.needs_reencryption(data)
+
+    def get(self,
+            id: str,
+            datastore_session: Optional[DataStoreSession] = None,
+            fields: Optional[Iterable[str]] = None) -> Optional[IAMUser]:
+        return self.select_one('id = :id OR name = :id OR email = :id',
+                               dict(id=id),
+                               datastore_session=datastore_session,
+                               fields=fields)
+
+    async def async_get(self,
+                        id: str,
+                        datastore_session: Optional[AsyncDataStoreSession] = None,
+                        fields: Optional[Iterable[str]] = None) -> Optional[IAMUser]:
+        return await self.async_select_one('id = :id OR name = :id OR email = :id',
+                                           dict(id=id),
+                                           datastore_session=datastore_session,
+                                           fields=fields)
+
+    def _make_password_hash_state(self, row) -> Optional[PasswordHashState]:
+        if row is None:
+            return None
+
+        # noinspection PyProtectedMember
+        row = row._mapping
+        is_current = row['password_hash_binding'] == _bind_to(row['encrypted_password'])
+
+        return PasswordHashState(user_id=row['id'],
+                                 encrypted_password=row['encrypted_password'],
+                                 password_hash=row['password_hash'] if is_current else None)
+
+    def _make_password_hash_query(self) -> str:
+        return self._get_statement(('password_hash',),
+                                   lambda: f'SELECT id, encrypted_password, password_hash, password_hash_binding '
+                                           f'FROM {self._table_name} WHERE id = :id')
+
+    def _make_password_hash_update(self, state: PasswordHashState, password_hash: str):
+        query = self._get_statement(('update_password_hash',),
+                                    lambda: f'UPDATE {self._table_name} '
+                                            f'SET password_hash = :password_hash, password_hash_binding = :binding '
+                                            f'WHERE id = :id AND encrypted_password = :encrypted_password')
+
+        return query, dict(id=state.user_id,
+                           encrypted_password=state.encrypted_password,
+                           password_hash=password_hash,
+                           binding=_bind_to(state.encrypted_password))
+
+    def get_password_hash(self,
+                          id: str,
+                          datastore_session: Optional[DataStoreSession] = None) -> Optional[PasswordHashState]:
+        """ Get the password hash of the user
+
+            The hash is bound to the encrypted password, so it is ignored once the password is changed by any write.
+        """
+        return self._make_password_hash_state(self._fetch_first_row(self._make_password_hash_query(),
+                                                                    dict(id=id),
+                                                                    datastore_session))
+
+    async def async_get_password_hash(self,
+                                      id: str,
+                                      datastore_session: Optional[AsyncDataStoreSession] = None
+                                      ) -> Optional[PasswordHashState]:
+        return self._make_password_hash_state(await self._async_fetch_first_row(self._make_password_hash_query(),
+                                                                                dict(id=id),
+                                                                                datastore_session))
+
+    def set_password_hash(self, state: PasswordHashState, password_hash: str) -> bool:
+        """ Store the password hash unless the password has changed in the meantime
+
+            This always runs in its own transaction, as the login only reads with a (possibly read-only) session.
+        """
+        return self._datastore.execute_without_result(*self._make_password_hash_update(state, password_hash)) > 0
+
+    async def async_set_password_hash(self, state: PasswordHashState, password_hash: str) -> bool:
+        return await self._datastore.async_execute_without_result(
+            *self._make_password_hash_update(state, password_hash)
+        ) > 0
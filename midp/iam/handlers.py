@@ -1,14 +1,19 @@
-from typing import TypeVar, Type, List
+from typing import TypeVar, Type, List, Annotated
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from imagination import container
-from imagination.standalone import use
 
 from midp.common.base_rest_controller import BaseRestController
+from midp.common.rds import DataStoreSession
+from midp.common.web_helpers import use_read_only_datastore_session
+from midp.iam.dao.client import ClientDao
+from midp.iam.dao.policy import PolicyDao
+from midp.iam.dao.role import RoleDao
+from midp.iam.dao.scope import ScopeDao
+from midp.iam.dao.user import UserDao
 from midp.iam.models import IAMOAuthClient, IAMPolicy, IAMRole, IAMScope, IAMUser
 from midp.iam.rest_controller import PolicyRestController, ClientRestController, \
     RoleRestController, ScopeRestController, UserRestController
-from midp.common.rds import DataStore
 
 T = TypeVar('T')
 
@@ -26,22 +31,17 @@ common_router = APIRouter(
 
 
 @common_router.get('/stats')
-def get_iam_resource_statistics():
+def get_iam_resource_statistics(datastore_session: Annotated[DataStoreSession,
+                                                              Depends(use_read_only_datastore_session)]):
     ...
-    db = use(DataStore)
-    return [
-        {
-            k: getattr(row, k)
-            for k in row._fields
-        }
-        for row in db.execute(""" SELECT (SELECT COUNT(id) FROM iam_client) AS iam_client_count,
-                                         (SELECT COUNT(id) FROM iam_policy) AS iam_policy_count,
-                                         (SELECT COUNT(id) FROM iam_role)   AS iam_role_count,
-                                         (SELECT COUNT(id) FROM iam_scope)  AS iam_scope_count,
-                                         (SELECT COUNT(id) FROM iam_user)   AS iam_user_count,
-                                         NOW()                              AS updated_at
-                              """)
-    ][0]
+    # NOTE: The counts do not need to be up-to-the-second, so a read replica is good enough. All counts share one
+    #       session, i.e., one connection.
+    return dict(iam_client_count=container.get(ClientDao).count(datastore_session=datastore_session),
+                iam_policy_count=container.get(PolicyDao).count(datastore_session=datastore_session),
+                iam_role_count=container.get(RoleDao).count(datastore_session=datastore_session),
+                iam_scope_count=container.get(ScopeDao).count(datastore_session=datastore_session),
+                iam_user_count=container.get(UserDao).count(datastore_session=datastore_session),
+                updated_at=next(datastore_session.execute('SELECT CURRENT_TIMESTAMP AS updated_at')).updated_at)
 
 
 def create_router(resource_type: str, model_class: Type[T], controller_class: Type[BaseRestController[T]]) -> APIRouter:
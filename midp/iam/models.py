@@ -3,6 +3,7 @@ from typing import Any, Dict, List, Optional, Iterable
 from uuid import uuid4
 from pydantic import BaseModel, Field
 
+from midp.common.lazy_decryption import LazyDecryptionMixin
 from midp.static_info import SELF_REFERENCE_URI
 
 
@@ -119,12 +120,12 @@ class PredefinedRole(Enum):
     IDP_USER = IAMRole(name='idp.user', description='IDP User', fixed=True)
 
 
-class IAMUser(BaseModel):
+class IAMUser(LazyDecryptionMixin):
     __tbl__ = 'iam_user'
 
     id: Optional[str] = Field(default_factory=lambda: str(uuid4()))
     name: str
-    password: Optional[str]  # Auxiliary Property: Decrypted
+    password: Optional[str]  # Auxiliary Property: Decrypted (lazily)
     email: str
     full_name: Optional[str] = None
     roles: List[str] = Field(default_factory=list)  # Role URNs # Auxiliary Property: Augmented
@@ -148,12 +149,12 @@ class IAMUserReadOnly(BaseModel):
         )
 
 
-class IAMOAuthClient(BaseModel):
+class IAMOAuthClient(LazyDecryptionMixin):
     __tbl__ = 'iam_client'
 
     id: Optional[str] = Field(default_factory=lambda: str(uuid4()))
     name: str
-    secret: Optional[str] = None  # Auxiliary Property: Decrypted
+    secret: Optional[str] = None  # Auxiliary Property: Decrypted (lazily)
     audience: str
     grant_types: List[str]
     response_types: List[str] = Field(default_factory=list)
@@ -5,7 +5,8 @@ from imagination.decorator.service import Service
 from starlette.requests import Request
 
 from midp.common.base_rest_controller import BaseRestController
-from midp.common.web_helpers import authenticate_with_bearer_token
+from midp.common.rds import DataStoreSession
+from midp.common.web_helpers import authenticate_with_bearer_token, use_datastore_session
 from midp.iam.dao.client import ClientDao
 from midp.iam.dao.policy import PolicyDao
 from midp.iam.dao.role import RoleDao
@@ -23,8 +24,12 @@ class PolicyRestController(BaseRestController[IAMPolicy]):
     def _get_scopes_namespace(self) -> str:
         return 'idp.policy'
 
-    def create(self, request: Request, obj: IAMPolicy, access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)]) -> IAMPolicy:
-        return super().create(request, obj, access_claims)
+    def create(self,
+               request: Request,
+               obj: IAMPolicy,
+               access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)],
+               datastore_session: Annotated[DataStoreSession, Depends(use_datastore_session)]) -> IAMPolicy:
+        return super().create(request, obj, access_claims, datastore_session)
 
 
 @Service()
@@ -36,8 +41,12 @@ class ClientRestController(BaseRestController[IAMOAuthClient]):
     def _get_scopes_namespace(self) -> str:
         return 'idp.client'
 
-    def create(self, request: Request, obj: IAMOAuthClient, access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)]) -> IAMOAuthClient:
-        return super().create(request, obj, access_claims)
+    def create(self,
+               request: Request,
+               obj: IAMOAuthClient,
+               access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)],
+               datastore_session: Annotated[DataStoreSession, Depends(use_datastore_session)]) -> IAMOAuthClient:
+        return super().create(request, obj, access_claims, datastore_session)
 
 
 @Service()
@@ -49,8 +58,12 @@ class RoleRestController(BaseRestController[IAMRole]):
     def _get_scopes_namespace(self) -> str:
         return 'idp.role'
 
-    def create(self, request: Request, obj: IAMRole, access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)]) -> IAMRole:
-        return super().create(request, obj, access_claims)
+    def create(self,
+               request: Request,
+               obj: IAMRole,
+               access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)],
+               datastore_session: Annotated[DataStoreSession, Depends(use_datastore_session)]) -> IAMRole:
+        return super().create(request, obj, access_claims, datastore_session)
 
 
 @Service()
@@ -62,8 +75,12 @@ class ScopeRestController(BaseRestController[IAMScope]):
     def _get_scopes_namespace(self) -> str:
         return 'idp.scope'
 
-    def create(self, request: Request, obj: IAMScope, access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)]) -> IAMScope:
-        return super().create(request, obj, access_claims)
+    def create(self,
+               request: Request,
+               obj: IAMScope,
+               access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)],
+               datastore_session: Annotated[DataStoreSession, Depends(use_datastore_session)]) -> IAMScope:
+        return super().create(request, obj, access_claims, datastore_session)
 
 
 @Service()
@@ -78,5 +95,9 @@ class UserRestController(BaseRestController[IAMUser]):
     def _hide_sensitive_fields(self, obj: IAMUser) -> IAMUser:
         return obj.model_copy(update={"password": None}, deep=False)
 
-    def create(self, request: Request, obj: IAMUser, access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)]) -> IAMUser:
-        return super().create(request, obj, access_claims)
+    def create(self,
+               request: Request,
+               obj: IAMUser,
+               access_claims: Annotated[Dict[str, Any], Depends(authenticate_with_bearer_token)],
+               datastore_session: Annotated[DataStoreSession, Depends(use_datastore_session)]) -> IAMUser:
+        return super().create(request, obj, access_claims, datastore_session)
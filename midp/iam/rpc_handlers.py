@@ -4,7 +4,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from imagination import container
 from starlette.responses import Response
 
-from midp.common.web_helpers import authenticate_with_bearer_token
+from midp.common.rds import DataStoreSession
+from midp.common.web_helpers import authenticate_with_bearer_token, use_read_only_datastore_session
 from midp.iam.dao.user import UserDao
 from midp.iam.models import IAMUserReadOnly
 
@@ -16,10 +17,12 @@ def get_user_profile(response: Response,
                      access_token: Annotated[
                          Dict[str, Any],
                          Depends(authenticate_with_bearer_token)
-                     ]) -> Optional[IAMUserReadOnly]:
+                     ],
+                     datastore_session: Annotated[DataStoreSession, Depends(use_read_only_datastore_session)]
+                     ) -> Optional[IAMUserReadOnly]:
     user_id = access_token['sub']
     user_dao: UserDao = container.get(UserDao)
-    user = user_dao.get(user_id)
+    user = user_dao.get(user_id, datastore_session=datastore_session)
     if user is None:
         raise HTTPException(status_code=404)
     else:
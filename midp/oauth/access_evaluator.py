@@ -1,8 +1,8 @@
-import asyncio
 from typing import Optional
 
 from imagination.decorator.service import Service
 
+from midp.common.rds import AsyncDataStoreSession
 from midp.iam.dao.client import ClientDao
 from midp.iam.models import IAMOAuthClient, GrantType
 from midp.log_factory import midp_logger_for
@@ -28,9 +28,10 @@ class ClientAuthenticator:
                            client_id: str,
                            grant_type: str,
                            client_secret: Optional[str] = None,
+                           datastore_session: Optional[AsyncDataStoreSession] = None,
                            ) -> IAMOAuthClient:
         client_dao: ClientDao = self._client_dao
-        client: IAMOAuthClient = await asyncio.to_thread(client_dao.get, client_id)
+        client: IAMOAuthClient = await client_dao.async_get(client_id, datastore_session=datastore_session)
 
         if not client:
             self._log.warning(f'Unable to find Client/{client_id} for any grant types.')
@@ -1,4 +1,3 @@
-import asyncio
 import hashlib
 import re
 from math import floor
@@ -12,19 +11,21 @@ from imagination import container
 from pydantic import BaseModel
 from sqlalchemy.sql.functions import session_user
 from starlette.requests import Request
-from starlette.responses import Response, RedirectResponse
+from starlette.responses import Response, RedirectResponse, JSONResponse
 
+from midp.common.enigma import Enigma
 from midp.common.key_storage import KeyStorage, Entry
+from midp.common.rds import AsyncDataStoreSession
 from midp.common.session_manager import Session
 from midp.common.token_manager import TokenManager, TokenSet, TokenGenerationError
-from midp.common.web_helpers import restore_session
+from midp.common.web_helpers import restore_session, use_async_read_only_datastore_session
 from midp.iam.models import PredefinedScope, IAMPolicySubject, GrantType
 from midp.log_factory import midp_logger
 from midp.oauth.access_evaluator import ClientAuthenticator, ClientAuthenticationError
 from midp.oauth.models import DeviceVerificationCodeResponse, TokenExchangeResponse, \
     DeviceAuthorizationRequest, DeviceAuthorizationResponse, LoginResponse
 from midp.oauth.user_authenticator import UserAuthenticator, AuthenticationResult, AuthenticationError
-from midp.static_info import VERIFICATION_TTL
+from midp.static_info import VERIFICATION_TTL, JWKS_MAX_AGE
 
 oauth_router = APIRouter(
     prefix=r'/oauth',
@@ -56,14 +57,13 @@ async def sign_in(request: Request,
             user_auth: UserAuthenticator = container.get(UserAuthenticator)
 
             try:
-                result: AuthenticationResult = await asyncio.to_thread(user_auth.authenticate,
-                                                                       username,
-                                                                       password)
+                # NOTE: The authenticator only holds a connection while querying, not while hashing the password.
+                result: AuthenticationResult = await user_auth.async_authenticate(username, password)
 
                 session.data['user'] = result.principle.model_dump(mode='python')
                 session.data['access_token'] = result.access_token
                 session.data['refresh_token'] = result.refresh_token
-                await asyncio.to_thread(session.save)
+                await session.async_save()
 
                 response.set_cookie('sid', session.encrypted_id)
                 response_body.session_id = session.id
@@ -86,7 +86,7 @@ async def sign_out(session: Annotated[Session, Depends(restore_session)]):
 
     if 'user' in session.data:
         del session.data['user']
-        session.save()
+        await session.async_save()
 
         response.delete_cookie('sid')
 
@@ -118,12 +118,21 @@ async def check_session_authorization(response: Response,
         return None
 
 
+@oauth_router.get(r'/certs', summary='The public keys to verify the tokens offline (JWK set)')
+async def get_jwks() -> JSONResponse:
+    # NOTE: The clients may cache the keys, so the signing key is rotated by keeping the former one as a retired key.
+    return JSONResponse(container.get(Enigma).get_jwks(),
+                        headers={'Cache-Control': f'public, max-age={JWKS_MAX_AGE}'})
+
+
 @oauth_router.post(r'/device')
 async def initiate_device_authorization(client_id: Annotated[str, Form()],
                                         session: Annotated[Session, Depends(restore_session)],
                                         scope: Annotated[str, Form()],
                                         request: Request,
                                         response: Response,
+                                        datastore_session: Annotated[AsyncDataStoreSession,
+                                                                     Depends(use_async_read_only_datastore_session)],
                                         resource: Optional[str] = None,
                                         ):
     access_evaluator: ClientAuthenticator = container.get(ClientAuthenticator)
@@ -142,7 +151,9 @@ async def initiate_device_authorization(client_id: Annotated[str, Form()],
         return DeviceVerificationCodeResponse(error='invalid_scope')
 
     try:
-        await access_evaluator.authenticate(client_id=client_id, grant_type=GrantType.DEVICE_CODE)
+        await access_evaluator.authenticate(client_id=client_id,
+                                            grant_type=GrantType.DEVICE_CODE,
+                                            datastore_session=datastore_session)
     except ClientAuthenticationError as e:
         response.status_code = 400
         return DeviceVerificationCodeResponse(error=e.reason)
@@ -155,8 +166,7 @@ async def initiate_device_authorization(client_id: Annotated[str, Form()],
     key_storage: KeyStorage = container.get(KeyStorage)
     expiry_timestamp = floor(time() + VERIFICATION_TTL)
 
-    await asyncio.to_thread(
-        key_storage.batch_set,
+    await key_storage.async_batch_set(
         Entry(
             key=f'user-code:{user_code}/device-code',
             value=device_code,
@@ -204,7 +214,10 @@ class TokenExchangeRequest(BaseModel):
 @oauth_router.post(r'/token')
 async def exchange_token(data: Annotated[TokenExchangeRequest, Form()],
                          request: Request,
-                         response: Response) -> TokenExchangeResponse:
+                         response: Response,
+                         datastore_session: Annotated[AsyncDataStoreSession,
+                                                      Depends(use_async_read_only_datastore_session)]
+                         ) -> TokenExchangeResponse:
     # Based on https://learn.microsoft.com/en-us/entra/identity-platform/v2-oauth2-client-creds-grant-flow
 
     log = midp_logger('/oauth/token')
@@ -218,6 +231,7 @@ async def exchange_token(data: Annotated[TokenExchangeRequest, Form()],
             client_id=data.client_id,
             client_secret=data.client_secret,
             grant_type=data.grant_type,
+            datastore_session=datastore_session,
         )
     except ClientAuthenticationError as e:
         log.warning(f"Detected token exchange attempt with Client/{data.client_id} (REJECTED: {e.reason})")
@@ -232,10 +246,11 @@ async def exchange_token(data: Annotated[TokenExchangeRequest, Form()],
         iam_policy_subject = IAMPolicySubject(subject=client.name, kind="client")
 
         try:
-            token_set: TokenSet = token_manager.create_token_set(
+            token_set: TokenSet = await token_manager.async_create_token_set(
                 subject=iam_policy_subject,
                 resource_url=resource_url,
                 requested_scopes=re.split(r'\s+', data.scope) if data.scope else [],
+                datastore_session=datastore_session,
             )
             return TokenExchangeResponse(access_token=token_set.access_token,
                                          expires_in=floor(token_set.access_claims['exp'] - time()),
@@ -248,10 +263,10 @@ async def exchange_token(data: Annotated[TokenExchangeRequest, Form()],
         # Handle the device code flow #
         ###############################
         key_storage: KeyStorage = container.get(KeyStorage)
-        verification_state = await key_storage.async_get(f'device-code:{data.device_code}/state')
+        verification_state = await key_storage.async_get(f'device-code:{data.device_code}/state', read_only=False)
 
         if verification_state == 'ok':
-            verified_info = await key_storage.async_get(f'device-code:{data.device_code}/info')
+            verified_info = await key_storage.async_get(f'device-code:{data.device_code}/info', read_only=False)
             resource_url = verified_info['resource_url']
             subject: str = verified_info['sub']
             requested_scopes = verified_info['scopes']
@@ -265,10 +280,10 @@ async def exchange_token(data: Annotated[TokenExchangeRequest, Form()],
                                                       kind='user')
 
             try:
-                token_set: TokenSet = await asyncio.to_thread(token_manager.create_token_set,
-                                                              iam_policy_subject,
-                                                              resource_url,
-                                                              requested_scopes)
+                token_set: TokenSet = await token_manager.async_create_token_set(iam_policy_subject,
+                                                                                 resource_url,
+                                                                                 requested_scopes,
+                                                                                 datastore_session)
                 return TokenExchangeResponse(access_token=token_set.access_token,
                                              expires_in=floor(token_set.access_claims['exp'] - time()),
                                              refresh_token=token_set.refresh_token)
@@ -305,7 +320,7 @@ async def confirm_for_device_activation(request: Request,
 
     key_storage: KeyStorage = container.get(KeyStorage)
 
-    device_code: str = await key_storage.async_get(f'user-code:{data.user_code}/device-code')
+    device_code: str = await key_storage.async_get(f'user-code:{data.user_code}/device-code', read_only=False)
     if not device_code:
         response.status_code = 400
         return (
@@ -314,7 +329,7 @@ async def confirm_for_device_activation(request: Request,
             else RedirectResponse(f'/#/error?code=expired_token&description=device_code.not_found')
         )
 
-    expected_user_code: str = await key_storage.async_get(f'device-code:{device_code}/user-code')
+    expected_user_code: str = await key_storage.async_get(f'device-code:{device_code}/user-code', read_only=False)
     if not expected_user_code:
         response.status_code = 400
         return (
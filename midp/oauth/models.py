@@ -90,5 +90,5 @@ class OpenIDConfiguration(BaseModel):
             introspection_endpoint=None,  # urljoin(realm_base_url, f'introspection'),
             userinfo_endpoint=None,  # urljoin(realm_base_url, f'userinfo'),
             end_session_endpoint=None,  # urljoin(realm_base_url, f'logout'),
-            jwks_uri=None,  # urljoin(realm_base_url, f'certs'),
+            jwks_uri=urljoin(base_url, f'certs'),
         )
@@ -1,11 +1,14 @@
+import hmac
 from typing import Optional
 
 from imagination.decorator.service import Service
 from pydantic import BaseModel
 
+from midp.common.password_hasher import PasswordHasher
+from midp.common.rds import DataStore
 from midp.common.token_manager import TokenManager
-from midp.iam.dao.user import UserDao
-from midp.iam.models import IAMUserReadOnly, IAMPolicySubject
+from midp.iam.dao.user import UserDao, PasswordHashState
+from midp.iam.models import IAMUserReadOnly, IAMPolicySubject, IAMUser
 from midp.log_factory import midp_logger, midp_logger_for
 
 
@@ -30,31 +33,115 @@ class AuthenticationError(RuntimeError):
 
 @Service()
 class UserAuthenticator:
-    def __init__(self, user_dao: UserDao, token_manager: TokenManager):
+    def __init__(self,
+                 datastore: DataStore,
+                 user_dao: UserDao,
+                 token_manager: TokenManager,
+                 password_hasher: PasswordHasher):
         self._log = midp_logger_for(self)
+        self._datastore = datastore
         self._user_dao = user_dao
         self._token_manager = token_manager
+        self._password_hasher = password_hasher
 
-    def authenticate(self, username: str, password: str, resource_url: Optional[str] = None) -> AuthenticationResult:
-        user = self._user_dao.get(username)
+    @staticmethod
+    def _match_password(user: IAMUser, password: str) -> bool:
+        return user.password is not None and hmac.compare_digest(user.password.encode(), password.encode())
 
-        from midp.common.enigma import Enigma
-        from imagination.standalone import use
-        enigma = use(Enigma)
+    def _verify_password(self, user: Optional[IAMUser], state: Optional[PasswordHashState], password: str) -> bool:
+        """ Verify the password against the password hash
 
-        self._log.warning(f"PANDA: user={user.name}: user.password='{user.password}' (hash={enigma.compute_hash(user.password)})")
-        self._log.warning(f"PANDA: user={user.name}: password='{password}' (hash={enigma.compute_hash(password)})")
-        self._log.warning(f"PANDA: user={user.name}: password == user.password --> {password == user.password}")
+            Without a current hash, the password is compared with the decrypted one. In that case, or if the hash
+            was computed with another cost, the password is (re)hashed after the successful verification.
 
-        if user and user.password == password:
-            policy_subject = IAMPolicySubject(subject=user.name, kind="user")
-            token_set = self._token_manager.create_token_set(subject=policy_subject, resource_url=resource_url)
+            Without any hash, e.g., for an unknown user, the dummy hash is verified anyway, so that the unknown
+            users cannot be told apart by the response time.
+        """
+        if state and state.password_hash:
+            if not self._password_hasher.verify(password, state.password_hash):
+                return False
+            elif not self._password_hasher.needs_rehash(state.password_hash):
+                return True
+        else:
+            self._password_hasher.verify(password, self._password_hasher.dummy_hash)
+
+            if not state or not self._match_password(user, password):
+                return False
+
+        self._user_dao.set_password_hash(state, self._password_hasher.hash(password))
 
-            return AuthenticationResult(
-                principle=IAMUserReadOnly.build_from(user),
-                access_token=token_set.access_token,
-                refresh_token=token_set.refresh_token,
-            )
+        return True
+
+    async def _async_verify_password(self,
+                                     user: Optional[IAMUser],
+                                     state: Optional[PasswordHashState],
+                                     password: str) -> bool:
+        if state and state.password_hash:
+            if not await self._password_hasher.async_verify(password, state.password_hash):
+                return False
+            elif not self._password_hasher.needs_rehash(state.password_hash):
+                return True
         else:
+            await self._password_hasher.async_verify(password, self._password_hasher.dummy_hash)
+
+            if not state or not self._match_password(user, password):
+                return False
+
+        await self._user_dao.async_set_password_hash(state, await self._password_hasher.async_hash(password))
+
+        return True
+
+    def authenticate(self,
+                     username: str,
+                     password: str,
+                     resource_url: Optional[str] = None) -> AuthenticationResult:
+        """ Authenticate the user and issue the tokens
+
+            The connection is only checked out to load the user and again to issue the tokens, i.e., not while the
+            password is hashed in the worker processes, which may take much longer than the queries.
+        """
+        with self._datastore.in_session(read_only=True) as datastore_session:
+            user = self._user_dao.get(username, datastore_session=datastore_session)
+            state = self._user_dao.get_password_hash(user.id, datastore_session=datastore_session) if user else None
+
+        if not self._verify_password(user, state, password):
             self._log.warning("Invalid username/password combination")
             raise AuthenticationError('invalid_credential', 'Invalid Credential')
+
+        with self._datastore.in_session(read_only=True) as datastore_session:
+            token_set = self._token_manager.create_token_set(subject=IAMPolicySubject(subject=user.name, kind="user"),
+                                                             resource_url=resource_url,
+                                                             datastore_session=datastore_session)
+
+        return AuthenticationResult(
+            principle=IAMUserReadOnly.build_from(user),
+            access_token=token_set.access_token,
+            refresh_token=token_set.refresh_token,
+        )
+
+    async def async_authenticate(self,
+                                 username: str,
+                                 password: str,
+                                 resource_url: Optional[str] = None) -> AuthenticationResult:
+        """ The asyncio counterpart of :meth:`authenticate` """
+        async with self._datastore.async_in_session(read_only=True) as datastore_session:
+            user = await self._user_dao.async_get(username, datastore_session=datastore_session)
+            state = (await self._user_dao.async_get_password_hash(user.id, datastore_session=datastore_session)
+                     if user
+                     else None)
+
+        if not await self._async_verify_password(user, state, password):
+            self._log.warning("Invalid username/password combination")
+            raise AuthenticationError('invalid_credential', 'Invalid Credential')
+
+        async with self._datastore.async_in_session(read_only=True) as datastore_session:
+            token_set = await self._token_manager.async_create_token_set(subject=IAMPolicySubject(subject=user.name,
+                                                                                                  kind="user"),
+                                                                         resource_url=resource_url,
+                                                                         datastore_session=datastore_session)
+
+        return AuthenticationResult(
+            principle=IAMUserReadOnly.build_from(user),
+            access_token=token_set.access_token,
+            refresh_token=token_set.refresh_token,
+        )
@@ -8,6 +8,7 @@ from imagination import container
 
 from midp.common.env_helpers import required_env, optional_env
 from midp.static_info import BOOTING_OPTIONS
+from midp.iam.dao.atomic import InsertError
 from midp.iam.dao.client import ClientDao
 from midp.iam.dao.policy import PolicyDao
 from midp.iam.dao.role import RoleDao
@@ -33,20 +34,16 @@ def restore_from_snapshot(main_config: AppSnapshot, session: Optional[DataStoreS
     client_dao: ClientDao = container.get(ClientDao)
     policy_dao: PolicyDao = container.get(PolicyDao)
 
-    for scope in main_config.scopes:
-        scope_dao.add(scope, datastore_session=session)
-
-    for role in main_config.roles:
-        role_dao.add(role, datastore_session=session)
-
-    for user in main_config.users:
-        user_dao.add(user, datastore_session=session)
-
-    for client in main_config.clients:
-        client_dao.add(client, datastore_session=session)
-
-    for policy in main_config.policies:
-        policy_dao.add(policy, datastore_session=session)
+    for dao, objs in [
+        (scope_dao, main_config.scopes),
+        (role_dao, main_config.roles),
+        (user_dao, main_config.users),
+        (client_dao, main_config.clients),
+        (policy_dao, main_config.policies),
+    ]:
+        result = dao.bulk_insert(objs, datastore_session=session)
+        if result.skipped:
+            raise InsertError(result.skipped[0])
 
     session.commit()
 
@@ -89,6 +86,9 @@ def _clear_operational_data(session: Optional[DataStoreSession] = None):
         'DELETE FROM iam_policy WHERE id IS NOT NULL',
     ]:
         session.execute_without_result(reset_statement)
+
+    for dao_class in [ScopeDao, RoleDao, UserDao, ClientDao, PolicyDao]:
+        container.get(dao_class).notify_change(session)
     log.debug("Resetting the data... [COMPLETE]")
 
 
@@ -91,3 +91,25 @@ SELF_REFERENCE_URI = optional_env('MINI_IDP_SELF_REF_URI',
                                   'http://localhost:8081/',
                                   help="Self reference URI back to this service")
 IN_DEBUG_MODE = optional_env('MINI_IDP_DEBUG', '', help="The debug mode flag").lower() in ['1', 'true']
+REST_MAX_PAGE_SIZE = int(optional_env('MINI_IDP_REST_MAX_PAGE_SIZE',
+                                      '1000',
+                                      help="The maximum (and default) number of resources per page of the REST API"))
+ENTITY_CACHE_TABLES = [
+    table_name.strip()
+    for table_name in optional_env('MINI_IDP_ENTITY_CACHE_TABLES',
+                                   '',
+                                   help="The comma-separated tables to cache in process, e.g., iam_client").split(',')
+    if table_name.strip()
+]
+ENTITY_CACHE_SIZE = int(optional_env('MINI_IDP_ENTITY_CACHE_SIZE',
+                                     '1000',
+                                     help="The maximum number of cached results per table"))
+ENTITY_CACHE_TTL = float(optional_env('MINI_IDP_ENTITY_CACHE_TTL',
+                                      '60',
+                                      help="The number of seconds to keep a cached result"))
+TOKEN_CACHE_SIZE = int(optional_env('MINI_IDP_TOKEN_CACHE_SIZE',
+                                    '10000',
+                                    help="The maximum number of verified bearer tokens kept in process (0 to disable)"))
+JWKS_MAX_AGE = int(optional_env('MINI_IDP_JWKS_MAX_AGE',
+                                '3600',
+                                help="The number of seconds for the clients to cache the JWK set (/oauth/certs)"))
@@ -1,17 +1,33 @@
 import asyncio
 import traceback
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional
 from urllib.parse import urljoin
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
+from imagination import container
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from starlette.requests import Request
 from starlette.responses import Response
 from starlette.staticfiles import StaticFiles
 
 from midp import static_info
+from midp.common.cache import CacheStats
 from midp.common.env_helpers import optional_env
+from midp.common.password_hasher import PasswordHasher
+from midp.common.rds import DataStore, DataStoreQueryStats, current_route
+from midp.common.reencryption import Reencryption, ReencryptionStatus
+from midp.common.token_manager import TokenManager
 from midp.static_info import IN_DEBUG_MODE
-from midp.common.web_helpers import InvalidBearerToken, MissingBearerToken
+from midp.common.warm_up import WarmUp
+from midp.common.web_helpers import InvalidBearerToken, MissingBearerToken, make_generic_json_response, \
+    authorize_privileged_access
+from midp.iam.dao.atomic import AtomicDao
+from midp.iam.dao.client import ClientDao
+from midp.iam.dao.policy import PolicyDao
+from midp.iam.dao.role import RoleDao
+from midp.iam.dao.scope import ScopeDao
+from midp.iam.dao.user import UserDao
 from midp.iam.handlers import iam_rest_routers
 from midp.iam.rpc_handlers import iam_rpc_router
 from midp.log_factory import midp_logger
@@ -19,9 +35,28 @@ from midp.oauth.handler import oauth_router
 from midp.oauth.models import OpenIDConfiguration
 from midp.snapshot.handler import recovery_router
 
-app = FastAPI(title=static_info.ARTIFACT_ID, version=static_info.VERSION)
 log = midp_logger('root:web')
 
+
+@asynccontextmanager
+async def run_app_lifecycle(_: FastAPI):
+    # NOTE: Only the web server listens to the changes of the cached tables of the other processes.
+    container.get(DataStore).listen_to_changes()
+
+    # NOTE: The warm-up runs in the background so that the readiness probe can respond in the meantime.
+    warm_up_task = asyncio.create_task(container.get(WarmUp).async_run())
+    reencryption_task = asyncio.create_task(container.get(Reencryption).async_run())
+
+    yield
+
+    warm_up_task.cancel()
+    reencryption_task.cancel()
+    container.get(PasswordHasher).shutdown()
+    await container.get(DataStore).dispose()
+
+
+app = FastAPI(title=static_info.ARTIFACT_ID, version=static_info.VERSION, lifespan=run_app_lifecycle)
+
 MINI_IDP_DEV_PERMANENT_DELAY = float(optional_env('MINI_IDP_DEV_PERMANENT_DELAY',
                                                   '0',
                                                   'Permanent connection delay for development and testing'))
@@ -43,6 +78,7 @@ async def intercept_request_response(request: Request, call_next):
         log.debug(f'{log_prefix}: Resume the request.')
 
     # Proceed with the request.
+    route_token = current_route.set(f'{request.method} {request_path}')
     try:
         response: Response = await call_next(request)
     except (MissingBearerToken, InvalidBearerToken):
@@ -51,6 +87,8 @@ async def intercept_request_response(request: Request, call_next):
             data = traceback.format_exc()
             log.warning(f'On Security: Exception: {data}')
         response = Response(status_code=401, content=content)
+    finally:
+        current_route.reset(route_token)
     response.headers['Server'] = f'{static_info.ARTIFACT_ID}/{static_info.VERSION}'
 
     return response
@@ -71,6 +109,58 @@ def release_information():
     }
 
 
+@app.get("/health/ready", tags=['app-metadata'])
+def check_readiness() -> Response:
+    """ Respond with HTTP 200 only once the worker is warmed up, otherwise HTTP 503 """
+    status = container.get(WarmUp).status
+    return make_generic_json_response(200 if status.ready else 503,
+                                      'ready' if status.ready else 'warming_up',
+                                      details=status.model_dump())
+
+
+@app.get("/service-info/datastore/pool", tags=['app-metadata'], dependencies=[Depends(authorize_privileged_access)])
+def get_datastore_pool_statistics() -> Dict[str, Any]:
+    datastore: DataStore = container.get(DataStore)
+    return {
+        'sync': datastore.get_pool_stats(),
+        'async': datastore.get_async_pool_stats(),
+        'replicas': datastore.get_replica_pool_stats(),
+    }
+
+
+@app.get("/service-info/datastore/queries", tags=['app-metadata'], dependencies=[Depends(authorize_privileged_access)])
+def get_datastore_query_statistics() -> List[DataStoreQueryStats]:
+    """ The execution time of the statements per fingerprint, the most time-consuming first """
+    datastore: DataStore = container.get(DataStore)
+    return datastore.get_query_stats()
+
+
+@app.get("/service-info/entity-cache", tags=['app-metadata'], dependencies=[Depends(authorize_privileged_access)])
+def get_entity_cache_statistics() -> Dict[str, CacheStats]:
+    """ The stats of the entity cache per table (only the tables in MINI_IDP_ENTITY_CACHE_TABLES) """
+    stats: Dict[str, CacheStats] = dict()
+
+    for dao_class in [ClientDao, PolicyDao, RoleDao, ScopeDao, UserDao]:
+        dao: AtomicDao = container.get(dao_class)
+        dao_stats = dao.get_cache_stats()
+        if dao_stats:
+            stats[dao.table_name] = dao_stats
+
+    return stats
+
+
+@app.get("/service-info/token-cache", tags=['app-metadata'], dependencies=[Depends(authorize_privileged_access)])
+def get_token_cache_statistics() -> Optional[CacheStats]:
+    """ The stats of the verified bearer tokens cached in process (none with MINI_IDP_TOKEN_CACHE_SIZE=0) """
+    return container.get(TokenManager).get_token_cache_stats()
+
+
+@app.get("/service-info/reencryption", tags=['app-metadata'], dependencies=[Depends(authorize_privileged_access)])
+def get_reencryption_status() -> ReencryptionStatus:
+    """ The progress of the re-encryption of the legacy data (only with MINI_IDP_REENCRYPTION_ENABLED) """
+    return container.get(Reencryption).status
+
+
 @app.get(r'/.well-known/openid-configuration',
          response_model_exclude_defaults=True,
          tags=['oauth'],
@@ -0,0 +1,3 @@
+-- The password hashes (scrypt) of the users, each bound to the encrypted password which it was computed from
+ALTER TABLE iam_user ADD COLUMN password_hash VARCHAR;
+ALTER TABLE iam_user ADD COLUMN password_hash_binding VARCHAR;
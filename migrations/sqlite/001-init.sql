@@ -0,0 +1,73 @@
+-- The SQLite counterpart of migrations/001-init.sql. The JSON columns are stored as text (see the JSON1 functions).
+
+-- Scopes
+DROP TABLE IF EXISTS iam_scope;
+CREATE TABLE iam_scope (
+  id VARCHAR NOT NULL PRIMARY KEY,
+  name VARCHAR NOT NULL,
+  description VARCHAR,
+  sensitive BOOLEAN DEFAULT false NOT NULL,
+  fixed BOOLEAN DEFAULT false NOT NULL,
+  CONSTRAINT uniq_iam_scope_name UNIQUE (name)
+);
+
+-- Roles
+DROP TABLE IF EXISTS iam_role;
+CREATE TABLE iam_role (
+  id VARCHAR NOT NULL PRIMARY KEY,
+  name VARCHAR NOT NULL,
+  description VARCHAR,
+  sensitive BOOLEAN DEFAULT false NOT NULL,
+  fixed BOOLEAN DEFAULT false NOT NULL,
+  CONSTRAINT uniq_iam_role_name UNIQUE (name)
+);
+
+-- Users
+DROP TABLE IF EXISTS iam_user;
+CREATE TABLE iam_user (
+  id VARCHAR NOT NULL PRIMARY KEY,
+  name VARCHAR NOT NULL,
+  encrypted_password VARCHAR NOT NULL,
+  email VARCHAR NOT NULL,
+  full_name VARCHAR,
+  roles JSON,
+  CONSTRAINT uniq_iam_user_name UNIQUE (name),
+  CONSTRAINT uniq_iam_user_email UNIQUE (email)
+);
+
+-- OAuth2 Client
+DROP TABLE IF EXISTS iam_client;
+CREATE TABLE iam_client (
+  id VARCHAR NOT NULL PRIMARY KEY,
+  name VARCHAR NOT NULL,
+  encrypted_secret VARCHAR,
+  audience VARCHAR NOT NULL,
+  grant_types JSON NOT NULL,
+  response_types JSON,
+  scopes JSON NOT NULL,
+  extras JSON,
+  description VARCHAR,
+  CONSTRAINT uniq_client_name UNIQUE (name)
+);
+
+-- Policies
+DROP TABLE IF EXISTS iam_policy;
+CREATE TABLE iam_policy (
+  id VARCHAR NOT NULL PRIMARY KEY,
+  name VARCHAR NOT NULL,
+  subjects JSON NOT NULL,
+  resource VARCHAR NOT NULL,
+  scopes JSON NOT NULL,
+  fixed BOOLEAN DEFAULT false NOT NULL,
+  CONSTRAINT uniq_iam_policy_name UNIQUE (name)
+);
+
+-- Per-Realm Key-value Store
+DROP TABLE IF EXISTS kv;
+CREATE TABLE kv (
+    k VARCHAR NOT NULL,
+    v JSON NOT NULL,
+    expiry_timestamp INTEGER,
+    PRIMARY KEY (k)
+);
+CREATE INDEX idx_realm_kv_expiry_timestamp ON kv (k, expiry_timestamp);
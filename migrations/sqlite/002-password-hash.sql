@@ -0,0 +1,3 @@
+-- The SQLite counterpart of migrations/002-password-hash.sql
+ALTER TABLE iam_user ADD COLUMN password_hash VARCHAR;
+ALTER TABLE iam_user ADD COLUMN password_hash_binding VARCHAR;
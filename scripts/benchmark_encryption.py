@@ -0,0 +1,88 @@
+""" Benchmark the encryption schemes of Enigma
+
+    This compares the envelopes (AES-GCM with a data key wrapped by the RSA key pair) with the legacy ciphertexts
+    (RSA-OAEP with the key pair for every message) on the secrets as short as the user passwords.
+
+    Usage: python3 scripts/benchmark_encryption.py [message count]
+"""
+import gc
+import os
+import sys
+from base64 import b64encode
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from midp.common.enigma import Enigma
+
+
+def make_enigma(dir_path: str) -> Enigma:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_key_path = os.path.join(dir_path, 'private.pem')
+    public_key_path = os.path.join(dir_path, 'public.pem')
+
+    with open(private_key_path, 'wb') as f:
+        f.write(private_key.private_bytes(serialization.Encoding.PEM,
+                                          serialization.PrivateFormat.PKCS8,
+                                          serialization.NoEncryption()))
+    with open(public_key_path, 'wb') as f:
+        f.write(private_key.public_key().public_bytes(serialization.Encoding.PEM,
+                                                      serialization.PublicFormat.SubjectPublicKeyInfo))
+
+    return Enigma(private_key_path, public_key_path)
+
+
+def measure(name: str, message_count: int, run_all) -> float:
+    # Like timeit, keep the garbage collector out of the measurement.
+    gc.collect()
+    gc.disable()
+
+    try:
+        started_at = perf_counter()
+        run_all()
+        elapsed_time = perf_counter() - started_at
+    finally:
+        gc.enable()
+    rate = message_count / elapsed_time
+
+    print(f'{name:<20} {elapsed_time * 1000:10.1f} ms {elapsed_time / message_count * 1e6:10.1f} µs/op')
+
+    return rate
+
+
+# noinspection PyProtectedMember
+def main():
+    message_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000
+
+    with TemporaryDirectory() as dir_path:
+        enigma = make_enigma(dir_path)
+
+    messages = [f'password-{i}'.encode() for i in range(message_count)]
+
+    print(f'Encrypting and decrypting {message_count:,} messages')
+
+    legacy_ciphertexts = []
+    envelopes = []
+
+    measure('encrypt (legacy)',
+            message_count,
+            lambda: legacy_ciphertexts.extend(b64encode(enigma._encrypt_with_public_key(m)) for m in messages))
+    measure('encrypt (envelope)',
+            message_count,
+            lambda: envelopes.extend(enigma.encrypt(m) for m in messages))
+
+    assert [enigma.decrypt(c) for c in legacy_ciphertexts[:10]] == messages[:10]
+    assert [enigma.decrypt(c) for c in envelopes[:10]] == messages[:10]
+
+    legacy_rate = measure('decrypt (legacy)', message_count, lambda: [enigma.decrypt(c) for c in legacy_ciphertexts])
+    envelope_rate = measure('decrypt (envelope)', message_count, lambda: [enigma.decrypt(c) for c in envelopes])
+
+    print(f'Decryption speed-up: {envelope_rate / legacy_rate:.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+""" Benchmark the JWT signing algorithms of Enigma
+
+    This compares RS256, ES256 and EdDSA on the claims as issued by TokenManager in one process, i.e., per core. One
+    token issuance signs two JWTs (the access and the refresh tokens). See MINI_IDP_JWT_ALGORITHM in .env.dist.
+
+    Usage: python3 scripts/benchmark_jwt_signing.py [token count]
+"""
+import gc
+import os
+import sys
+from tempfile import TemporaryDirectory
+from time import perf_counter, time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from midp.common.enigma import Enigma
+
+ALGORITHMS = ['RS256', 'ES256', 'EdDSA']
+
+
+def write_key_pair(dir_path: str, name: str, private_key) -> tuple:
+    private_key_path = os.path.join(dir_path, f'{name}-private.pem')
+    public_key_path = os.path.join(dir_path, f'{name}-public.pem')
+
+    with open(private_key_path, 'wb') as f:
+        f.write(private_key.private_bytes(serialization.Encoding.PEM,
+                                          serialization.PrivateFormat.PKCS8,
+                                          serialization.NoEncryption()))
+    with open(public_key_path, 'wb') as f:
+        f.write(private_key.public_key().public_bytes(serialization.Encoding.PEM,
+                                                      serialization.PublicFormat.SubjectPublicKeyInfo))
+
+    return private_key_path, public_key_path
+
+
+def make_enigma(dir_path: str, algorithm: str) -> Enigma:
+    rsa_key_paths = write_key_pair(dir_path, 'rsa', rsa.generate_private_key(public_exponent=65537, key_size=2048))
+
+    if algorithm == 'ES256':
+        jwt_key_paths = write_key_pair(dir_path, 'es256', ec.generate_private_key(ec.SECP256R1()))
+    elif algorithm == 'EdDSA':
+        jwt_key_paths = write_key_pair(dir_path, 'eddsa', ed25519.Ed25519PrivateKey.generate())
+    else:
+        jwt_key_paths = rsa_key_paths
+
+    return Enigma(*rsa_key_paths,
+                  cryptographic_algorithm=algorithm,
+                  jwt_private_key_pem_file_path=jwt_key_paths[0],
+                  jwt_public_key_pem_file_path=jwt_key_paths[1])
+
+
+def measure(name: str, token_count: int, run_all) -> float:
+    # Like timeit, keep the garbage collector out of the measurement.
+    gc.collect()
+    gc.disable()
+
+    try:
+        started_at = perf_counter()
+        run_all()
+        elapsed_time = perf_counter() - started_at
+    finally:
+        gc.enable()
+    rate = token_count / elapsed_time
+
+    print(f'{name:<16} {elapsed_time * 1000:10.1f} ms {elapsed_time / token_count * 1e6:10.1f} µs/op '
+          f'{rate:10.0f} tokens/s')
+
+    return rate
+
+
+def main():
+    token_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000
+    claims = {
+        'iss': 'http://localhost:8081/',
+        'sub': 'u-0123456789abcdef',
+        'aud': 'http://localhost:8081/',
+        'scope': 'openid profile email idp.root',
+        'exp': time() + 3600,
+    }
+
+    print(f'Signing and verifying {token_count:,} tokens per algorithm in one process')
+
+    signing_rates = dict()
+
+    for algorithm in ALGORITHMS:
+        with TemporaryDirectory() as dir_path:
+            enigma = make_enigma(dir_path, algorithm)
+
+        tokens = []
+
+        signing_rates[algorithm] = measure(f'sign ({algorithm})',
+                                           token_count,
+                                           lambda: tokens.extend(enigma.encode(claims) for _ in range(token_count)))
+        measure(f'verify ({algorithm})',
+                token_count,
+                lambda: [enigma.decode(t, audience=claims['aud']) for t in tokens])
+
+    for algorithm in ALGORITHMS[1:]:
+        print(f'Signing speed-up of {algorithm} over RS256: {signing_rates[algorithm] / signing_rates["RS256"]:.1f}x '
+              f'({signing_rates[algorithm] / 2:.0f} token issuances/s/core)')
+
+
+if __name__ == '__main__':
+    main()
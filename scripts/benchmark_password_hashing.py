@@ -0,0 +1,61 @@
+""" Benchmark the password verification of PasswordHasher
+
+    This measures the logins per second at the configured cost (see MINI_IDP_PASSWORD_HASH_* in .env.dist) with one
+    worker process, i.e., per core, and with all worker processes.
+
+    Usage: python3 scripts/benchmark_password_hashing.py [login count]
+"""
+import asyncio
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from midp.common.password_hasher import PasswordHasher
+
+
+def make_hasher(worker_count: int) -> PasswordHasher:
+    return PasswordHasher(cost=int(os.getenv('MINI_IDP_PASSWORD_HASH_COST') or 15),
+                          block_size=int(os.getenv('MINI_IDP_PASSWORD_HASH_BLOCK_SIZE') or 8),
+                          parallelism=int(os.getenv('MINI_IDP_PASSWORD_HASH_PARALLELISM') or 1),
+                          worker_count=worker_count)
+
+
+def measure(name: str, login_count: int, worker_count: int):
+    hasher = make_hasher(worker_count)
+
+    async def verify_all(password_hash: str):
+        await asyncio.gather(*[hasher.async_verify('secret', password_hash) for _ in range(login_count)])
+
+    try:
+        # Start the worker processes before the measurement.
+        password_hash = hasher.hash('secret')
+        asyncio.run(verify_all(password_hash))
+
+        started_at = perf_counter()
+        asyncio.run(verify_all(password_hash))
+        elapsed_time = perf_counter() - started_at
+    finally:
+        hasher.shutdown()
+
+    rate = login_count / elapsed_time
+
+    print(f'{name:<24} {elapsed_time * 1000:10.1f} ms {rate:10.1f} logins/s {rate / worker_count:10.1f} logins/s/core')
+
+
+def main():
+    login_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    cpu_count = os.cpu_count() or 1
+
+    print(f'Verifying {login_count:,} logins at '
+          f'cost={os.getenv("MINI_IDP_PASSWORD_HASH_COST") or 15}, '
+          f'block_size={os.getenv("MINI_IDP_PASSWORD_HASH_BLOCK_SIZE") or 8}, '
+          f'parallelism={os.getenv("MINI_IDP_PASSWORD_HASH_PARALLELISM") or 1}')
+
+    measure('1 worker process', login_count, 1)
+    measure(f'{cpu_count} worker processes', login_count, cpu_count)
+
+
+if __name__ == '__main__':
+    main()
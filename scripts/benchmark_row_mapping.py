@@ -0,0 +1,91 @@
+""" Benchmark the row mapping of AtomicDao
+
+    This compares the precompiled trusted-row mapper with the full validation of the models (the previous behaviour)
+    with the rows of IAMPolicy shaped as PostgreSQL returns them, i.e., with the JSON columns already parsed.
+
+    Usage: python3 scripts/benchmark_row_mapping.py [row count] [subjects per policy]
+"""
+import gc
+import os
+import sys
+from time import perf_counter
+from uuid import uuid4
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The datastore is never connected. These only satisfy the configuration of the services on import.
+os.environ.setdefault('PSQL_BASE_URL', 'postgresql+psycopg://')
+os.environ.setdefault('PSQL_DBNAME', 'benchmark')
+
+from midp.common.rds import DataStore
+from midp.iam.dao.policy import PolicyDao
+from midp.iam.models import IAMPolicy
+
+
+def make_rows(row_count: int, subject_count: int):
+    return [
+        dict(id=str(uuid4()),
+             name=f'policy-{i}',
+             resource='https://app.local/',
+             subjects=[dict(subject=f'role-{j}', kind='role') for j in range(subject_count)],
+             scopes=['openid', 'profile', 'email'],
+             fixed=False)
+        for i in range(row_count)
+    ]
+
+
+# noinspection PyProtectedMember
+def map_with_validation(dao: PolicyDao, row):
+    """ The row mapping with the full validation of the model (the previous implementation of AtomicDao.map_row) """
+    data = dict()
+
+    for k, v in row.items():
+        if k not in dao._reverse_column_mappings:
+            continue
+        property_name = dao._reverse_column_mappings[k]
+        cm = dao._column_mappings.get(property_name)
+        data[property_name] = cm.convert_to_property_data(v) if cm.convert_to_property_data else v
+
+    return IAMPolicy(**data)
+
+
+def measure(name: str, row_count: int, map_all) -> float:
+    # Like timeit, keep the garbage collector out of the measurement.
+    gc.collect()
+    gc.disable()
+
+    try:
+        started_at = perf_counter()
+        map_all()
+        elapsed_time = perf_counter() - started_at
+    finally:
+        gc.enable()
+    rate = row_count / elapsed_time
+
+    print(f'{name:<20} {elapsed_time * 1000:10.1f} ms {rate:14,.0f} rows/s')
+
+    return rate
+
+
+def main():
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    subject_count = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    dao = PolicyDao(DataStore('postgresql+psycopg://', 'benchmark', False))
+
+    # Copy the rows for each run as the mappers build the models from the nested JSON data.
+    validated_rows = make_rows(row_count, subject_count)
+    trusted_rows = make_rows(row_count, subject_count)
+
+    assert map_with_validation(dao, dict(validated_rows[0])) == dao.map_row(dict(validated_rows[0]))
+
+    print(f'Mapping {row_count:,} rows of IAMPolicy with {subject_count} subjects each')
+
+    validated_rate = measure('validation', row_count, lambda: [map_with_validation(dao, row) for row in validated_rows])
+    trusted_rate = measure('trusted (precompiled)', row_count, lambda: [dao.map_row(row) for row in trusted_rows])
+
+    print(f'Speed-up: {trusted_rate / validated_rate:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import os
+from typing import Tuple
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+
+def write_key_pair(dir_path: str) -> Tuple[str, str]:
+    """ Generate an RSA key pair into PEM files
+
+        :return: The paths of the private and the public key files
+    """
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_key_path = os.path.join(dir_path, 'private.pem')
+    public_key_path = os.path.join(dir_path, 'public.pem')
+
+    with open(private_key_path, 'wb') as f:
+        f.write(private_key.private_bytes(serialization.Encoding.PEM,
+                                          serialization.PrivateFormat.PKCS8,
+                                          serialization.NoEncryption()))
+    with open(public_key_path, 'wb') as f:
+        f.write(private_key.public_key().public_bytes(serialization.Encoding.PEM,
+                                                      serialization.PublicFormat.SubjectPublicKeyInfo))
+
+    return private_key_path, public_key_path
+
+
+def write_signing_key_pair(dir_path: str, algorithm: str) -> Tuple[str, str]:
+    """ Generate a key pair for the JWT signing algorithm into PEM files
+
+        :return: The paths of the private and the public key files
+    """
+    if algorithm == 'ES256':
+        private_key = ec.generate_private_key(ec.SECP256R1())
+    elif algorithm == 'EdDSA':
+        private_key = ed25519.Ed25519PrivateKey.generate()
+    else:
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    private_key_path = os.path.join(dir_path, f'jwt-{algorithm.lower()}-private.pem')
+    public_key_path = os.path.join(dir_path, f'jwt-{algorithm.lower()}-public.pem')
+
+    with open(private_key_path, 'wb') as f:
+        f.write(private_key.private_bytes(serialization.Encoding.PEM,
+                                          serialization.PrivateFormat.PKCS8,
+                                          serialization.NoEncryption()))
+    with open(public_key_path, 'wb') as f:
+        f.write(private_key.public_key().public_bytes(serialization.Encoding.PEM,
+                                                      serialization.PublicFormat.SubjectPublicKeyInfo))
+
+    return private_key_path, public_key_path
@@ -0,0 +1,47 @@
+from time import sleep
+from unittest import TestCase
+
+from midp.common.cache import LRUCache
+
+
+class UnitTest(TestCase):
+    def test_lru_eviction(self):
+        cache = LRUCache(2, 60)
+        cache.set('alpha', 1)
+        cache.set('bravo', 2)
+        cache.get('alpha')
+        cache.set('charlie', 3)
+
+        self.assertEqual(1, cache.get('alpha'))
+        self.assertIsNone(cache.get('bravo'))
+        self.assertEqual(3, cache.get('charlie'))
+
+        stats = cache.get_stats()
+        self.assertEqual((2, 3, 1, 1), (stats.size, stats.hits, stats.misses, stats.evictions))
+
+    def test_expiry(self):
+        cache = LRUCache(2, 0.01)
+        cache.set('alpha', 1)
+        sleep(0.02)
+
+        self.assertIsNone(cache.get('alpha'))
+        self.assertEqual(0, cache.get_stats().size)
+
+    def test_expiry_per_entry(self):
+        cache = LRUCache(2, 60)
+        cache.set('alpha', 1, ttl=0.01)
+        cache.set('bravo', 2)
+        sleep(0.02)
+
+        self.assertIsNone(cache.get('alpha'))
+        self.assertEqual(2, cache.get('bravo'))
+
+    def test_set_after_clear(self):
+        cache = LRUCache(2, 60)
+        generation = cache.generation
+        cache.clear()
+        cache.set('alpha', 1, generation=generation)
+        cache.set('bravo', 2, generation=cache.generation)
+
+        self.assertIsNone(cache.get('alpha'))
+        self.assertEqual(2, cache.get('bravo'))
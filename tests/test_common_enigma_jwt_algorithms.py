@@ -0,0 +1,55 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import jwt
+
+from midp.common.enigma import Enigma
+from tests.common.key_pair import write_key_pair, write_signing_key_pair
+
+
+class UnitTest(TestCase):
+    def setUp(self):
+        self._temp_dir = TemporaryDirectory()
+        self._rsa_key_paths = write_key_pair(self._temp_dir.name)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def _make_enigma(self, algorithm: str) -> Enigma:
+        private_key_path, public_key_path = write_signing_key_pair(self._temp_dir.name, algorithm)
+
+        return Enigma(*self._rsa_key_paths,
+                      cryptographic_algorithm=algorithm,
+                      jwt_private_key_pem_file_path=private_key_path,
+                      jwt_public_key_pem_file_path=public_key_path)
+
+    def test_jwt_conversation(self):
+        for algorithm in ['RS256', 'ES256', 'EdDSA']:
+            with self.subTest(algorithm):
+                enigma = self._make_enigma(algorithm)
+                token = enigma.encode({'a': 1, 'b': 'c'})
+
+                self.assertEqual(algorithm, jwt.get_unverified_header(token)['alg'])
+                self.assertEqual({'a': 1, 'b': 'c'}, enigma.decode(token))
+
+                # The encryption still uses the RSA key pair.
+                self.assertEqual(b'secret', enigma.decrypt(enigma.encrypt(b'secret')))
+
+    def test_rsa_key_pair_by_default(self):
+        enigma = Enigma(*self._rsa_key_paths)
+
+        self.assertEqual('RS256', enigma.jwt_algorithm)
+        self.assertEqual({'a': 1}, enigma.decode(enigma.encode({'a': 1})))
+
+    def test_token_signed_with_other_algorithm_rejected(self):
+        token = self._make_enigma('EdDSA').encode({'a': 1})
+
+        with self.assertRaises(jwt.InvalidTokenError):
+            self._make_enigma('ES256').decode(token)
+
+    def test_mismatched_key_pair(self):
+        with self.assertRaises(RuntimeError):
+            Enigma(*self._rsa_key_paths, cryptographic_algorithm='ES256')
+
+        with self.assertRaises(RuntimeError):
+            Enigma(*self._rsa_key_paths, cryptographic_algorithm='HS256')
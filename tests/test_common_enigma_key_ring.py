@@ -0,0 +1,64 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from midp.common.enigma import Enigma, _make_jwk
+from tests.common.key_pair import write_key_pair, write_signing_key_pair
+
+
+class UnitTest(TestCase):
+    def setUp(self):
+        self._temp_dir = TemporaryDirectory()
+        self._rsa_key_paths = write_key_pair(self._temp_dir.name)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_jwk_thumbprint(self):
+        # The example of RFC 7638, section 3.1
+        public_key = rsa.RSAPublicNumbers(
+            e=65537,
+            n=int.from_bytes(jwt.utils.base64url_decode(
+                '0vx7agoebGcQSuuPiLJXZptN9nndrQmbXEps2aiAFbWhM78LhWx4cbbfAAtVT86zwu1RK7aPFFxuhDR1L6tSoc_BJECPebWKRXjBZCiF'
+                'V4n3oknjhMstn64tZ_2W-5JsGY4Hc5n9yBXArwl93lqt7_RN5w6Cf0h4QyQ5v-65YGjQR0_FDW2QvzqY368QQMicAtaSqzs8KJZgnYb9'
+                'c7d0zgdAZHzu6qMQvRL5hajrn1n91CbOpbISD08qNLyrdkt-bFTWhAI4vMQFh6WeZu0fM4lFd2NcRwr3XPksINHaQ-G_xBniIqbw0Ls1'
+                'jF44-csFCur-kEgU8awapJzKnqDKgw'
+            ), 'big'),
+        ).public_key()
+
+        self.assertEqual('NzbLsXh8uDCcd-6MNwXF4W_7noWXFZAfHkxZsRGC9Xs', _make_jwk(public_key, 'RS256')['kid'])
+
+    def test_offline_verification_with_jwks(self):
+        enigma = Enigma(*self._rsa_key_paths)
+        token = enigma.encode({'a': 1})
+        jwks = jwt.PyJWKSet.from_dict(enigma.get_jwks())
+
+        self.assertEqual(enigma.jwt_key_id, jwt.get_unverified_header(token)['kid'])
+        self.assertEqual({'a': 1}, jwt.decode(token, key=jwks[enigma.jwt_key_id].key, algorithms=['RS256']))
+
+    def test_retired_key(self):
+        former_private_key_path, former_public_key_path = write_signing_key_pair(self._temp_dir.name, 'ES256')
+        former_enigma = Enigma(*self._rsa_key_paths,
+                               cryptographic_algorithm='ES256',
+                               jwt_private_key_pem_file_path=former_private_key_path,
+                               jwt_public_key_pem_file_path=former_public_key_path)
+        enigma = Enigma(*self._rsa_key_paths, jwt_retired_public_key_pem_file_paths=[former_public_key_path])
+
+        former_token = former_enigma.encode({'a': 1})
+
+        self.assertEqual({'a': 1}, enigma.decode(former_token))
+        self.assertEqual([(enigma.jwt_key_id, 'RS256'), (former_enigma.jwt_key_id, 'ES256')],
+                         [(jwk['kid'], jwk['alg']) for jwk in enigma.get_jwks()['keys']])
+
+        # The tokens of the unknown keys are rejected.
+        with self.assertRaises(jwt.InvalidSignatureError):
+            former_enigma.decode(enigma.encode({'a': 1}))
+
+    def test_token_without_key_id(self):
+        enigma = Enigma(*self._rsa_key_paths)
+        # noinspection PyProtectedMember
+        token = jwt.encode({'a': 1}, key=enigma._jwt_private_key, algorithm='RS256')
+
+        self.assertEqual({'a': 1}, enigma.decode(token))
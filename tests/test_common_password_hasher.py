@@ -0,0 +1,34 @@
+from unittest import TestCase
+
+from midp.common.password_hasher import PasswordHasher
+
+
+class UnitTest(TestCase):
+    def setUp(self):
+        self._hasher = PasswordHasher(cost=10, worker_count=1)
+
+    def tearDown(self):
+        self._hasher.shutdown()
+
+    def test_hash_and_verify(self):
+        password_hash = self._hasher.hash('secret')
+
+        self.assertTrue(password_hash.startswith('$scrypt$ln=10,r=8,p=1$'))
+        self.assertTrue(self._hasher.verify('secret', password_hash))
+        self.assertFalse(self._hasher.verify('guess', password_hash))
+        self.assertFalse(self._hasher.needs_rehash(password_hash))
+
+    def test_rehash_with_another_cost(self):
+        cheaper_hasher = PasswordHasher(cost=8, worker_count=1)
+        try:
+            password_hash = cheaper_hasher.hash('secret')
+        finally:
+            cheaper_hasher.shutdown()
+
+        self.assertTrue(self._hasher.verify('secret', password_hash))
+        self.assertTrue(self._hasher.needs_rehash(password_hash))
+
+    def test_dummy_hash(self):
+        self.assertTrue(self._hasher.dummy_hash.startswith('$scrypt$ln=10,r=8,p=1$'))
+        self.assertFalse(self._hasher.verify('', self._hasher.dummy_hash))
+        self.assertFalse(self._hasher.needs_rehash(self._hasher.dummy_hash))
@@ -0,0 +1,39 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from midp.common.enigma import Enigma
+from midp.common.session_id_codec import SessionIdCodec
+from tests.common.key_pair import write_key_pair
+
+
+class UnitTest(TestCase):
+    def setUp(self):
+        self._temp_dir = TemporaryDirectory()
+        self._enigma = Enigma(*write_key_pair(self._temp_dir.name))
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_signed_session_id(self):
+        codec = SessionIdCodec(self._enigma)
+        encoded_session_id = codec.encode('alpha')
+
+        self.assertTrue(encoded_session_id.startswith('s1.default.alpha.'))
+        self.assertEqual('alpha', codec.decode(encoded_session_id))
+        self.assertIsNone(codec.decode(encoded_session_id.replace('alpha', 'bravo')))
+        self.assertIsNone(codec.decode('s1.default.alpha'))
+
+    def test_key_rotation(self):
+        old_codec = SessionIdCodec(self._enigma, keys=[('k1', b'old secret')])
+        new_codec = SessionIdCodec(self._enigma, keys=[('k2', b'new secret'), ('k1', b'old secret')])
+
+        self.assertEqual('alpha', new_codec.decode(old_codec.encode('alpha')))
+        self.assertTrue(new_codec.encode('alpha').startswith('s1.k2.'))
+        self.assertIsNone(old_codec.decode(new_codec.encode('alpha')))
+
+    def test_legacy_session_id(self):
+        legacy_session_id = self._enigma.encrypt('alpha').decode()
+
+        self.assertEqual('alpha', SessionIdCodec(self._enigma).decode(legacy_session_id))
+        self.assertIsNone(SessionIdCodec(self._enigma, legacy_ids_accepted=False).decode(legacy_session_id))
+        self.assertIsNone(SessionIdCodec(self._enigma).decode('not-encrypted'))
@@ -0,0 +1,362 @@
+import asyncio
+import importlib.util
+import os
+import sqlite3
+from base64 import b64encode
+from tempfile import TemporaryDirectory
+from unittest import TestCase, skipUnless
+
+from jsonpatch import JsonPatchConflict
+from sqlalchemy.exc import DatabaseError
+
+from midp.common.enigma import Enigma
+from midp.common.key_storage import KeyStorage
+from midp.common.obj_patcher import PatchOperation
+from midp.common.rds import DataStore, _ChangeListener
+from midp.iam.dao.atomic import InsertError
+from midp.iam.dao.client import ClientDao
+from midp.iam.dao.policy import PolicyDao
+from midp.iam.dao.role import RoleDao
+from midp.iam.dao.user import UserDao
+from midp.iam.models import GrantType, IAMOAuthClient, IAMPolicy, IAMPolicySubject, IAMRole, IAMUser
+from midp.oauth.access_evaluator import ClientAuthenticator
+from tests.common.key_pair import write_key_pair
+
+MIGRATION_DIR_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations', 'sqlite')
+
+
+class _CountingEnigma(Enigma):
+    def __init__(self, private_key_pem_file_path: str, public_key_pem_file_path: str):
+        super().__init__(private_key_pem_file_path, public_key_pem_file_path)
+        self.decryption_count = 0
+
+    def decrypt(self, message, *, as_hex: bool = True) -> bytes:
+        self.decryption_count += 1
+        return super().decrypt(message, as_hex=as_hex)
+
+
+class UnitTest(TestCase):
+    def setUp(self):
+        self._temp_dir = TemporaryDirectory()
+        db_path = os.path.join(self._temp_dir.name, 'miniidp.db')
+
+        c = sqlite3.connect(db_path)
+        for migration_file_name in sorted(os.listdir(MIGRATION_DIR_PATH)):
+            with open(os.path.join(MIGRATION_DIR_PATH, migration_file_name)) as f:
+                c.executescript(f.read())
+        c.close()
+
+        self._datastore = DataStore('sqlite://', db_path, False)
+
+    def tearDown(self):
+        asyncio.run(self._datastore.dispose())
+        self._temp_dir.cleanup()
+
+    def _make_enigma(self) -> _CountingEnigma:
+        return _CountingEnigma(*write_key_pair(self._temp_dir.name))
+
+    def test_json_columns(self):
+        dao = PolicyDao(self._datastore)
+        policy = IAMPolicy(name='alpha',
+                           resource='https://alpha.local/',
+                           subjects=[IAMPolicySubject(subject='root', kind='role')],
+                           scopes=['openid', 'offline_access'])
+        dao.add(policy)
+
+        self.assertEqual(policy, dao.get('alpha'))
+        self.assertIsInstance(dao.get('alpha').subjects[0], IAMPolicySubject)
+        self.assertIs(False, dao.get('alpha').fixed)
+
+        policy.scopes.append('idp.root')
+        dao.simple_update(policy, 'id = :id', dict(id=policy.id))
+
+        self.assertEqual(['openid', 'offline_access', 'idp.root'], dao.get(policy.id).scopes)
+
+    def test_null_id(self):
+        dao = RoleDao(self._datastore)
+
+        # Rejected like in PostgreSQL
+        with self.assertRaises(InsertError):
+            dao.add(IAMRole(id=None, name='alpha'))
+
+        self.assertEqual(0, dao.count())
+
+    def test_bulk_upsert(self):
+        dao = RoleDao(self._datastore)
+        existing_role = dao.add(IAMRole(name='alpha'))
+        existing_role.description = 'updated'
+
+        result = dao.bulk_upsert([existing_role, IAMRole(name='bravo')])
+
+        self.assertEqual(['bravo'], [r.name for r in result.inserted])
+        self.assertEqual(['alpha'], [r.name for r in result.updated])
+        self.assertEqual('updated', dao.get('alpha').description)
+
+    def test_key_storage(self):
+        kv = KeyStorage(self._datastore)
+        kv.set('alpha', {'a': 1})
+        kv.set('alpha', {'a': 2})
+        kv.set('bravo', 'raw string')
+
+        self.assertEqual({'a': 2}, kv.get('alpha'))
+        self.assertEqual('raw string', kv.get('bravo'))
+        self.assertIsNone(kv.get('charlie'))
+
+    @skipUnless(importlib.util.find_spec('aiosqlite'), 'aiosqlite is not installed.')
+    def test_async_access(self):
+        dao = RoleDao(self._datastore)
+        kv = KeyStorage(self._datastore)
+
+        async def run():
+            await dao.async_add(IAMRole(name='alpha'))
+            await kv.async_set('alpha', ['a', 'b'])
+            return (await dao.async_get('alpha')).name, await kv.async_get('alpha')
+
+        self.assertEqual(('alpha', ['a', 'b']), asyncio.run(run()))
+
+    def test_select_page(self):
+        dao = RoleDao(self._datastore)
+        dao.bulk_insert([IAMRole(name=name) for name in ['idp.admin', 'idp_user', 'idp.viewer', 'other']])
+
+        first_page, next_key = dao.select_page({'name': 'idp.*'}, limit=1)
+        second_page, last_key = dao.select_page({'name': 'idp.*'}, after=next_key, limit=1)
+
+        self.assertEqual(['idp.admin'], [r.name for r in first_page])
+        self.assertEqual(['idp.viewer'], [r.name for r in second_page])
+        self.assertIsNone(last_key)
+
+    def test_get_many(self):
+        dao = RoleDao(self._datastore)
+        alpha, bravo, _ = dao.bulk_insert([IAMRole(name=name) for name in ['alpha', 'bravo', 'charlie']]).inserted
+
+        roles = dao.get_many([alpha.id, 'bravo', 'delta'], fields=['description'])
+
+        self.assertEqual({alpha.id, 'alpha', bravo.id, 'bravo'}, set(roles.keys()))
+        self.assertEqual('bravo', roles['bravo'].name)
+
+    def test_patch(self):
+        dao = PolicyDao(self._datastore)
+        policy = dao.add(IAMPolicy(name='alpha',
+                                   resource='https://alpha.local/',
+                                   subjects=[IAMPolicySubject(subject='root', kind='role')],
+                                   scopes=['openid', 'profile']))
+
+        # Translated into SQL expressions
+        updated_policy = dao.patch([PatchOperation(op='add', path='/scopes/-', value='email'),
+                                    PatchOperation(op='remove', path='/scopes/0', value=None),
+                                    PatchOperation(op='add', path='/subjects/-', value=dict(subject='bob', kind='user')),
+                                    PatchOperation(op='replace', path='/resource', value='https://bravo.local/')],
+                                   'id = :id',
+                                   dict(id=policy.id))
+
+        self.assertEqual(['profile', 'email'], updated_policy.scopes)
+        self.assertEqual(IAMPolicySubject(subject='bob', kind='user'), updated_policy.subjects[1])
+        self.assertEqual(updated_policy, dao.get(policy.id))
+
+        # Patched in Python
+        updated_policy = dao.patch([PatchOperation(op='replace', path='/subjects/0/kind', value='user')],
+                                   'id = :id',
+                                   dict(id=policy.id))
+
+        self.assertEqual('user', dao.get(policy.id).subjects[0].kind)
+        self.assertEqual(updated_policy, dao.get(policy.id))
+
+        self.assertIsNone(dao.patch([PatchOperation(op='replace', path='/name', value='bravo')],
+                                    'id = :id',
+                                    dict(id='unknown')))
+
+        # The index out of range is rejected like in Python, without any changes.
+        for operations in [[PatchOperation(op='remove', path='/scopes/7', value=None)],
+                           [PatchOperation(op='add', path='/scopes/-', value='openid'),
+                            PatchOperation(op='remove', path='/scopes/3', value=None)]]:
+            with self.assertRaises(JsonPatchConflict):
+                dao.patch(operations, 'id = :id', dict(id=policy.id))
+
+        self.assertEqual(['profile', 'email'], dao.get(policy.id).scopes)
+        self.assertIsNone(dao.patch([PatchOperation(op='remove', path='/scopes/7', value=None)],
+                                    'id = :id',
+                                    dict(id='unknown')))
+
+    def test_entity_cache(self):
+        dao = RoleDao(self._datastore).enable_cache(10, 60)
+        dao.add(IAMRole(name='alpha'))
+
+        dao.get('alpha').description = 'altered by the caller'
+        self.assertIsNone(dao.get('alpha').description)
+
+        role = dao.get('alpha')
+        role.description = 'updated'
+        dao.simple_update(role, 'id = :id', dict(id=role.id))
+
+        self.assertEqual('updated', dao.get('alpha').description)
+        self.assertEqual((2, 2, 2), (dao.get_cache_stats().hits,
+                                     dao.get_cache_stats().misses,
+                                     dao.get_cache_stats().invalidations))
+
+        # The uncommitted changes are never cached.
+        with self._datastore.in_session() as session:
+            dao.patch([PatchOperation(op='replace', path='/description', value='uncommitted')],
+                      'id = :id',
+                      dict(id=role.id),
+                      datastore_session=session)
+            self.assertEqual('uncommitted', dao.get('alpha', datastore_session=session).description)
+            session.roll_back()
+
+        self.assertEqual('updated', dao.get('alpha').description)
+
+        # The former rows cached during the transaction are dropped on commit.
+        with self._datastore.in_session() as session:
+            dao.patch([PatchOperation(op='replace', path='/description', value='committed')],
+                      'id = :id',
+                      dict(id=role.id),
+                      datastore_session=session)
+            self.assertEqual('updated', dao.get('alpha').description)
+            session.commit()
+
+        self.assertEqual('committed', dao.get('alpha').description)
+
+        # The read-only sessions cannot see any uncommitted changes.
+        dao.get('alpha')
+        hit_count = dao.get_cache_stats().hits
+        with self._datastore.in_session(read_only=True) as session:
+            self.assertEqual('committed', dao.get('alpha', datastore_session=session).description)
+        self.assertEqual(hit_count + 1, dao.get_cache_stats().hits)
+
+    def test_entity_cache_fenced_by_invalidation(self):
+        dao = RoleDao(self._datastore).enable_cache(10, 60)
+        dao.add(IAMRole(name='alpha'))
+
+        # The rows read before the invalidation are outdated.
+        rows = dao.select('name = :name', dict(name='alpha'))
+        next(rows)
+        dao.invalidate_cache()
+        next(rows, None)
+
+        dao.get('alpha')
+        self.assertEqual((0, 1), (dao.get_cache_stats().hits, dao.get_cache_stats().size))
+
+    @skipUnless(importlib.util.find_spec('aiosqlite'), 'aiosqlite is not installed.')
+    def test_entity_cache_with_read_only_session(self):
+        client_dao = ClientDao(self._datastore, self._make_enigma()).enable_cache(10, 60)
+        client_dao.add(IAMOAuthClient(name='alpha',
+                                      secret='secret',
+                                      audience='https://alpha.local/',
+                                      grant_types=[GrantType.CLIENT_CREDENTIALS]))
+        authenticator = ClientAuthenticator(client_dao)
+
+        async def request_token():
+            # Like the token endpoint
+            async with self._datastore.async_in_session(read_only=True) as session:
+                return await authenticator.authenticate(client_id='alpha',
+                                                        grant_type=GrantType.CLIENT_CREDENTIALS,
+                                                        client_secret='secret',
+                                                        datastore_session=session)
+
+        asyncio.run(request_token())
+        self.assertEqual('alpha', asyncio.run(request_token()).name)
+        self.assertEqual((1, 1), (client_dao.get_cache_stats().hits, client_dao.get_cache_stats().misses))
+
+    # noinspection PyProtectedMember
+    def test_change_listener_lifecycle(self):
+        listener = _ChangeListener(self._datastore._primary.engine, retry_interval=0.01)
+        listener.subscribe('iam_role', lambda: None)
+
+        # Only listening once started, e.g., by the web server
+        self.assertIsNone(listener._thread)
+
+        listener.start()
+        thread = listener._thread
+        self.assertTrue(thread.is_alive())
+
+        listener.stop()
+        self.assertFalse(thread.is_alive())
+        self.assertIsNone(listener._thread)
+
+    def test_count_and_exists(self):
+        dao = RoleDao(self._datastore)
+        dao.bulk_insert([IAMRole(name=name) for name in ['alpha', 'bravo', 'charlie']])
+
+        self.assertEqual(3, dao.count())
+        self.assertEqual(1, dao.count('name = :name', dict(name='bravo')))
+        self.assertTrue(dao.exists('name = :name', dict(name='alpha')))
+        self.assertFalse(dao.exists('name = :name', dict(name='delta')))
+
+    def test_lazy_decryption(self):
+        enigma = self._make_enigma()
+        dao = UserDao(self._datastore, RoleDao(self._datastore), enigma)
+        user = dao.add(IAMUser(name='alpha', email='alpha@local', password='secret'))
+
+        hidden_user = dao.get('alpha').model_copy(update={'password': None})
+
+        self.assertIsNone(hidden_user.model_dump()['password'])
+        self.assertEqual(0, enigma.decryption_count)
+
+        # The properties not serialized are not decrypted.
+        self.assertNotIn('password', dao.get('alpha').model_dump(exclude={'password'}))
+        self.assertEqual('{"name":"alpha"}', dao.get('alpha').model_dump_json(include={'name'}))
+        self.assertEqual(0, enigma.decryption_count)
+
+        selected_user = dao.get('alpha')
+
+        self.assertEqual('secret', selected_user.password)
+        self.assertEqual('secret', selected_user.model_dump()['password'])
+        self.assertEqual(user, dao.get('alpha'))
+        self.assertEqual(2, enigma.decryption_count)
+
+    # noinspection PyProtectedMember
+    def test_reencrypt(self):
+        enigma = self._make_enigma()
+        dao = UserDao(self._datastore, RoleDao(self._datastore), enigma)
+        dao.bulk_insert([IAMUser(name=name, email=f'{name}@local', password=f'{name}-password')
+                         for name in ['alpha', 'bravo', 'charlie']])
+
+        legacy_data = b64encode(enigma._encrypt_with_public_key(b'bravo-password')).decode()
+        self._datastore.execute_without_result('UPDATE iam_user SET encrypted_password = :data WHERE name = :name',
+                                               dict(data=legacy_data, name='bravo'))
+
+        self.assertEqual('bravo-password', dao.get('bravo').password)
+        self.assertEqual(1, dao.reencrypt(batch_size=2))
+        self.assertEqual(0, dao.reencrypt(batch_size=2))
+
+        for name in ['alpha', 'bravo', 'charlie']:
+            encrypted_password = next(self._datastore.execute('SELECT encrypted_password FROM iam_user '
+                                                              'WHERE name = :name',
+                                                              dict(name=name)))[0]
+            self.assertFalse(enigma.needs_reencryption(encrypted_password))
+            self.assertEqual(f'{name}-password', dao.get(name).password)
+
+    # noinspection PyProtectedMember
+    def test_reencrypt_with_failed_write(self):
+        enigma = self._make_enigma()
+        dao = UserDao(self._datastore, RoleDao(self._datastore), enigma)
+        dao.add(IAMUser(name='alpha', email='alpha@local', password='alpha-password'))
+
+        legacy_data = b64encode(enigma._encrypt_with_public_key(b'alpha-password')).decode()
+        self._datastore.execute_without_result('UPDATE iam_user SET encrypted_password = :data WHERE name = :name',
+                                               dict(data=legacy_data, name='alpha'))
+        self._datastore.execute_without_result('CREATE TRIGGER reject_update BEFORE UPDATE ON iam_user '
+                                               'BEGIN SELECT RAISE(ABORT, \'rejected\'); END')
+
+        with self.assertRaises(DatabaseError):
+            dao.reencrypt()
+
+        self._datastore.execute_without_result('DROP TRIGGER reject_update')
+
+        self.assertEqual(1, dao.reencrypt())
+
+    def test_password_hash(self):
+        dao = UserDao(self._datastore, RoleDao(self._datastore), self._make_enigma())
+        user = dao.add(IAMUser(name='alpha', email='alpha@local', password='secret'))
+
+        state = dao.get_password_hash(user.id)
+        self.assertIsNone(state.password_hash)
+        self.assertTrue(dao.set_password_hash(state, '$scrypt$hash'))
+        self.assertEqual('$scrypt$hash', dao.get_password_hash(user.id).password_hash)
+
+        # The hash of the previous password is stale.
+        user.password = 'changed'
+        dao.simple_update(user, 'id = :id', dict(id=user.id))
+
+        self.assertIsNone(dao.get_password_hash(user.id).password_hash)
+        self.assertFalse(dao.set_password_hash(state, '$scrypt$hash'))
+        self.assertIsNone(dao.get_password_hash('unknown'))
@@ -0,0 +1,63 @@
+from tempfile import TemporaryDirectory
+from time import time, sleep
+from unittest import TestCase
+
+import jwt
+
+from midp.common.enigma import Enigma
+from midp.common.token_manager import TokenManager, AccessClaims, InvalidTokenError
+from midp.static_info import SELF_REFERENCE_URI
+from tests.common.key_pair import write_key_pair
+
+
+class _CountingEnigma(Enigma):
+    decode_count = 0
+
+    def decode(self, *args, **kwargs):
+        self.decode_count += 1
+        return super().decode(*args, **kwargs)
+
+
+class UnitTest(TestCase):
+    def setUp(self):
+        self._temp_dir = TemporaryDirectory()
+        self._enigma = _CountingEnigma(*write_key_pair(self._temp_dir.name))
+        self._token_manager = TokenManager(self._enigma, None, None, None, None)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def _make_token(self, ttl: float, audience: str = SELF_REFERENCE_URI) -> str:
+        return self._enigma.encode(dict(sub='alpha',
+                                        scope='openid idp.root',
+                                        iss=SELF_REFERENCE_URI,
+                                        aud=audience,
+                                        exp=time() + ttl))
+
+    def test_verified_token_cache(self):
+        token = self._make_token(60)
+
+        first_claims = self._token_manager.parse_token(token)
+        first_claims['sub'] = 'bravo'
+        second_claims = self._token_manager.parse_token(token)
+
+        self.assertIsInstance(second_claims, AccessClaims)
+        self.assertEqual('alpha', second_claims['sub'])
+        self.assertEqual(frozenset({'openid', 'idp.root'}), second_claims.scopes)
+        self.assertEqual(1, self._enigma.decode_count)
+        self.assertEqual(1, self._token_manager.get_token_cache_stats().hits)
+
+        # The cache is keyed by the audience too.
+        with self.assertRaises(jwt.InvalidAudienceError):
+            self._token_manager.parse_token(token, resource_url='http://elsewhere/')
+
+    def test_cached_token_expired(self):
+        token = self._make_token(1)
+
+        self._token_manager.parse_token(token)
+        sleep(1.1)
+
+        with self.assertRaises(InvalidTokenError):
+            self._token_manager.parse_token(token)
+
+        self.assertEqual(2, self._enigma.decode_count)